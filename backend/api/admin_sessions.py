@@ -1,33 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 import asyncio
+import time
 import httpx
 import csv
 import io
+import json
 import logging
-from typing import List
+from typing import List, Optional
 from api.admin_auth import get_current_admin
+from db.admin_repo import AdminUserRepository
 from db.session_repo import SessionRepository
 from db.question_repo import QuestionRepository
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from models.schemas import Session, SessionCreate, SessionQuestion
-from api.student import manager
+from api.student import stats_store, response_clusters, session_directory, active_questions
+from core.connections import manager, ADMIN_TOPICS
+from core.config import settings
+from core.archive import archive
+from core.security import create_ws_token, verify_ws_token, WS_TOKEN_EXPIRE_SECONDS
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+async def _questions_changed(session_id: int, questions: list):
+    # Connecting students are served from this entry, so refresh it with what is broadcast
+    active_questions.set(session_id, jsonable_encoder(questions))
+    await manager.send(session_id, {"type": "active_questions", "questions": questions})
+
+async def owned_session(session_id: int, current_user: dict = Depends(get_current_admin)) -> dict:
+    # Sessions belong to the admin who started them; other admins get the same 404 as a missing one
+    session = await session_directory.resolve_id(session_id)
+    if not session or session['admin_id'] != current_user['id']:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+async def token_owned_session(session_id: int, token: str = Query("", description="from POST /sessions/{id}/ws-token")) -> dict:
+    # For EventSource, which cannot send an Authorization header: the short-lived session token instead
+    username = verify_ws_token(token, session_id)
+    user = await AdminUserRepository.get_by_username(username) if username else None
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session token")
+    return await owned_session(session_id, user)
+
 @router.post("/sessions")
 async def create_session(session: SessionCreate, current_user: dict = Depends(get_current_admin)):
-    active = await SessionRepository.get_active_session()
-    if active:
-        raise HTTPException(status_code=400, detail="An active session already exists. Please close it before starting a new one.")
-    code = await SessionRepository.create(session)
+    # Any number of sessions may be active at once, across admins and for the same admin
+    code = await SessionRepository.create(session, current_user['id'])
+    # Loads the new session into the directory so the first joins are served from memory
+    await session_directory.resolve_code(code)
     return {"code": code}
 
 @router.get("/sessions")
 async def get_all_sessions(current_user: dict = Depends(get_current_admin)):
-    return await SessionRepository.get_all()
+    return await SessionRepository.get_all(current_user['id'])
+
+# Declared before /sessions/{code} so "page" is not taken for a session code
+@router.get("/sessions/page")
+async def get_sessions_page(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    status: Optional[str] = Query(None, description="Filter by 'active' or 'closed'"),
+    current_user: dict = Depends(get_current_admin)
+):
+    try:
+        items, next_cursor = await SessionRepository.list_page(current_user['id'], limit, cursor, status)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/models")
 async def get_models(current_user: dict = Depends(get_current_admin)):
@@ -44,51 +87,70 @@ async def get_models(current_user: dict = Depends(get_current_admin)):
 @router.get("/sessions/{code}")
 async def get_session(code: str, current_user: dict = Depends(get_current_admin)):
     session = await SessionRepository.get_by_code(code)
-    if not session:
+    if not session or session['admin_id'] != current_user['id']:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
 
 @router.put("/sessions/{session_id}/end")
-async def end_session(session_id: int, current_user: dict = Depends(get_current_admin)):
+async def end_session(session_id: int, session: dict = Depends(owned_session)):
     await SessionRepository.close_session(session_id)
-    await manager.broadcast(session_id, {"type": "session_ended"})
+    session_directory.set_status(session_id, 'closed')
+    active_questions.invalidate(session_id)
+    await manager.send(session_id, {"type": "session_ended"})
     return {"status": "closed"}
 
 @router.delete("/sessions/{session_id}")
-async def delete_session(session_id: int, current_user: dict = Depends(get_current_admin)):
+async def delete_session(session_id: int, session: dict = Depends(owned_session)):
     await SessionRepository.delete_session(session_id)
+    await asyncio.to_thread(archive.remove, session_id)
+    stats_store.forget(session_id)
+    response_clusters.forget(session_id)
+    session_directory.remove(session_id)
+    manager.forget_session(session_id)
+    active_questions.invalidate(session_id)
     return {"status": "deleted"}
 
 @router.post("/sessions/{session_id}/activate-question")
-async def activate_question(session_id: int, question_id: int, current_user: dict = Depends(get_current_admin)):
+async def activate_question(session_id: int, question_id: int, session: dict = Depends(owned_session)):
     # Launch a single question
     sq_id = await SessionRepository.launch_question(session_id, question_id)
     questions = await SessionRepository.get_active_questions(session_id)
-    await manager.broadcast(session_id, {"type": "active_questions", "questions": questions})
+    await _questions_changed(session_id, questions)
     return {"session_question_id": sq_id, "status": "open"}
 
 @router.put("/sessions/{session_id}/question/{session_question_id}/close")
-async def close_question(session_id: int, session_question_id: int, current_user: dict = Depends(get_current_admin)):
+async def close_question(session_id: int, session_question_id: int, session: dict = Depends(owned_session)):
     await SessionRepository.close_question(session_question_id)
     questions = await SessionRepository.get_active_questions(session_id)
-    await manager.broadcast(session_id, {"type": "active_questions", "questions": questions})
+    await _questions_changed(session_id, questions)
     return {"status": "closed"}
 
 @router.get("/sessions/{session_id}/results")
-async def get_session_results(session_id: int, current_user: dict = Depends(get_current_admin)):
+async def get_session_results(session_id: int, session: dict = Depends(owned_session)):
     # Gets all questions (open and closed) and their responses for the admin view
     return await SessionRepository.fetch_results(session_id)
 
+@router.get("/sessions/{session_id}/stats")
+async def get_session_stats(session_id: int, session: dict = Depends(owned_session)):
+    # Per-question count, mean, 0-4 histogram and submission rate without any response bodies
+    return {"session_id": session_id, "questions": await stats_store.get_session(session_id)}
+
+@router.get("/sessions/{session_id}/clusters")
+async def get_session_clusters(session_id: int, session: dict = Depends(owned_session)):
+    # Similar answers grouped per question, with top terms and the answers closest to each group's center
+    if not response_clusters.enabled:
+        raise HTTPException(status_code=404, detail="Response clustering is turned off")
+    return {"session_id": session_id, "questions": await response_clusters.get_session(session_id)}
+
 @router.get("/sessions/{session_id}/connected-users")
-async def get_connected_users(session_id: int, current_user: dict = Depends(get_current_admin)):
-    names = manager.get_connected_names(session_id)
+async def get_connected_users(session_id: int, session: dict = Depends(owned_session)):
     return {
-        "count": len(names),
-        "names": names
+        "count": manager.get_connected_count(session_id),
+        "names": manager.get_connected_names(session_id)
     }
 
 @router.post("/sessions/{session_id}/launch-collection/{collection_id}")
-async def launch_collection(session_id: int, collection_id: int, current_user: dict = Depends(get_current_admin)):
+async def launch_collection(session_id: int, collection_id: int, session: dict = Depends(owned_session)):
     questions = await QuestionRepository.get_by_collection(collection_id)
     if not questions:
         raise HTTPException(status_code=404, detail="No questions in this collection")
@@ -97,17 +159,17 @@ async def launch_collection(session_id: int, collection_id: int, current_user: d
         sq_id = await SessionRepository.launch_question(session_id, q['id'])
         launched.append(sq_id)
     active = await SessionRepository.get_active_questions(session_id)
-    await manager.broadcast(session_id, {"type": "active_questions", "questions": active})
+    await _questions_changed(session_id, active)
     return {"launched": len(launched), "session_question_ids": launched}
 
 @router.put("/sessions/{session_id}/close-all-questions")
-async def close_all_questions(session_id: int, current_user: dict = Depends(get_current_admin)):
+async def close_all_questions(session_id: int, session: dict = Depends(owned_session)):
     await SessionRepository.close_all_questions(session_id)
-    await manager.broadcast(session_id, {"type": "active_questions", "questions": []})
+    await _questions_changed(session_id, [])
     return {"status": "all closed"}
 
 @router.get("/sessions/{session_id}/export-csv")
-async def export_csv(session_id: int, current_user: dict = Depends(get_current_admin)):
+async def export_csv(session_id: int, session: dict = Depends(owned_session)):
     results = await SessionRepository.fetch_results(session_id)
     output = io.StringIO()
     writer = csv.writer(output)
@@ -130,21 +192,106 @@ async def export_csv(session_id: int, current_user: dict = Depends(get_current_a
     )
 
 @router.get("/sessions/{session_id}/live-results")
-async def stream_session_results(request: Request, session_id: int):
-    # Note: Depending on get_current_admin over SSE can be tricky with auth headers.
-    # We'll keep it simple: assuming dashboard connects to this via EventSource.
-    # To secure this in real prod, pass a temp token in query param.
+async def stream_session_results(request: Request, session_id: int, session: dict = Depends(token_owned_session)):
+    # EventSource cannot send headers, so this takes ?token= from POST /sessions/{id}/ws-token
     async def event_generator():
-        while True:
-            if await request.is_disconnected():
-                break
-            
-            # Fetch current state of this session's answers
-            data = await SessionRepository.fetch_results(session_id)
-            yield {
-                "event": "message",
-                "data": str(data) # In a real app, json.dumps this correctly handling dates
-            }
-            await asyncio.sleep(2) # Poll every 2 seconds
+        # Roster changes are pushed as soon as they happen; results are still sent every 2 seconds
+        roster_events = manager.subscribe_admin(session_id, {"roster"})
+        try:
+            yield {"event": "roster", "data": json.dumps(manager.roster(session_id))}
+            loop = asyncio.get_running_loop()
+            next_poll = loop.time()
+            while True:
+                if await request.is_disconnected():
+                    break
+
+                timeout = next_poll - loop.time()
+                if timeout > 0:
+                    try:
+                        event = await asyncio.wait_for(roster_events.queue.get(), timeout)
+                        yield {"event": "roster", "data": json.dumps(event)}
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+
+                # Fetch current state of this session's answers
+                data = await SessionRepository.fetch_results(session_id)
+                yield {
+                    "event": "message",
+                    "data": str(data) # In a real app, json.dumps this correctly handling dates
+                }
+                next_poll = loop.time() + 2 # Poll every 2 seconds
+        finally:
+            manager.unsubscribe_admin(session_id, roster_events)
 
     return EventSourceResponse(event_generator())
+
+@router.post("/sessions/{session_id}/ws-token")
+async def create_session_ws_token(session_id: int, current_user: dict = Depends(get_current_admin),
+                                  session: dict = Depends(owned_session)):
+    # Exchanged for the dashboard socket below; browsers cannot send Authorization on a handshake
+    return {"token": create_ws_token(current_user['username'], session_id), "expires_in": WS_TOKEN_EXPIRE_SECONDS}
+
+def _parse_topics(topics) -> set:
+    if topics is None:
+        return set(ADMIN_TOPICS)
+    if isinstance(topics, str):
+        topics = topics.split(",")
+    return {str(t).strip() for t in topics} & ADMIN_TOPICS
+
+async def _snapshot(session_id: int, topic: str) -> dict:
+    # Current state for a newly subscribed topic; events after this are deltas
+    if topic == "responses":
+        return {"type": "results", "results": await SessionRepository.fetch_results(session_id)}
+    if topic == "roster":
+        return manager.roster(session_id)
+    if topic == "stats":
+        return {"type": "stats", "questions": await stats_store.get_session(session_id)}
+    return {"type": "active_questions", "questions": await SessionRepository.get_active_questions(session_id)}
+
+async def _admin_writer(websocket: WebSocket, subscriber):
+    # The only task that sends on the socket, so snapshots and events never interleave
+    while True:
+        try:
+            message = await asyncio.wait_for(subscriber.queue.get(), settings.WS_PING_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            if time.monotonic() - subscriber.last_seen > settings.WS_IDLE_TIMEOUT_SECONDS:
+                await websocket.close(code=1001)
+                return
+            message = {"type": "ping"}
+        await websocket.send_json(jsonable_encoder(message))
+
+@router.websocket("/ws/{session_id}")
+async def admin_websocket(websocket: WebSocket, session_id: int, token: str = "", topics: Optional[str] = None):
+    """
+    One socket per open dashboard, multiplexing the 'responses', 'roster', 'stats' and
+    'questions' topics. Authenticated with a token from POST /sessions/{id}/ws-token;
+    ?topics= picks the initial topics and {"type": "subscribe", "topics": [...]} changes them.
+    """
+    if verify_ws_token(token, session_id) is None:
+        # Closing before accept rejects the handshake with a 403
+        await websocket.close(code=4401)
+        return
+
+    await websocket.accept()
+    subscriber = manager.subscribe_admin(session_id, _parse_topics(topics))
+    writer = asyncio.ensure_future(_admin_writer(websocket, subscriber))
+    try:
+        for topic in sorted(subscriber.topics):
+            subscriber.offer(await _snapshot(session_id, topic))
+        while True:
+            data = await websocket.receive_json()
+            subscriber.touch()
+            if data.get("type") == "subscribe":
+                wanted = _parse_topics(data.get("topics", []))
+                added = wanted - subscriber.topics
+                subscriber.topics = wanted
+                for topic in sorted(added):
+                    subscriber.offer(await _snapshot(session_id, topic))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Admin socket for session {session_id} failed: {e}")
+    finally:
+        writer.cancel()
+        manager.unsubscribe_admin(session_id, subscriber)
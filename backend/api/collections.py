@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
+from typing import List, Optional
 from api.admin_auth import get_current_admin
 from db.collection_repo import CollectionRepository
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from models.schemas import Collection, CollectionCreate, CollectionRename
 
 from datetime import datetime, timezone
@@ -12,6 +13,19 @@ router = APIRouter()
 async def get_collections(current_user: dict = Depends(get_current_admin)):
     return await CollectionRepository.get_all()
 
+@router.get("/collections/page")
+async def get_collections_page(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    q: Optional[str] = Query(None, description="Search over collection names"),
+    current_user: dict = Depends(get_current_admin)
+):
+    try:
+        items, next_cursor = await CollectionRepository.list_page(limit, cursor, q)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.post("/collections")
 async def create_collection(body: CollectionCreate, current_user: dict = Depends(get_current_admin)):
     c_id = await CollectionRepository.create(body.name)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from api.admin_auth import get_current_admin
+from core.config import settings
+from core.metrics import metrics
+from core.profiling import profiler, ProfilerBusy
+from core.tracing import traces
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_admin)):
+    return metrics.snapshot()
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = Query(10.0, gt=0), interval_ms: float = Query(5.0, ge=1, le=1000),
+                  all_threads: bool = False, current_user: dict = Depends(get_current_admin)):
+    """
+    Samples this worker's stacks for the given number of seconds and returns them as collapsed
+    stacks (flamegraph.pl, speedscope). Only the event loop thread unless all_threads is set.
+    """
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=422, detail=f"A profile can take at most {settings.PROFILE_MAX_SECONDS:g} seconds")
+    try:
+        return await profiler.profile(seconds, interval_ms / 1000, all_threads)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+
+@router.get("/traces")
+async def get_traces(limit: int = Query(50, ge=1, le=1000), current_user: dict = Depends(get_current_admin)):
+    # Requests sent with an X-Trace header, newest first
+    return traces.recent(limit)
@@ -1,24 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
 from api.admin_auth import get_current_admin
 from db.question_repo import QuestionRepository
-from models.schemas import Question, QuestionCreate
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from models.schemas import Question, QuestionCreate, QuestionPage
+from core.pregrade import parse_rubric
 
 from datetime import datetime, timezone
 
 router = APIRouter()
 
+def _check_rubric(question: QuestionCreate):
+    # Rejected here rather than failing on the first submit
+    if question.rubric:
+        try:
+            parse_rubric(question.rubric)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
 @router.get("/questions", response_model=List[Question])
 async def get_questions(current_user: dict = Depends(get_current_admin)):
     return await QuestionRepository.get_all()
 
+@router.get("/questions/page", response_model=QuestionPage)
+async def get_questions_page(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    collection_id: Optional[int] = Query(None),
+    q: Optional[str] = Query(None, description="Text search over question text"),
+    current_user: dict = Depends(get_current_admin)
+):
+    try:
+        items, next_cursor = await QuestionRepository.list_page(limit, cursor, collection_id, q)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/questions/{question_id}", response_model=Question)
+async def get_question(question_id: int, current_user: dict = Depends(get_current_admin)):
+    question = await QuestionRepository.get_by_id(question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return question
+
 @router.post("/questions", response_model=Question)
 async def create_question(question: QuestionCreate, current_user: dict = Depends(get_current_admin)):
+    _check_rubric(question)
     q_id = await QuestionRepository.create(question)
     return {**question.model_dump(), "id": q_id, "created_at": datetime.now(timezone.utc)}
 
 @router.put("/questions/{question_id}", response_model=Question)
 async def update_question(question_id: int, question: QuestionCreate, current_user: dict = Depends(get_current_admin)):
+    _check_rubric(question)
     success = await QuestionRepository.update(question_id, question)
     if not success:
         raise HTTPException(status_code=404, detail="Question not found")
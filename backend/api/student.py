@@ -1,66 +1,105 @@
-from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Depends, Header, WebSocket, WebSocketDisconnect
 from fastapi.encoders import jsonable_encoder
-from typing import List, Dict, Any
+from typing import Optional
+import hashlib
+import math
 from db.session_repo import SessionRepository
 from db.question_repo import QuestionRepository
 from db.student_repo import StudentRepository
 from models.schemas import StudentResponseCreate
-from core.ai_service import grade_response
+from core.ai_service import FAILED_FEEDBACK
+from core.graders import graders
+from core.tracing import span
+from core.rate_limit import submit_rate_limiter, grading_gate, GateSaturated, ws_accept_limiter
+from core.coalesce import IdempotentExecutor, IdempotencyConflict, LoadingCache
+from core.metrics import metrics
+from core.config import settings
+from core.stats import SessionStatsStore
+from core.clustering import ResponseClusterStore
+from core.dedup import GradeReuse, shingle
+from core.pregrade import pregrader
+from core.session_directory import SessionDirectory
+from core.connections import manager
+from core.sharding import local_shard
+from core.lifecycle import lifecycle, ShuttingDown
 
 router = APIRouter()
 
-class ConnectionManager:
-    def __init__(self):
-        # Format: { session_id: { websocket_object: "Student Name" } }
-        self.active_sessions: Dict[int, Dict[WebSocket, str]] = {}
+submissions = IdempotentExecutor(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_MAX_ENTRIES)
+stats_store = SessionStatsStore(StudentRepository.get_score_summary)
+grade_reuse = GradeReuse(settings.GRADE_REUSE_SIMILARITY)
+# Built the first time an admin opens a session's clusters, then kept up to date off the event loop
+response_clusters = ResponseClusterStore(SessionRepository.fetch_results, settings.CLUSTER_WORKERS,
+                                         settings.CLUSTER_SIMILARITY)
+# Join codes and socket handshakes resolve sessions from memory; warmed in main.startup_event
+session_directory = SessionDirectory(SessionRepository.get_by_code, SessionRepository.get_by_id, local_shard.owns)
 
-    async def connect(self, websocket: WebSocket, session_id: int):
-        await websocket.accept()
-        if session_id not in self.active_sessions:
-            self.active_sessions[session_id] = {}
-        # Initially anonymous until they send their name
-        self.active_sessions[session_id][websocket] = "Anonymous"
-
-    def disconnect(self, websocket: WebSocket, session_id: int):
-        if session_id in self.active_sessions:
-            if websocket in self.active_sessions[session_id]:
-                del self.active_sessions[session_id][websocket]
-
-    def update_name(self, websocket: WebSocket, session_id: int, name: str):
-        if session_id in self.active_sessions and websocket in self.active_sessions[session_id]:
-            self.active_sessions[session_id][websocket] = name
-
-    def get_connected_names(self, session_id: int) -> List[str]:
-        if session_id not in self.active_sessions:
-            return []
-        names = list(self.active_sessions[session_id].values())
-        return [n for n in names if n != "Anonymous"]
-
-    async def broadcast(self, session_id: int, message: dict):
-        if session_id in self.active_sessions:
-            connections = list(self.active_sessions[session_id].keys())
-            encoded_message = jsonable_encoder(message)
-            for connection in connections:
-                try:
-                    await connection.send_json(encoded_message)
-                except Exception:
-                    pass
-
-manager = ConnectionManager()
+async def _load_active_questions(session_id: int) -> list:
+    # Encoded once here rather than per socket
+    return jsonable_encoder(await SessionRepository.get_active_questions(session_id))
+
+# What every connecting socket is sent first. When a whole class reconnects at once they
+# share one query; admin launches and closes replace the entry as they broadcast it.
+active_questions = LoadingCache(_load_active_questions, ttl_seconds=30.0)
+
+def _too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
 
 @router.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: int):
+async def websocket_endpoint(websocket: WebSocket, session_id: int, name: Optional[str] = None,
+                             last_seq: Optional[int] = None, epoch: Optional[str] = None):
+    # Reconnecting clients pass ?name=&epoch=&last_seq= to get only the events they missed
+    if lifecycle.draining:
+        # Point the client at the replacement instead of holding a socket we are about to drop
+        await websocket.accept()
+        await websocket.send_json({"type": "reconnect", "retry_after_ms": int(lifecycle.RETRY_AFTER_SECONDS * 1000)})
+        await websocket.close(code=1012)
+        return
+
+    session = await session_directory.resolve_id(session_id)
+    if not session or session['status'] != 'active':
+        # Tell the client to stop reconnecting rather than leaving it in a retry loop
+        await websocket.accept()
+        await websocket.send_json({"type": "session_ended"})
+        await websocket.close()
+        return
+
+    retry_after = ws_accept_limiter.check()
+    if retry_after:
+        # Over the accept rate: hand back a jittered time to come back instead of queueing
+        await websocket.accept()
+        await websocket.send_json({"type": "reconnect", "retry_after_ms": int(retry_after * 1000)})
+        await websocket.close(code=1013)
+        return
+
     await manager.connect(websocket, session_id)
     try:
-        # Send current active questions immediately upon connecting
-        questions = await SessionRepository.get_active_questions(session_id)
-        
-        # Serialize datetime objects securely for raw websocket ingestion
-        encoded_questions = jsonable_encoder(questions)
-        await websocket.send_json({"type": "active_questions", "questions": encoded_questions})
-        
+        if name and name.strip():
+            manager.update_name(websocket, session_id, name.strip())
+
+        missed = None
+        if last_seq is not None:
+            missed = manager.replay(session_id, epoch, last_seq, name.strip() if name else None)
+        if missed is not None:
+            for message in missed:
+                await websocket.send_json(jsonable_encoder(message))
+            await websocket.send_json({"type": "resumed", "replayed": len(missed), **manager.position(session_id)})
+            metrics.increment("ws.resumed")
+        else:
+            # Position first: anything sequenced while the questions load is also delivered live
+            position = manager.position(session_id)
+            # Send current active questions immediately upon connecting
+            questions, how = await active_questions.get(session_id)
+            metrics.increment(f"ws.connect_questions_{how}")
+            await websocket.send_json({"type": "active_questions", "questions": questions, **position})
+
         while True:
             data = await websocket.receive_json()
+            manager.touch(websocket)
             if data.get("type") == "join" and data.get("name"):
                 manager.update_name(websocket, session_id, str(data.get("name")).strip())
     except WebSocketDisconnect:
@@ -70,7 +109,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
 
 @router.post("/join/{code}")
 async def join_session(code: str):
-    session = await SessionRepository.get_by_code(code)
+    session = await session_directory.resolve_code(code)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found or invalid code")
     if session['status'] != 'active':
@@ -81,19 +120,62 @@ async def join_session(code: str):
 @router.get("/session/{session_id}/active-questions")
 async def get_active_questions(session_id: int):
     # First check if session is closed to auto-kick students
-    session_data = await SessionRepository.get_by_id(session_id)
+    session_data = await session_directory.resolve_id(session_id)
     if not session_data or session_data['status'] != 'active':
         raise HTTPException(status_code=400, detail="This session is no longer active")
 
     # Returns the questions currently open for this session
-    questions = await SessionRepository.get_active_questions(session_id)
+    questions, _ = await active_questions.get(session_id)
     return questions
 
+def _submission_key(session_question_id: int, response: StudentResponseCreate, idempotency_key: Optional[str]) -> str:
+    # Client keys are scoped to the question instance and the student, so two students
+    # sending the same key (a counter, "1") never share a result
+    if idempotency_key:
+        return f"{session_question_id}:{response.student_name.strip()}:key:{idempotency_key}"
+    digest = hashlib.sha256(
+        f"{response.student_name.strip()}\0{response.response_text.strip()}".encode("utf-8")
+    ).hexdigest()
+    return f"{session_question_id}:hash:{digest}"
+
 @router.post("/session/{session_id}/question/{question_id}/instance/{session_question_id}/submit")
-async def submit_response(session_id: int, question_id: int, session_question_id: int, response: StudentResponseCreate):
+async def submit_response(session_id: int, question_id: int, session_question_id: int, response: StudentResponseCreate,
+                          idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    # Double-taps and network retries share one grading call and one stored row
+    key = _submission_key(session_question_id, response, idempotency_key)
+    fingerprint = hashlib.sha256(response.response_text.strip().encode("utf-8")).hexdigest() if idempotency_key else None
+    try:
+        result, outcome = await submissions.run(
+            key, lambda: _process_submission(session_id, question_id, session_question_id, response), fingerprint
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different answer")
+    if outcome != "executed":
+        metrics.increment(f"submit.duplicate_{outcome}")
+    return result
+
+async def _process_submission(session_id: int, question_id: int, session_question_id: int, response: StudentResponseCreate) -> dict:
+    # Tracked so a restart waits for the grade to be saved instead of dropping it
+    try:
+        async with lifecycle.track():
+            return await _grade_and_save(session_id, question_id, session_question_id, response)
+    except ShuttingDown as sd:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is restarting, please submit again in a few seconds",
+            headers={"Retry-After": str(max(1, math.ceil(sd.retry_after)))}
+        )
+
+async def _grade_and_save(session_id: int, question_id: int, session_question_id: int, response: StudentResponseCreate) -> dict:
+    # Cheap in-process check before any DB or LLM work
+    retry_after = await submit_rate_limiter.check(session_id, response.student_name)
+    if retry_after:
+        raise _too_many_requests("Too many submissions, please wait a moment and try again", retry_after)
+
     # Retrieve the question and session details
     question = await QuestionRepository.get_by_id(question_id)
-    session = await SessionRepository.get_by_id(session_id)
+    # Uncached: another worker may have just closed the session
+    session = await SessionRepository.get_live(session_id)
 
     if not question or not session:
         raise HTTPException(status_code=404, detail="Question or session not found")
@@ -101,13 +183,37 @@ async def submit_response(session_id: int, question_id: int, session_question_id
     if session['status'] != 'active':
         raise HTTPException(status_code=400, detail="This session is closed")
 
-    # Grade the response
-    score, feedback = await grade_response(
-        question_text=question['text'],
-        grading_criteria=question['grading_criteria'],
-        student_response=response.response_text,
-        ai_model=session['ai_model']
-    )
+    # Forward partial feedback to the submitting student's socket while the model is still writing
+    async def forward_feedback(partial: str):
+        await manager.send(session_id, {
+            "type": "feedback_delta",
+            "session_question_id": session_question_id,
+            "feedback": partial
+        }, student_name=response.student_name)
+
+    # Blank answers, "idk", the question pasted back and answer-key matches are decided locally.
+    # Otherwise a near-duplicate of an answer already graded for this question gets the same grade.
+    shingled = reused = None
+    pregraded = pregrader.grade(question, response.response_text)
+    if pregraded is None:
+        shingled = shingle(response.response_text)
+        reused = grade_reuse.find(session_question_id, shingled)
+    graded_from = reused.response_id if reused else None
+    if pregraded:
+        score, feedback, graded_by = pregraded.score, pregraded.feedback, "pregrade"
+    elif reused:
+        score, feedback, graded_by = reused.score, reused.feedback, "reuse"
+        metrics.increment("grading.reused")
+    else:
+        # Grade the response, bounded by the global grading admission gate and this session's share of it
+        try:
+            async with grading_gate.admit(session_id):
+                with span("grade"):
+                    score, feedback, graded_by = await graders.grade(
+                        question, response.response_text, ai_model=session['ai_model'], on_feedback=forward_feedback
+                    )
+        except GateSaturated as gs:
+            raise _too_many_requests("Grading is busy, please try again shortly", gs.retry_after)
 
     # Save the response
     response_id = await StudentRepository.save_response(
@@ -117,22 +223,42 @@ async def submit_response(session_id: int, question_id: int, session_question_id
         student_name=response.student_name,
         response_text=response.response_text,
         ai_score=score,
-        ai_feedback=feedback
+        ai_feedback=feedback,
+        graded_by=graded_by,
+        graded_from=graded_from
     )
+    if shingled and not reused and feedback not in FAILED_FEEDBACK:
+        grade_reuse.add(session_question_id, shingled, response_id, score, feedback)
+
+    # Only dashboards get the response event; the student gets just their own result
+    with span("broadcast"):
+        await manager.send(session_id, {
+            "type": "new_response",
+            "question_id": question_id,
+            "session_question_id": session_question_id,
+            "response": {
+                "id": response_id,
+                "student_name": response.student_name,
+                "response_text": response.response_text,
+                "ai_score": score,
+                "ai_feedback": feedback,
+                "graded_by": graded_by,
+                "graded_from": graded_from,
+                "created_at": "Just now"
+            }
+        })
+        await manager.send(session_id, {
+            "type": "grading_result",
+            "session_question_id": session_question_id,
+            "response_id": response_id,
+            "score": score,
+            "feedback": feedback
+        }, student_name=response.student_name)
 
-    # Broadcast explicitly via Websockets so Admin dashboard updates in real-time
-    await manager.broadcast(session_id, {
-        "type": "new_response",
-        "question_id": question_id,
-        "session_question_id": session_question_id,
-        "response": {
-            "id": response_id,
-            "student_name": response.student_name,
-            "response_text": response.response_text,
-            "ai_score": score,
-            "ai_feedback": feedback,
-            "created_at": "Just now"
-        }
-    })
+    # Compact aggregate update so charts can refresh without the response bodies
+    question_stats = await stats_store.record(session_id, session_question_id, score)
+    with span("broadcast.stats"):
+        await manager.send(session_id, {"type": "stats_update", "stats": question_stats})
+    await response_clusters.record(session_id, session_question_id, response_id, response.response_text)
             
     return {"message": "Response submitted successfully", "response_id": response_id, "score": score, "feedback": feedback}
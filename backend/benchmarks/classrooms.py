@@ -0,0 +1,143 @@
+"""
+Concurrent classrooms on one instance: C sessions (each owned by its own admin) run at the
+same time with S students apiece. Every student opens a socket, answers the open question
+over HTTP at a random moment within the spread, and waits for its grading result on the
+socket. Runs the app under uvicorn in this process on the in-process backend with mocked
+grading (or, with a model other than test-model, against OPENROUTER_URL; see
+benchmarks/openrouter_stub.py for realistic grading latency offline), and reports submit-to-result latency per classroom plus any message that reached
+a socket of the wrong session or the wrong student.
+
+    cd backend && python -m benchmarks.classrooms [classrooms] [students] [spread_seconds] [model]
+"""
+import os
+os.environ["DATABASE_URL"] = "memory://"
+
+import asyncio
+import json
+import logging
+import random
+import socket
+import sys
+import time
+import httpx
+import uvicorn
+import websockets
+from urllib.parse import quote
+from main import app
+from db.admin_repo import AdminUserRepository
+from db.question_repo import QuestionRepository
+from db.session_repo import SessionRepository
+from models.schemas import QuestionCreate, SessionCreate
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _open(url: str):
+    # Follows the accept limiter's reconnect hints until the first snapshot arrives
+    while True:
+        ws = await websockets.connect(url, open_timeout=60)
+        message = json.loads(await ws.recv())
+        if message["type"] != "reconnect":
+            return ws, message
+        await ws.close()
+        await asyncio.sleep(message["retry_after_ms"] / 1000)
+
+async def _student(base: str, http: httpx.AsyncClient, classroom: dict, name: str, spread: float,
+                   latencies: list, leaks: list, rejected: list):
+    session_id = classroom["session_id"]
+    ws, snapshot = await _open(f"{base.replace('http', 'ws')}/api/student/ws/{session_id}?name={quote(name)}")
+    try:
+        own = {q["session_question_id"] for q in snapshot["questions"]}
+        if own != {classroom["session_question_id"]}:
+            leaks.append((session_id, name, snapshot))
+        await asyncio.sleep(random.uniform(0, spread))
+
+        url = (f"{base}/api/student/session/{session_id}/question/{classroom['question_id']}"
+               f"/instance/{classroom['session_question_id']}/submit")
+        started = time.perf_counter()
+        while True:
+            response = await http.post(url, json={"student_name": name, "response_text": f"{name}'s answer"})
+            if response.status_code != 429:
+                break
+            rejected.append(session_id)
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+        response.raise_for_status()
+        response_id = response.json()["response_id"]
+
+        while True:
+            message = json.loads(await ws.recv())
+            if message["type"] == "grading_result" and message["response_id"] != response_id:
+                leaks.append((session_id, name, message))
+                continue
+            if message["type"] == "active_questions" and \
+                    {q["session_question_id"] for q in message["questions"]} - own:
+                leaks.append((session_id, name, message))
+            if message["type"] == "grading_result":
+                latencies.append(time.perf_counter() - started)
+                return
+            if message["type"] == "ping":
+                await ws.send(json.dumps({"type": "pong"}))
+    finally:
+        await ws.close()
+
+async def _seed(classrooms: int, ai_model: str) -> list:
+    rooms = []
+    for c in range(classrooms):
+        username = f"teacher{c}"
+        await AdminUserRepository.create(username, username)
+        admin = await AdminUserRepository.get_by_username(username)
+        code = await SessionRepository.create(SessionCreate(ai_model=ai_model), admin["id"])
+        session_id = (await SessionRepository.get_by_code(code))["id"]
+        question_id = await QuestionRepository.create(QuestionCreate(
+            text=f"Classroom {c} question", grading_criteria="N/A", collection_id=1))
+        sq_id = await SessionRepository.launch_question(session_id, question_id)
+        rooms.append({"session_id": session_id, "question_id": question_id, "session_question_id": sq_id})
+    return rooms
+
+async def main(classrooms: int, students: int, spread: float, ai_model: str):
+    logging.disable(logging.WARNING)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", ws_max_queue=32))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    rooms = await _seed(classrooms, ai_model)
+    base = f"http://127.0.0.1:{port}"
+    per_room = {room["session_id"]: [] for room in rooms}
+    leaks, rejected = [], []
+    limits = httpx.Limits(max_connections=classrooms * students)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _student(base, http, room, f"Student {s}", spread,
+                     per_room[room["session_id"]], leaks, rejected)
+            for room in rooms for s in range(students)
+        ))
+        elapsed = time.perf_counter() - start
+
+    def pct(values, p):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * p))]
+
+    everything = [l for latencies in per_room.values() for l in latencies]
+    print(f"classrooms x students:   {classrooms} x {students} ({len(everything)} graded in {elapsed:.2f}s)")
+    print(f"submit->result p50/p95:  {pct(everything, 0.5) * 1000:.1f}ms / {pct(everything, 0.95) * 1000:.1f}ms")
+    worst = max(per_room.items(), key=lambda item: pct(item[1], 0.95))
+    print(f"slowest classroom p95:   {pct(worst[1], 0.95) * 1000:.1f}ms (session {worst[0]})")
+    print(f"submits told to retry:   {len(rejected)}")
+    print(f"cross-session messages:  {len(leaks)}")
+    for leak in leaks[:5]:
+        print(f"  session {leak[0]} / {leak[1]}: {leak[2]}")
+
+    server.should_exit = True
+    await serving
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if args else 20,
+                     int(args[1]) if len(args) > 1 else 30,
+                     float(args[2]) if len(args) > 2 else 5.0,
+                     args[3] if len(args) > 3 else "test-model"))
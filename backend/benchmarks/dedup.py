@@ -0,0 +1,117 @@
+"""
+Near-duplicate grade reuse at 1,000 responses per question.
+
+Feeds generated answers to one question instance through the LSH index the submit path
+uses, the way submissions arrive: look up, and index the answer if it had to be graded.
+Reports lookups per second and answers compared per lookup against a brute-force scan of
+every graded answer, plus precision (reused grades that came from the same answer) and
+recall (repeats that were found) at each threshold.
+
+    cd backend && python -m benchmarks.dedup [responses] [questions]
+"""
+import random
+import string
+import sys
+import time
+from core.dedup import NearDuplicateIndex, NEGATIONS, jaccard, shingle
+
+THRESHOLDS = (0.8, 0.9, 1.0)
+
+def answers(n: int, seed: int = 7) -> list:
+    """
+    n answers to one question as (group, text). Answers in a group are the same answer
+    up to case, punctuation, word order and repeated words; a negated answer or one
+    with a few words swapped is a group of its own.
+    """
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(400)]
+    bases, out, negated = [], [], set()
+    for _ in range(n):
+        roll = rng.random()
+        if not bases or roll < 0.15:
+            bases.append(rng.sample(vocab, rng.randint(3, 25)))
+            out.append((len(bases) - 1, " ".join(bases[-1])))
+        elif roll < 0.25:
+            # Hard negatives: the same words with a negation, or with three words replaced
+            source = rng.randrange(len(bases))
+            words = list(bases[source])
+            if rng.random() < 0.5 and source not in negated and not NEGATIONS & shingle(" ".join(words)).words:
+                negated.add(source)
+                words.insert(rng.randrange(len(words) + 1), rng.choice(["not", "never", "isn't"]))
+            else:
+                unused = [w for w in vocab if w not in words]
+                for i in rng.sample(range(len(words)), min(3, len(words))):
+                    words[i] = rng.choice(unused)
+            bases.append(words)
+            out.append((len(bases) - 1, " ".join(words)))
+        else:
+            group = rng.randrange(len(bases))
+            words = list(bases[group])
+            if rng.random() < 0.5:
+                rng.shuffle(words)
+            if rng.random() < 0.3:
+                words.append(rng.choice(words))
+            words = [w.upper() if rng.random() < 0.1 else w.capitalize() if rng.random() < 0.2 else w for w in words]
+            text = " ".join(w + rng.choice(["", "", ",", ".", "!"]) for w in words)
+            out.append((group, text))
+    return out
+
+class _BruteForce:
+    """Exact comparison against every graded answer, for reference."""
+    def __init__(self):
+        self.entries = []
+
+    def find(self, shingled, threshold):
+        best = None
+        for words, response_id in self.entries:
+            similarity = jaccard(shingled.words, words)
+            if similarity >= threshold and not (shingled.words ^ words) & NEGATIONS:
+                if best is None or similarity > best[1]:
+                    best = (response_id, similarity)
+        return best
+
+    def add(self, shingled, response_id, score, feedback):
+        self.entries.append((shingled.words, response_id))
+
+def run(make_index, stream: list, threshold: float) -> dict:
+    index = make_index()
+    group_of, seen, true_pos, false_pos, false_neg, reused = {}, set(), 0, 0, 0, 0
+    started = time.perf_counter()
+    for response_id, (group, text) in enumerate(stream):
+        shingled = shingle(text)
+        match = index.find(shingled, threshold)
+        if match is None:
+            index.add(shingled, response_id, 3, "feedback")
+            if group in seen:
+                false_neg += 1
+        else:
+            reused += 1
+            matched = match.response_id if hasattr(match, "response_id") else match[0]
+            if group_of[matched] == group:
+                true_pos += 1
+            else:
+                false_pos += 1
+        group_of[response_id] = group
+        seen.add(group)
+    elapsed = time.perf_counter() - started
+    return {
+        "per_second": len(stream) / elapsed,
+        "reused": reused,
+        "precision": true_pos / (true_pos + false_pos) if true_pos + false_pos else 1.0,
+        "recall": true_pos / (true_pos + false_neg) if true_pos + false_neg else 1.0,
+    }
+
+def main(responses: int, questions: int):
+    streams = [answers(responses, seed=q) for q in range(questions)]
+    print(f"{responses} responses per question, {questions} question(s)")
+    print(f"{'threshold':>9} {'index':>12} {'lookups/s':>10} {'reused':>7} {'precision':>9} {'recall':>7}")
+    for threshold in THRESHOLDS:
+        for name, make_index in (("lsh", NearDuplicateIndex), ("brute force", _BruteForce)):
+            runs = [run(make_index, stream, threshold) for stream in streams]
+            avg = {k: sum(r[k] for r in runs) / len(runs) for k in runs[0]}
+            print(f"{threshold:>9} {name:>12} {avg['per_second']:>10,.0f} {avg['reused']:>7,.0f} "
+                  f"{avg['precision']:>9.3f} {avg['recall']:>7.3f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,78 @@
+"""
+Grader backend latency and throughput.
+
+Grades generated answers to one question through the grader chain the submit path uses,
+with `concurrency` submits in flight, and prints each backend's latency percentiles and
+grades per second from the metrics registry. The local classifier is trained on the first
+`train` answers, graded by group, and reports how often it abstained and how often its
+grade matched. "openrouter" only calls the model with OPENROUTER_API_KEY set (and a real
+model name as the third argument); otherwise it is the mock, which costs nothing.
+
+    cd backend && python -m benchmarks.graders [backends] [answers] [model] [concurrency]
+"""
+import asyncio
+import sys
+import time
+from benchmarks.dedup import answers
+from core.config import settings
+from core.graders import GraderChain, OpenRouterGrader
+from core.local_grader import LocalGrader
+from core.metrics import metrics
+
+TRAIN = 500
+
+def _score(group: int) -> int:
+    return group % 5
+
+async def main(backends: str, n: int, ai_model: str, concurrency: int):
+    stream = answers(TRAIN + n)
+    graded = [{"response_text": text, "ai_score": _score(group), "ai_feedback": f"group {group}"}
+              for group, text in stream[:TRAIN]]
+
+    async def loader(question_id, limit):
+        return graded[-limit:]
+
+    chain = GraderChain([
+        LocalGrader(loader, settings.LOCAL_GRADER_WORKERS, settings.LOCAL_GRADER_MIN_EXAMPLES,
+                    settings.LOCAL_GRADER_MIN_SIMILARITY, settings.LOCAL_GRADER_RETRAIN_SECONDS)
+        if name.strip() == LocalGrader.name else OpenRouterGrader()
+        for name in backends.split(",")
+    ])
+    for backend in chain.backends:
+        if isinstance(backend, LocalGrader):
+            # Train every worker up front so the timings are of grading, not of the first fit
+            await asyncio.gather(*(backend.grade({"id": 1}, "warm up") for _ in range(backend.workers * 4)))
+
+    question = {"id": 1, "text": "Generated question", "grading_criteria": "Generated criteria"}
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(group, text):
+        async with semaphore:
+            score, _, graded_by = await chain.grade(question, text, ai_model=ai_model, on_feedback=None)
+            results.append((graded_by, score == _score(group)))
+
+    metrics.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(group, text) for group, text in stream[TRAIN:]))
+    elapsed = time.perf_counter() - started
+    chain.shutdown()
+
+    snapshot = metrics.snapshot()
+    print(f"{n} answers, {concurrency} in flight, {TRAIN} graded examples, {n / elapsed:,.0f} answers/s overall")
+    print(f"{'backend':>10} {'attempts':>8} {'graded':>7} {'p50 ms':>8} {'p95 ms':>8} {'graded/s':>9} {'matched':>8}")
+    for backend in chain.backends:
+        timing = snapshot["timings"].get(f"grading.{backend.name}.seconds")
+        if timing is None:
+            continue
+        mine = [ok for name, ok in results if name == backend.name]
+        graded_count = snapshot["counters"].get(f"grading.{backend.name}.graded", 0)
+        print(f"{backend.name:>10} {timing['count']:>8} {graded_count:>7} {timing['p50'] * 1000:>8.2f} "
+              f"{timing['p95'] * 1000:>8.2f} {graded_count / elapsed:>9,.0f} "
+              f"{(sum(mine) / len(mine) if mine else 0.0):>8.1%}")
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "local,openrouter",
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+                     sys.argv[3] if len(sys.argv) > 3 else "test-model",
+                     int(sys.argv[4]) if len(sys.argv) > 4 else settings.GRADING_MAX_CONCURRENCY))
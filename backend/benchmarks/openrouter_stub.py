@@ -0,0 +1,205 @@
+"""
+Local stand-in for the OpenRouter chat completions API, for load tests of the grading path.
+
+Answers POST /api/v1/chat/completions like OpenRouter does, blocking or streamed over SSE,
+after a latency drawn from a configurable distribution, and fails a configurable share of
+calls: HTTP 500s, replies that are not JSON, and periodic bursts of 429s. Configured from
+STUB_* environment variables (see StubSettings). Point the backend at it with
+
+    OPENROUTER_URL=http://127.0.0.1:9000/api/v1/chat/completions OPENROUTER_API_KEY=stub
+
+and use any session model but test-model, which is always mocked in-process.
+
+Modes (STUB_MODE):
+  synthetic  grades are made up, deterministically from the prompt
+  record     calls are forwarded to STUB_UPSTREAM and each exchange is appended to STUB_CASSETTE
+  replay     exchanges are answered from STUB_CASSETTE, with their recorded latency
+
+    cd backend && python -m benchmarks.openrouter_stub [port]
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, Optional
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_settings import BaseSettings
+
+logger = logging.getLogger(__name__)
+
+class StubSettings(BaseSettings):
+    MODE: str = "synthetic"
+    # Delay before the reply (or its first streamed chunk), in seconds:
+    # fixed:<s> | uniform:<low>,<high> | normal:<mean>,<sd> | lognormal:<median>,<sigma>
+    LATENCY: str = "lognormal:0.8,0.5"
+    # Between streamed chunks, and characters of content per chunk
+    STREAM_CHUNK_SECONDS: float = 0.02
+    STREAM_CHUNK_CHARS: int = 8
+    # Shares of calls answered with a 500, and with content that is not JSON
+    ERROR_RATE: float = 0.0
+    INVALID_JSON_RATE: float = 0.0
+    # Every RATE_LIMIT_EVERY seconds, all calls get 429 for RATE_LIMIT_BURST seconds (0: never)
+    RATE_LIMIT_EVERY: float = 0.0
+    RATE_LIMIT_BURST: float = 0.0
+    # Same seed, same prompts in the same order: same grades, delays and failures
+    SEED: int = 0
+    UPSTREAM: str = "https://openrouter.ai/api/v1/chat/completions"
+    CASSETTE: str = "openrouter_cassette.jsonl"
+    # Replayed delays are multiplied by this (0 replays as fast as possible)
+    REPLAY_SPEED: float = 1.0
+
+    class Config:
+        env_prefix = "STUB_"
+
+def latency_sampler(spec: str, rng: random.Random) -> Callable[[], float]:
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    shapes = {
+        "fixed": (1, lambda s: s),
+        "uniform": (2, lambda low, high: rng.uniform(low, high)),
+        "normal": (2, lambda mean, sd: rng.gauss(mean, sd)),
+        "lognormal": (2, lambda median, sigma: rng.lognormvariate(math.log(median), sigma)),
+    }
+    if kind not in shapes or len(values) != shapes[kind][0]:
+        raise ValueError(f"Bad latency spec {spec!r}: expected fixed:<s>, uniform:<low>,<high>, "
+                         f"normal:<mean>,<sd> or lognormal:<median>,<sigma>")
+    _, draw = shapes[kind]
+    return lambda: max(0.0, draw(*values))
+
+def exchange_key(payload: dict) -> str:
+    # Only what decides the reply; whether it was streamed does not
+    return hashlib.sha256(json.dumps([payload.get("model"), payload.get("messages")], sort_keys=True).encode()).hexdigest()
+
+FEEDBACK = ["This does not answer the question.", "This misses the main idea.", "Partly right, but incomplete.",
+            "Mostly right; add a little more detail.", "Correct and clearly explained."]
+
+def synthetic_content(payload: dict) -> str:
+    digest = hashlib.sha256(json.dumps(payload.get("messages"), sort_keys=True).encode()).digest()
+    score = digest[0] % len(FEEDBACK)
+    return json.dumps({"score": score, "feedback": FEEDBACK[score]})
+
+def load_cassette(path: str) -> Dict[str, deque]:
+    exchanges: Dict[str, deque] = defaultdict(deque)
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    exchanges[entry["key"]].append(entry)
+    except FileNotFoundError:
+        pass
+    return exchanges
+
+def _completion(model: str, content: str) -> dict:
+    return {"id": "gen-stub", "object": "chat.completion", "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]}
+
+def _error(status: int, message: str, headers: Optional[dict] = None) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": {"code": status, "message": message}}, headers=headers)
+
+def create_app(config: StubSettings, upstream: Optional[httpx.AsyncBaseTransport] = None) -> FastAPI:
+    """upstream overrides the transport used to reach STUB_UPSTREAM in record mode."""
+    if config.MODE not in ("synthetic", "record", "replay"):
+        raise ValueError(f"STUB_MODE must be synthetic, record or replay, not {config.MODE!r}")
+    rng = random.Random(config.SEED)
+    delay = latency_sampler(config.LATENCY, rng)
+    cassette = load_cassette(config.CASSETTE) if config.MODE == "replay" else {}
+    started = time.monotonic()
+    app = FastAPI(title="OpenRouter stub")
+    app.state.calls = 0
+
+    def rate_limited() -> Optional[float]:
+        if config.RATE_LIMIT_EVERY <= 0:
+            return None
+        into = (time.monotonic() - started) % config.RATE_LIMIT_EVERY
+        return config.RATE_LIMIT_BURST - into if into < config.RATE_LIMIT_BURST else None
+
+    async def forward(payload: dict, headers: dict) -> tuple:
+        # Always recorded as a blocking call; the stub streams it back itself if asked to
+        body = {k: v for k, v in payload.items() if k != "stream"}
+        call_started = time.perf_counter()
+        async with httpx.AsyncClient(transport=upstream) as client:
+            resp = await client.post(config.UPSTREAM, json=body, timeout=60.0,
+                                     headers={k: v for k, v in headers.items() if k.lower() in ("authorization", "http-referer", "x-title")})
+        seconds = time.perf_counter() - call_started
+        content = resp.json()["choices"][0]["message"]["content"] if resp.status_code == 200 else None
+        with open(config.CASSETTE, "a") as f:
+            f.write(json.dumps({"key": exchange_key(payload), "model": payload.get("model"), "messages": payload.get("messages"),
+                                "status": resp.status_code, "content": content, "body": None if content is not None else resp.text,
+                                "seconds": round(seconds, 4)}) + "\n")
+        return resp.status_code, content, resp.text
+
+    def replay(payload: dict) -> Optional[dict]:
+        recorded = cassette.get(exchange_key(payload))
+        if not recorded:
+            return None
+        # Repeats of one prompt play back in recorded order, then start over
+        entry = recorded[0]
+        recorded.rotate(-1)
+        return entry
+
+    async def stream(model: str, content: str, first_delay: float):
+        await asyncio.sleep(first_delay)
+        yield ": OPENROUTER PROCESSING\n\n"
+        step = max(1, config.STREAM_CHUNK_CHARS)
+        for i in range(0, len(content), step):
+            chunk = {"id": "gen-stub", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(config.STREAM_CHUNK_SECONDS)
+        yield "data: [DONE]\n\n"
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        model = payload.get("model", "stub")
+        app.state.calls += 1
+
+        if config.MODE == "record":
+            status, content, text = await forward(payload, dict(request.headers))
+            if content is None:
+                return _error(status, text)
+            wait = 0.0
+        elif config.MODE == "replay":
+            entry = replay(payload)
+            if entry is None:
+                return _error(404, "No recorded exchange for this request")
+            wait = entry["seconds"] * config.REPLAY_SPEED
+            if entry["content"] is None:
+                await asyncio.sleep(wait)
+                return _error(entry["status"], entry["body"] or "Recorded error")
+            content = entry["content"]
+        else:
+            # Drawn in arrival order whatever the outcome, so a run is reproducible from the seed
+            wait, roll = delay(), rng.random()
+            retry_after = rate_limited()
+            if retry_after is not None:
+                return _error(429, "Rate limit exceeded", {"Retry-After": str(max(1, math.ceil(retry_after)))})
+            if roll < config.ERROR_RATE:
+                await asyncio.sleep(wait)
+                return _error(500, "Internal Server Error")
+            content = ("Sorry, I cannot grade that." if roll < config.ERROR_RATE + config.INVALID_JSON_RATE
+                       else synthetic_content(payload))
+
+        if payload.get("stream"):
+            return StreamingResponse(stream(model, content, wait), media_type="text/event-stream")
+        await asyncio.sleep(wait)
+        return _completion(model, content)
+
+    return app
+
+def main(port: int):
+    import uvicorn
+    config = StubSettings()
+    logger.warning(f"OpenRouter stub ({config.MODE}) on http://127.0.0.1:{port}/api/v1/chat/completions")
+    uvicorn.run(create_app(config), port=port, log_level="warning")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 9000)
@@ -0,0 +1,87 @@
+"""
+Thundering-herd reconnect: N student sockets connect to one session at the same moment,
+as after a classroom access point drops. Runs the app under uvicorn in this process on
+the in-process backend, follows the server's reconnect hints, and reports how long the
+whole class took to get its first snapshot, how many were deferred, and how many
+active-question queries the connect path issued.
+
+    cd backend && python -m benchmarks.reconnect_storm [sockets]
+"""
+import os
+os.environ["DATABASE_URL"] = "memory://"
+
+import asyncio
+import json
+import logging
+import socket
+import sys
+import time
+import uvicorn
+import websockets
+from main import app
+from core.metrics import metrics
+from db.question_repo import QuestionRepository
+from db.admin_repo import AdminUserRepository
+from db.session_repo import SessionRepository
+from models.schemas import QuestionCreate, SessionCreate
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _student(url: str, start: float, results: list):
+    deferred = 0
+    while True:
+        async with websockets.connect(url, open_timeout=60) as ws:
+            message = json.loads(await ws.recv())
+            if message["type"] == "reconnect":
+                deferred += 1
+                await asyncio.sleep(message["retry_after_ms"] / 1000)
+                continue
+            results.append((time.perf_counter() - start, deferred))
+            return
+
+async def main(sockets: int):
+    logging.disable(logging.INFO)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", ws_max_queue=32))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    admin = await AdminUserRepository.get_by_username("admin")
+    code = await SessionRepository.create(SessionCreate(ai_model="bench"), admin['id'])
+    session_id = (await SessionRepository.get_by_code(code))['id']
+    for i in range(3):
+        question_id = await QuestionRepository.create(QuestionCreate(
+            text=f"Question {i}", grading_criteria="N/A", collection_id=1))
+        await SessionRepository.launch_question(session_id, question_id)
+    metrics.reset()
+
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _student(f"ws://127.0.0.1:{port}/api/student/ws/{session_id}?name=Student%20{i}", start, results)
+        for i in range(sockets)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[0] for r in results)
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    queries = snapshot["timings"].get("db.query.session_question.active", {}).get("count", 0)
+    print(f"sockets:                 {sockets}")
+    print(f"all connected after:     {elapsed:.2f}s")
+    print(f"first snapshot p50/p95:  {latencies[len(latencies) // 2]:.3f}s / {latencies[int(len(latencies) * 0.95)]:.3f}s")
+    print(f"deferred by limiter:     {counters.get('ws.accept_deferred', 0)} "
+          f"({sum(1 for r in results if r[1])} students retried)")
+    print(f"active-question queries: {queries}")
+    print("connect path:            " + ", ".join(
+        f"{how}={counters.get(f'ws.connect_questions_{how}', 0)}" for how in ("loaded", "coalesced", "hit")))
+
+    server.should_exit = True
+    await serving
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,82 @@
+"""
+Bytes on the wire per classroom scenario, uncompressed vs compressed.
+
+Seeds the in-process backend with a class of N students answering Q questions, then
+measures the dashboard results payload over HTTP (identity / gzip) and the
+active_questions socket payload as sent to every student, raw and with permessage-deflate.
+
+    cd backend && python -m benchmarks.wire_bytes
+"""
+import os
+os.environ["DATABASE_URL"] = "memory://"
+
+import asyncio
+import json
+import logging
+import random
+import zlib
+from httpx import AsyncClient
+from main import app
+from db.memory_repo import store
+from db.question_repo import QuestionRepository
+from db.admin_repo import AdminUserRepository
+from db.session_repo import SessionRepository
+from db.student_repo import StudentRepository
+from models.schemas import QuestionCreate, SessionCreate
+
+SCENARIOS = [(30, 5), (100, 5), (300, 5)]
+WORDS = ("the cell membrane regulates transport because proteins form channels that "
+         "let ions pass while lipids block charged molecules so gradients are kept").split()
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+def _deflate(payload: bytes) -> int:
+    # permessage-deflate: raw DEFLATE with the trailing 00 00 ff ff removed (RFC 7692)
+    c = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return len(c.compress(payload) + c.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+async def _seed(students: int, questions: int) -> int:
+    rng = random.Random(students)
+    store.reset()
+    admin = await AdminUserRepository.get_by_username("admin")
+    code = await SessionRepository.create(SessionCreate(ai_model="bench"), admin['id'])
+    session_id = (await SessionRepository.get_by_code(code))['id']
+    for q in range(questions):
+        question_id = await QuestionRepository.create(QuestionCreate(
+            text=f"Q{q}: {_text(rng, 25)}?", grading_criteria=_text(rng, 40), collection_id=1))
+        sq_id = await SessionRepository.launch_question(session_id, question_id)
+        for s in range(students):
+            await StudentRepository.save_response(
+                session_id=session_id, question_id=question_id, session_question_id=sq_id,
+                student_name=f"Student {s}", response_text=_text(rng, 50),
+                ai_score=rng.randint(0, 4), ai_feedback=_text(rng, 60))
+    return session_id
+
+async def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        encodings = ["identity", "gzip"]
+        print(f"{'students':>8} {'questions':>9} | " + " ".join(f"results {e:>8}" for e in encodings)
+              + " | ws active_questions raw / deflate (x students)")
+        for students, questions in SCENARIOS:
+            session_id = await _seed(students, questions)
+            login = await client.post("/api/admin/login", data={"username": "admin", "password": "admin"})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            # Raw bytes as received, before httpx decodes them
+            sizes = [len(await _raw_body(client, session_id, headers, encoding)) for encoding in encodings]
+
+            active = await SessionRepository.get_active_questions(session_id)
+            payload = json.dumps({"type": "active_questions", "questions": active},
+                                 default=str, separators=(",", ":"), ensure_ascii=False).encode()
+            print(f"{students:>8} {questions:>9} | " + " ".join(f"{size:>16,}" for size in sizes)
+                  + f" | {len(payload) * students:,} / {_deflate(payload) * students:,}")
+
+async def _raw_body(client: AsyncClient, session_id: int, headers: dict, encoding: str) -> bytes:
+    async with client.stream("GET", f"/api/admin/sessions/{session_id}/results",
+                             headers={**headers, "Accept-Encoding": encoding}) as response:
+        return b"".join([chunk async for chunk in response.aiter_raw()])
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,20 +1,26 @@
 import os
+import re
 import json
+import time
 import httpx
 import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
 from core.config import settings
+from core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-# In a real app we'd inject this via environment matching the session model
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+# Feedback given in place of a grade when the model could not be reached or its reply not parsed
+HTTP_ERROR_FEEDBACK = "Error connecting to AI service via HTTP."
+INVALID_JSON_FEEDBACK = "AI returned invalid JSON format."
+ERROR_FEEDBACK = "Error connecting to AI service."
+FAILED_FEEDBACK = frozenset({HTTP_ERROR_FEEDBACK, INVALID_JSON_FEEDBACK, ERROR_FEEDBACK})
 
-async def grade_response(question_text: str, grading_criteria: str, student_response: str, ai_model: str) -> tuple[int, str]:
-    """
-    Calls OpenRouter to grade the student response.
-    Returns: (score [1-4], feedback [string])
-    """
-    prompt = f"""
+# Matches the (possibly still incomplete) feedback string inside a partially streamed JSON object
+_PARTIAL_FEEDBACK_RE = re.compile(r'"feedback"\s*:\s*"((?:[^"\\]|\\.)*)', re.DOTALL)
+
+def _build_prompt(question_text: str, grading_criteria: str, student_response: str) -> str:
+    return f"""
     Score the following student response on a scale of 1 to 4 based strictly on the provided grading criteria.
     If the student does not answer the question at all or the response is entirely irrelevant, return a score of 0.
     Provide short, constructive feedback to the student, but only if there is meaningful feedback to provide. A few sentences or less.
@@ -26,6 +32,23 @@ async def grade_response(question_text: str, grading_criteria: str, student_resp
     Respond STRICTLY in the following JSON format:
     {{"score": 3, "feedback": "Your feedback text here."}}
     """
+
+def _is_mocked(ai_model: str) -> bool:
+    return ai_model == "test-model" or settings.OPENROUTER_API_KEY == "dummy-key" or not settings.OPENROUTER_API_KEY
+
+def _headers() -> dict:
+    return {
+        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+        "HTTP-Referer": "http://localhost", # Required by OpenRouter
+        "X-Title": "RealTime Feedback Tool"
+    }
+
+async def grade_response(question_text: str, grading_criteria: str, student_response: str, ai_model: str) -> tuple[int, str]:
+    """
+    Calls OpenRouter to grade the student response.
+    Returns: (score [1-4], feedback [string])
+    """
+    prompt = _build_prompt(question_text, grading_criteria, student_response)
     
     # Check if we should mock it for E2E tests
     if ai_model == "test-model":
@@ -37,11 +60,7 @@ async def grade_response(question_text: str, grading_criteria: str, student_resp
         logger.info(f"Mocking AI Call for model: {ai_model} because API Key is missing or dummy")
         return 3, "This is mocked feedback because no OpenRouter API key is configured."
 
-    headers = {
-        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-        "HTTP-Referer": "http://localhost", # Required by OpenRouter
-        "X-Title": "RealTime Feedback Tool"
-    }
+    headers = _headers()
     
     payload = {
         "model": ai_model,
@@ -53,7 +72,7 @@ async def grade_response(question_text: str, grading_criteria: str, student_resp
     
     async with httpx.AsyncClient() as client:
         try:
-            resp = await client.post(OPENROUTER_URL, headers=headers, json=payload, timeout=20.0)
+            resp = await client.post(settings.OPENROUTER_URL, headers=headers, json=payload, timeout=20.0)
             
             # If the request failed, log the exact HTTP response
             if resp.status_code != 200:
@@ -68,10 +87,104 @@ async def grade_response(question_text: str, grading_criteria: str, student_resp
             return int(parsed.get('score', 0)), parsed.get('feedback', 'No feedback provided.')
         except httpx.HTTPError as he:
             logger.error(f"HTTP Exception while connecting to OpenAI API: {he}")
-            return 0, "Error connecting to AI service via HTTP."
+            return 0, HTTP_ERROR_FEEDBACK
         except json.JSONDecodeError as jde:
             logger.error(f"Failed to decode AI response JSON: {content} - {jde}")
-            return 0, "AI returned invalid JSON format."
+            return 0, INVALID_JSON_FEEDBACK
         except Exception as e:
             logger.exception(f"Unexpected AI Grading Error: {e}")
-            return 0, "Error connecting to AI service."
+            return 0, ERROR_FEEDBACK
+
+def _extract_partial_feedback(buffer: str) -> Optional[str]:
+    """Pulls the feedback text streamed so far out of an incomplete JSON object."""
+    match = _PARTIAL_FEEDBACK_RE.search(buffer)
+    if not match:
+        return None
+    raw = match.group(1)
+    # Drop a dangling escape so the fragment is always decodable
+    if raw.endswith("\\") and not raw.endswith("\\\\"):
+        raw = raw[:-1]
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+async def _iter_deltas(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Yields the content deltas of an OpenRouter SSE stream, given its lines."""
+    async for line in lines:
+        # SSE comments (": OPENROUTER PROCESSING") and blank keep-alives carry no data
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            # A broken frame means content is missing, so the stream cannot be trusted;
+            # raised as an HTTP error so the caller falls back to the blocking call
+            raise httpx.HTTPError(f"OpenRouter sent a malformed stream chunk: {data[:200]!r}")
+        if chunk.get("error"):
+            raise httpx.HTTPError(f"OpenRouter stream error: {chunk['error']}")
+        choices = chunk.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content") or ""
+        if delta:
+            yield delta
+
+async def _stream_completion(prompt: str, ai_model: str, on_feedback: Callable[[str], Awaitable[None]], started: float) -> str:
+    """Streams a completion over SSE, forwarding partial feedback. Returns the full content."""
+    payload = {
+        "model": ai_model,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+        "stream": True
+    }
+    content = ""
+    last_feedback = None
+    async with httpx.AsyncClient() as client:
+        async with client.stream("POST", settings.OPENROUTER_URL, headers=_headers(), json=payload, timeout=20.0) as resp:
+            if resp.status_code != 200:
+                body = await resp.aread()
+                logger.error(f"OpenRouter Stream Error Status {resp.status_code}: {body[:500]!r}")
+            resp.raise_for_status()
+            async for delta in _iter_deltas(resp.aiter_lines()):
+                content += delta
+                feedback = _extract_partial_feedback(content)
+                if feedback and feedback != last_feedback:
+                    if last_feedback is None:
+                        metrics.observe("grading.time_to_first_feedback_seconds.stream", time.perf_counter() - started)
+                    last_feedback = feedback
+                    await on_feedback(feedback)
+    return content
+
+async def grade_response_streaming(question_text: str, grading_criteria: str, student_response: str, ai_model: str,
+                                   on_feedback: Callable[[str], Awaitable[None]]) -> tuple[int, str]:
+    """
+    Grades like grade_response, but streams the completion and calls on_feedback with the
+    feedback text received so far. Falls back to the blocking call when streaming is
+    disabled, mocked, or fails. Returns: (score [1-4], feedback [string])
+    """
+    started = time.perf_counter()
+
+    if not settings.GRADING_STREAM_ENABLED or _is_mocked(ai_model):
+        result = await grade_response(question_text, grading_criteria, student_response, ai_model)
+        metrics.observe("grading.time_to_first_feedback_seconds.blocking", time.perf_counter() - started)
+        return result
+
+    prompt = _build_prompt(question_text, grading_criteria, student_response)
+    logger.info(f"Streaming OpenRouter grading with model: {ai_model}")
+    content = ""
+    try:
+        content = await _stream_completion(prompt, ai_model, on_feedback, started)
+        parsed = json.loads(content)
+        logger.info(f"OpenRouter Stream Success! Score: {parsed.get('score')} mapped.")
+        return int(parsed.get('score', 0)), parsed.get('feedback', 'No feedback provided.')
+    except json.JSONDecodeError as jde:
+        logger.error(f"Failed to decode streamed AI response JSON: {content} - {jde}")
+        return 0, INVALID_JSON_FEEDBACK
+    except Exception as e:
+        logger.warning(f"Streaming grade failed ({e}), falling back to non-streaming call")
+        metrics.increment("grading.stream_fallbacks")
+        result = await grade_response(question_text, grading_criteria, student_response, ai_model)
+        metrics.observe("grading.time_to_first_feedback_seconds.blocking", time.perf_counter() - started)
+        return result
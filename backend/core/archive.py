@@ -0,0 +1,54 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from core.config import settings
+
+class SessionArchive:
+    """
+    Cold storage for closed sessions: one gzipped JSON file per session holding what
+    fetch_results returned when it was archived, so reads of an archived session give
+    the dashboard and the CSV export the same rows they got before.
+    """
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, session_id: int) -> str:
+        return os.path.join(self.root, f"session_{session_id}.json.gz")
+
+    def write(self, session_id: int, results: list):
+        os.makedirs(self.root, exist_ok=True)
+        payload = json.dumps(jsonable_encoder(results), separators=(",", ":"), ensure_ascii=False).encode()
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9) as f:
+                    f.write(payload)
+                # The hot rows are deleted right after this, so the file has to be on disk first
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp, self.path(session_id))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def read(self, session_id: int) -> Optional[list]:
+        try:
+            with gzip.open(self.path(session_id), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    async def load(self, session_id: int) -> Optional[list]:
+        return await asyncio.to_thread(self.read, session_id)
+
+    def remove(self, session_id: int):
+        try:
+            os.unlink(self.path(session_id))
+        except FileNotFoundError:
+            pass
+
+archive = SessionArchive(settings.ARCHIVE_DIR)
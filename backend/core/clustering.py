@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import re
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from core.coalesce import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Hashed feature space; collisions at this size are rare for a few hundred answers
+DIMENSIONS = 1 << 18
+# Character trigrams catch misspellings and word forms; words and word pairs carry the meaning
+CHAR_WEIGHT = 0.3
+TOP_TERMS = 5
+REPRESENTATIVES = 3
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOP_WORDS = frozenset("""
+    a an and are as at be because been but by can do does for from has have how i if in into is it
+    its it's of on or so that the their them then there these they this to was we were what when
+    which while who why will with would you your
+""".split())
+
+def _stem(word: str) -> str:
+    # Enough to fold plurals and simple verb forms together: changes, changed, changing -> chang
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith(("ss", "is", "us")):
+            word = word[:-len(suffix)]
+            break
+    return word[:-1] if word.endswith("e") and len(word) > 3 else word
+
+def words(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOP_WORDS]
+
+def terms(text: str) -> List[str]:
+    return [_stem(w) for w in words(text)]
+
+def _bucket(feature: str) -> int:
+    # crc32 rather than hash(), which differs between worker processes
+    return zlib.crc32(feature.encode("utf-8")) & (DIMENSIONS - 1)
+
+def vectorize(text: str) -> Dict[int, float]:
+    """L2-normalized sparse vector of hashed words, word pairs and character trigrams."""
+    stems = terms(text)
+    counts: Counter = Counter()
+    for w in stems:
+        counts["w", w] += 1.0
+        padded = f" {w} "
+        for i in range(len(padded) - 2):
+            counts["c", padded[i:i + 3]] += CHAR_WEIGHT
+    for pair in zip(stems, stems[1:]):
+        counts["b", pair] += 1.0
+
+    vector: Dict[int, float] = {}
+    for (kind, feature), count in counts.items():
+        key = _bucket(f"{kind}|{' '.join(feature) if kind == 'b' else feature}")
+        # Sublinear, so one word repeated does not outweigh the rest of the answer
+        vector[key] = vector.get(key, 0.0) + (1.0 + math.log(count) if count >= 1 else count)
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {k: v / norm for k, v in vector.items()} if norm else {}
+
+def sparse_dot(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+class _Cluster:
+    def __init__(self):
+        self.centroid: Dict[int, float] = {}   # sum of member vectors
+        self.norm_sq = 0.0
+        self.members: List[Tuple[int, str, Dict[int, float]]] = []
+        self.words: Counter = Counter()          # members containing each term
+
+    def similarity(self, vector: Dict[int, float]) -> Tuple[float, float]:
+        dot = sparse_dot(vector, self.centroid)
+        return (dot / math.sqrt(self.norm_sq) if self.norm_sq else 0.0), dot
+
+    def add(self, response_id: int, text: str, vector: Dict[int, float], dot: float, stems: set):
+        for k, v in vector.items():
+            self.centroid[k] = self.centroid.get(k, 0.0) + v
+        # |c + v|^2 with |v| = 1
+        self.norm_sq += 2 * dot + 1.0
+        self.members.append((response_id, text, vector))
+        self.words.update(stems)
+
+    def absorb(self, other: "_Cluster"):
+        for k, v in other.centroid.items():
+            self.centroid[k] = self.centroid.get(k, 0.0) + v
+        self.norm_sq = sum(v * v for v in self.centroid.values())
+        self.members.extend(other.members)
+        self.words.update(other.words)
+
+class QuestionClusters:
+    """
+    Incremental clustering of one question instance's responses. Each response joins the
+    most similar cluster if it is at least threshold alike (cosine to the centroid),
+    otherwise it starts its own; clusters that have drifted together are then merged.
+    Lives in the pool worker its question is routed to, so only new answers cross processes.
+    """
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.clusters: List[_Cluster] = []
+        self.df: Counter = Counter()
+        self.seen: set = set()
+        # A readable word for each stem, for the cluster labels
+        self.forms: Dict[str, str] = {}
+
+    def add(self, response_id: int, text: str):
+        if response_id in self.seen:
+            return
+        self.seen.add(response_id)
+        vector = vectorize(text)
+        for word in words(text):
+            self.forms.setdefault(_stem(word), word)
+        stems = set(terms(text))
+        self.df.update(stems)
+
+        best, best_sim, best_dot = None, 0.0, 0.0
+        for cluster in self.clusters:
+            sim, dot = cluster.similarity(vector)
+            if sim > best_sim:
+                best, best_sim, best_dot = cluster, sim, dot
+        if best is None or best_sim < self.threshold:
+            best, best_dot = _Cluster(), 0.0
+            self.clusters.append(best)
+        best.add(response_id, text, vector, best_dot, stems)
+
+    def merge(self):
+        merged = True
+        while merged:
+            merged = False
+            for i, a in enumerate(self.clusters):
+                for b in self.clusters[i + 1:]:
+                    if sparse_dot(a.centroid, b.centroid) / math.sqrt(a.norm_sq * b.norm_sq) >= self.threshold:
+                        a.absorb(b)
+                        self.clusters.remove(b)
+                        merged = True
+                        break
+                if merged:
+                    break
+
+    def summary(self) -> List[dict]:
+        total = len(self.seen)
+        out = []
+        for cluster in sorted(self.clusters, key=lambda c: -len(c.members)):
+            size = len(cluster.members)
+            # Terms frequent in this cluster and uncommon across the question's other answers
+            weight = {w: n / size * math.log(1 + total / self.df[w]) for w, n in cluster.words.items()}
+            top = sorted(weight, key=lambda w: (-weight[w], w))[:TOP_TERMS]
+            norm = math.sqrt(cluster.norm_sq) or 1.0
+            closest = sorted(cluster.members, key=lambda m: -sparse_dot(m[2], cluster.centroid) / norm)
+            out.append({
+                "size": size,
+                "share": round(size / total, 3) if total else 0.0,
+                "terms": [self.forms.get(w, w) for w in top],
+                "representatives": [{"response_id": rid, "response_text": text}
+                                    for rid, text, _ in closest[:REPRESENTATIVES]],
+                "response_ids": [rid for rid, _, _ in cluster.members],
+            })
+        return out
+
+# Worker side: the clusters of every question instance routed to this worker process
+_states: Dict[int, QuestionClusters] = {}
+
+def absorb(key: int, threshold: float, batch: List[Tuple[int, str]], fresh: bool) -> Tuple[int, List[dict]]:
+    """
+    Pool entry point: adds a batch of (response_id, text) to the clusters kept in this worker
+    for key, starting them over if fresh, and returns how many responses they hold and their summary.
+    """
+    if fresh:
+        _states[key] = QuestionClusters(threshold)
+    state = _states.get(key)
+    if state is None:
+        raise LookupError(f"No clusters for session_question {key} in this worker")
+    for response_id, text in batch:
+        state.add(response_id, text)
+    state.merge()
+    return len(state.seen), state.summary()
+
+def discard(keys: List[int]):
+    """Pool entry point: drops the clusters kept in this worker for keys."""
+    for key in keys:
+        _states.pop(key, None)
+
+class _Question:
+    def __init__(self, key: int):
+        self.key = key
+        self.responses = 0
+        self.summary: List[dict] = []
+        self.pending: List[Tuple[int, str]] = []
+        # Everything the worker has absorbed, resent only to rebuild clusters a worker lost
+        self.absorbed: List[Tuple[int, str]] = []
+        self.fresh = True
+        self.task: Optional[asyncio.Task] = None
+
+class ResponseClusterStore:
+    """
+    Per-session_question clusters for the admin results view. A session is clustered from
+    the DB the first time its clusters are asked for; after that each saved response is
+    queued and folded in by a pool worker, one batch per question at a time, so the event
+    loop only ever hands work off. Each question is routed to the same single-process pool
+    every time, which keeps its clusters between batches. Sessions nobody has looked at
+    cost nothing.
+    """
+    def __init__(self, loader, workers: int, threshold: float):
+        # loader(session_id) -> fetch_results rows, each with its responses
+        self._loader = loader
+        self.workers = workers
+        self.threshold = threshold
+        self._pools: List[Optional[ProcessPoolExecutor]] = [None] * max(workers, 0)
+        self._sessions: Dict[int, Dict[int, _Question]] = {}
+        self._dirty = set()
+        self._loads = SingleFlight()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _executor(self, key: int) -> ProcessPoolExecutor:
+        shard = key % len(self._pools)
+        if self._pools[shard] is None:
+            # spawn: forking a process that runs an event loop and DB pool threads is unsafe
+            self._pools[shard] = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"))
+        return self._pools[shard]
+
+    def _enqueue(self, question: _Question, batch: List[Tuple[int, str]]):
+        question.pending.extend(batch)
+        if question.task is None or question.task.done():
+            question.task = asyncio.ensure_future(self._drain(question))
+
+    async def _drain(self, question: _Question):
+        loop = asyncio.get_running_loop()
+        while question.pending:
+            batch, question.pending = question.pending, []
+            fresh, question.fresh = question.fresh, False
+            sent = question.absorbed + batch if fresh else batch
+            executor = self._executor(question.key)
+            try:
+                question.responses, question.summary = await loop.run_in_executor(
+                    executor, absorb, question.key, self.threshold, sent, fresh)
+                question.absorbed.extend(batch)
+            except Exception as e:
+                logger.exception(f"Clustering a batch of {len(sent)} response(s) failed")
+                if isinstance(e, BrokenProcessPool):
+                    shard = question.key % len(self._pools)
+                    if self._pools[shard] is executor:
+                        self._pools[shard] = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+                # The worker's clusters may be gone or half updated: rebuild them with the next batch,
+                # retrying this one right away unless it already was a rebuild, in which case it
+                # waits in absorbed for the rebuild the next answer triggers
+                question.fresh = True
+                if fresh:
+                    question.absorbed.extend(batch)
+                else:
+                    question.pending = batch + question.pending
+
+    async def _ensure_loaded(self, session_id: int) -> Dict[int, _Question]:
+        if session_id in self._sessions:
+            return self._sessions[session_id]
+
+        async def load():
+            # Same as the stats store: reload until no response was saved during the query
+            while True:
+                self._dirty.discard(session_id)
+                rows = await self._loader(session_id)
+                if session_id not in self._dirty:
+                    break
+            questions: Dict[int, _Question] = {}
+            for sq in rows:
+                question = questions[sq['id']] = _Question(sq['id'])
+                self._enqueue(question, [(r['id'], r['response_text']) for r in sq.get('responses', [])])
+            self._sessions[session_id] = questions
+            return questions
+
+        questions, _ = await self._loads.do(session_id, load)
+        return questions
+
+    async def record(self, session_id: int, session_question_id: int, response_id: int, text: str):
+        """Queues one saved response; returns without waiting for it to be clustered."""
+        if not self.enabled:
+            return
+        questions = self._sessions.get(session_id)
+        if questions is None:
+            # Picked up by the first load instead
+            if self._loads.in_flight(session_id):
+                self._dirty.add(session_id)
+            return
+        question = questions.get(session_question_id)
+        if question is None:
+            question = questions[session_question_id] = _Question(session_question_id)
+        self._enqueue(question, [(response_id, text)])
+
+    async def get_session(self, session_id: int) -> List[dict]:
+        """Cluster summaries per question, including every response recorded before the call."""
+        questions = await self._ensure_loaded(session_id)
+        pending = [q.task for q in questions.values() if q.task and not q.task.done()]
+        if pending:
+            await asyncio.shield(asyncio.gather(*pending))
+        return [{"session_question_id": sq_id, "responses": q.responses, "clusters": q.summary}
+                for sq_id, q in questions.items()]
+
+    def _discard(self, questions: Dict[int, _Question]):
+        shards: Dict[int, List[int]] = {}
+        for key in questions:
+            shards.setdefault(key % len(self._pools), []).append(key)
+        for shard, keys in shards.items():
+            # Queued behind any batch still running for these questions; a pool that was
+            # never started holds nothing
+            if self._pools[shard] is not None:
+                try:
+                    self._pools[shard].submit(discard, keys)
+                except BrokenProcessPool:
+                    # Its worker died, and the clusters with it
+                    pass
+
+    def forget(self, session_id: int):
+        questions = self._sessions.pop(session_id, None)
+        if questions:
+            self._discard(questions)
+
+    def clear(self):
+        for questions in self._sessions.values():
+            self._discard(questions)
+        self._sessions.clear()
+
+    def shutdown(self):
+        for i, pool in enumerate(self._pools):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pools[i] = None
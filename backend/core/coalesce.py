@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution. Callers that arrive
+    while a call is in flight await the same result (or exception) instead of starting
+    their own. The work runs as its own task, so a caller disconnecting does not cancel
+    it for everyone else.
+    """
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, shared) where shared is True if another caller's flight was joined."""
+        task = self._inflight.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Task):
+            self._inflight.pop(key, None)
+            # Mark the exception as retrieved in case every waiter went away
+            if not t.cancelled():
+                t.exception()
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task), False
+
+class TTLCache:
+    """Small LRU cache whose entries expire after ttl_seconds."""
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different request."""
+
+class IdempotentExecutor:
+    """
+    Runs each idempotency key at most once within the TTL: concurrent duplicates share
+    one in-flight execution and later duplicates are answered from the cache. Failures
+    are not cached, so a retry after an error runs again. With a fingerprint of the
+    request, a key replayed with a different one raises IdempotencyConflict. The
+    fingerprint is cached with the result, so the two always expire together.
+    """
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self._flights = SingleFlight()
+        self._completed = TTLCache(ttl_seconds, max_entries)
+        self._inflight_fingerprints: Dict[Hashable, Optional[str]] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                  fingerprint: Optional[str] = None) -> Tuple[Any, str]:
+        """Returns (result, outcome) where outcome is 'executed', 'coalesced' or 'cached'."""
+        cached = self._completed.get(key)
+        if cached is not None:
+            seen, result = cached
+            if fingerprint != seen:
+                raise IdempotencyConflict(key)
+            return result, "cached"
+        if not self._flights.in_flight(key):
+            self._inflight_fingerprints[key] = fingerprint
+        elif self._inflight_fingerprints.get(key, fingerprint) != fingerprint:
+            raise IdempotencyConflict(key)
+
+        async def execute_and_remember():
+            try:
+                result = await fn()
+                self._completed.set(key, (fingerprint, result))
+                return result
+            finally:
+                self._inflight_fingerprints.pop(key, None)
+
+        result, shared = await self._flights.do(key, execute_and_remember)
+        return result, "coalesced" if shared else "executed"
+
+    def clear(self):
+        self._completed.clear()
+        self._inflight_fingerprints.clear()
+
+class LoadingCache:
+    """
+    Read-through cache in front of an async loader: a hit is served from memory, and
+    concurrent misses for the same key share one load. Writers replace or invalidate
+    entries; a load that started before such a write does not overwrite its result.
+    """
+    def __init__(self, loader: Callable[[Hashable], Awaitable[Any]], ttl_seconds: float, max_entries: int = 1024):
+        self._loader = loader
+        self._cache = TTLCache(ttl_seconds, max_entries)
+        self._flights = SingleFlight()
+        self._generations: Dict[Hashable, int] = {}
+
+    async def get(self, key: Hashable) -> Tuple[Any, str]:
+        """Returns (value, how) where how is 'hit', 'loaded' or 'coalesced'."""
+        value = self._cache.get(key)
+        if value is not None:
+            return value, "hit"
+        generation = self._generations.get(key, 0)
+
+        async def load():
+            result = await self._loader(key)
+            if self._generations.get(key, 0) == generation:
+                self._cache.set(key, result)
+            return result
+
+        value, shared = await self._flights.do((key, generation), load)
+        return value, "coalesced" if shared else "loaded"
+
+    def set(self, key: Hashable, value: Any):
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.set(key, value)
+
+    def invalidate(self, key: Hashable):
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.pop(key)
+
+    def clear(self):
+        self._cache.clear()
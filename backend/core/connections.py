@@ -0,0 +1,337 @@
+import asyncio
+import random
+import secrets
+import time
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
+from core.config import settings
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS = "Anonymous"
+ADMIN_TOPICS = frozenset({"responses", "roster", "stats", "questions"})
+
+# Channels a message can be addressed to
+SESSION = "session"   # every student socket in the session
+STUDENT = "student"   # the sockets of one named student
+ADMINS = "admins"     # dashboard subscribers, filtered by topic
+
+# Routing rules per message type: (student channel or None, admin topic or None).
+# An admin topic of ALL_TOPICS reaches every subscriber whatever they picked.
+ALL_TOPICS = "*"
+ROUTES = {
+    "active_questions": (SESSION, "questions"),
+    "session_ended": (SESSION, ALL_TOPICS),
+    "reconnect": (SESSION, ALL_TOPICS),
+    "feedback_delta": (STUDENT, None),
+    "grading_result": (STUDENT, None),
+    # Answers and feedback of other students never reach student sockets
+    "new_response": (None, "responses"),
+    "stats_update": (None, "stats"),
+    "roster_update": (None, "roster"),
+}
+# Student-bound types that get a sequence number and are kept for replay on reconnect.
+# Partial feedback and restart hints are only useful live.
+REPLAYED = frozenset({"active_questions", "session_ended", "grading_result"})
+
+class _Stream:
+    """Bounded run of (seq, message) that remembers the newest seq it has had to drop."""
+    def __init__(self, size: int):
+        self.events = deque(maxlen=size)
+        self.evicted = 0
+
+    def add(self, seq: int, message: dict):
+        if len(self.events) == self.events.maxlen:
+            self.evicted = self.events[0][0]
+        self.events.append((seq, message))
+
+    def after(self, last_seq: int) -> Optional[List[Tuple[int, dict]]]:
+        if self.evicted > last_seq:
+            return None
+        return [(seq, m) for seq, m in self.events if seq > last_seq]
+
+class EventLog:
+    """
+    Per-session sequence numbers plus the recent sequenced events, so a student who
+    reconnects with the last seq they saw receives just what they missed. Session-wide
+    events and each student's own events are kept apart, so one student's history is
+    not pushed out by everyone else's grading results. The epoch changes whenever the
+    log is recreated (e.g. a restart), which invalidates old seqs.
+    """
+    # Own events (grading results) kept per student
+    STUDENT_EVENTS = 32
+
+    def __init__(self, size: int):
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self._session = _Stream(size)
+        self._students: Dict[str, _Stream] = {}
+
+    def append(self, message: dict, student_name: Optional[str]) -> dict:
+        self.seq += 1
+        message = {**message, "seq": self.seq}
+        if student_name is None:
+            self._session.add(self.seq, message)
+        else:
+            if student_name not in self._students:
+                self._students[student_name] = _Stream(self.STUDENT_EVENTS)
+            self._students[student_name].add(self.seq, message)
+        return message
+
+    def since(self, epoch: Optional[str], last_seq: int, student_name: Optional[str]) -> Optional[List[dict]]:
+        """Events after last_seq for this student, or None if some can no longer be replayed."""
+        if epoch != self.epoch or last_seq > self.seq:
+            return None
+        missed = self._session.after(last_seq)
+        own = self._students.get(student_name) if student_name else None
+        own_missed = own.after(last_seq) if own is not None else []
+        if missed is None or own_missed is None:
+            return None
+        return [m for _, m in sorted(missed + own_missed, key=lambda e: e[0])]
+
+# Events buffered per dashboard socket before the oldest are dropped
+ADMIN_QUEUE_SIZE = 256
+
+class AdminSubscriber:
+    """One dashboard socket: its topics, an outbound queue drained by a writer task, and last activity."""
+    def __init__(self, topics: Iterable[str]):
+        self.topics = set(topics) & ADMIN_TOPICS
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=ADMIN_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+
+    def offer(self, message: dict):
+        # A stalled dashboard must not hold up submits, so it loses its oldest events instead
+        if self.queue.full():
+            self.queue.get_nowait()
+            metrics.increment("ws.admin_dropped")
+        self.queue.put_nowait(message)
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+class ConnectionManager:
+    """
+    Student sockets per session, addressable as the whole session or per student name,
+    plus dashboard subscribers that receive topic events through their own queues.
+    send() routes each message type to its channels via ROUTES. The per-name socket
+    sets double as presence (roster reads never scan sockets); last-activity times
+    feed the heartbeat reaper.
+    """
+    def __init__(self):
+        # Format: { session_id: { websocket_object: "Student Name" } }
+        self.active_sessions: Dict[int, Dict[WebSocket, str]] = {}
+        # Format: { session_id: { "Student Name": {websocket, ...} } }
+        self._students: Dict[int, Dict[str, Set[WebSocket]]] = {}
+        self._last_seen: Dict[WebSocket, float] = {}
+        self._admins: Dict[int, Set[AdminSubscriber]] = {}
+        self._logs: Dict[int, EventLog] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def connect(self, websocket: WebSocket, session_id: int):
+        await websocket.accept()
+        if session_id not in self.active_sessions:
+            self.active_sessions[session_id] = {}
+            self._students[session_id] = {}
+        # Initially anonymous until they send their name
+        self.active_sessions[session_id][websocket] = ANONYMOUS
+        self._last_seen[websocket] = time.monotonic()
+        metrics.increment("ws.connects")
+
+    def disconnect(self, websocket: WebSocket, session_id: int):
+        self._last_seen.pop(websocket, None)
+        sockets = self.active_sessions.get(session_id)
+        if sockets is None or websocket not in sockets:
+            return
+        name = sockets.pop(websocket)
+        self._release_name(websocket, session_id, name)
+        if not sockets:
+            del self.active_sessions[session_id]
+            del self._students[session_id]
+
+    def update_name(self, websocket: WebSocket, session_id: int, name: str):
+        sockets = self.active_sessions.get(session_id)
+        if sockets is None or websocket not in sockets or sockets[websocket] == name:
+            return
+        self._release_name(websocket, session_id, sockets[websocket])
+        sockets[websocket] = name
+        if name != ANONYMOUS:
+            students = self._students[session_id]
+            students.setdefault(name, set()).add(websocket)
+            if len(students[name]) == 1:
+                self._roster_changed(session_id)
+
+    def _release_name(self, websocket: WebSocket, session_id: int, name: str):
+        if name == ANONYMOUS:
+            return
+        students = self._students[session_id]
+        students[name].discard(websocket)
+        if not students[name]:
+            del students[name]
+            # Only the last tab of a student leaving changes the roster
+            self._roster_changed(session_id)
+
+    def touch(self, websocket: WebSocket):
+        """Records activity on a socket; any inbound message counts, not only pongs."""
+        if websocket in self._last_seen:
+            self._last_seen[websocket] = time.monotonic()
+
+    def get_connected_count(self, session_id: int) -> int:
+        return len(self._students.get(session_id, ()))
+
+    def get_connected_names(self, session_id: int) -> List[str]:
+        return list(self._students.get(session_id, ()))
+
+    def roster(self, session_id: int) -> dict:
+        return {"type": "roster_update", "count": self.get_connected_count(session_id),
+                "names": self.get_connected_names(session_id)}
+
+    # --- admin subscribers ---
+
+    def subscribe_admin(self, session_id: int, topics: Iterable[str]) -> AdminSubscriber:
+        subscriber = AdminSubscriber(topics)
+        self._admins.setdefault(session_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe_admin(self, session_id: int, subscriber: AdminSubscriber):
+        subscribers = self._admins.get(session_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._admins[session_id]
+
+    def publish(self, session_id: int, topic: Optional[str], message: dict):
+        """Queues a message for the session's admin subscribers to topic (all of them if topic is None)."""
+        for subscriber in self._admins.get(session_id, ()):
+            if topic is None or topic == ALL_TOPICS or topic in subscriber.topics:
+                subscriber.offer(message)
+
+    def _roster_changed(self, session_id: int):
+        if session_id in self._admins:
+            self.publish(session_id, ROUTES["roster_update"][1], self.roster(session_id))
+
+    # --- heartbeat ---
+
+    async def sweep(self, now: Optional[float] = None):
+        """Closes sockets idle past the timeout and pings the rest."""
+        now = time.monotonic() if now is None else now
+        for session_id, sockets in list(self.active_sessions.items()):
+            for websocket in list(sockets):
+                idle = now - self._last_seen.get(websocket, now)
+                if idle > settings.WS_IDLE_TIMEOUT_SECONDS:
+                    metrics.increment("ws.reaped")
+                    self.disconnect(websocket, session_id)
+                    try:
+                        await websocket.close(code=1001)
+                    except Exception:
+                        pass
+                    continue
+                try:
+                    await websocket.send_json({"type": "ping"})
+                except Exception:
+                    self.disconnect(websocket, session_id)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.WS_PING_INTERVAL_SECONDS)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Presence sweep failed: {e}")
+
+    def start_heartbeat(self):
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.ensure_future(self._heartbeat_loop())
+
+    async def stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+
+    async def close_all(self, retry_after_seconds: float):
+        """
+        Sends every socket a reconnect hint before a restart. Each student gets its own
+        delay spread over retry_after_seconds so the class does not reconnect at once.
+        """
+        for session_id, sockets in list(self.active_sessions.items()):
+            for websocket in list(sockets):
+                delay_ms = int(random.uniform(0.5, 1.5) * retry_after_seconds * 1000)
+                await self._deliver([websocket], {"type": "reconnect", "retry_after_ms": delay_ms})
+                try:
+                    # 1012: service restart
+                    await websocket.close(code=1012)
+                except Exception:
+                    pass
+                self.disconnect(websocket, session_id)
+        for session_id in list(self._admins):
+            self.publish(session_id, ALL_TOPICS, {"type": "reconnect", "retry_after_ms": int(retry_after_seconds * 1000)})
+
+    # --- replay ---
+
+    def _log(self, session_id: int) -> EventLog:
+        log = self._logs.get(session_id)
+        if log is None:
+            log = self._logs[session_id] = EventLog(settings.WS_REPLAY_LOG_SIZE)
+        return log
+
+    def position(self, session_id: int) -> dict:
+        """The epoch and latest seq, sent with a full snapshot so the client can resume from it."""
+        log = self._log(session_id)
+        return {"epoch": log.epoch, "seq": log.seq}
+
+    def replay(self, session_id: int, epoch: Optional[str], last_seq: int, student_name: Optional[str]) -> Optional[List[dict]]:
+        return self._log(session_id).since(epoch, last_seq, student_name)
+
+    def forget_session(self, session_id: int):
+        self._logs.pop(session_id, None)
+
+    def clear(self):
+        self.active_sessions.clear()
+        self._students.clear()
+        self._last_seen.clear()
+        self._admins.clear()
+        self._logs.clear()
+
+    # --- delivery ---
+
+    async def send(self, session_id: int, message: dict, student_name: Optional[str] = None):
+        """Delivers a message to the channels ROUTES assigns its type. student_name addresses STUDENT routes."""
+        student_channel, admin_topic = ROUTES[message["type"]]
+        if message["type"] in REPLAYED:
+            target = student_name.strip() if student_channel == STUDENT and student_name else None
+            message = self._log(session_id).append(message, target)
+        if student_channel == SESSION:
+            await self.broadcast(session_id, message)
+        elif student_channel == STUDENT and student_name is not None:
+            await self.send_to_student(session_id, student_name, message)
+        if admin_topic is not None:
+            self.publish(session_id, admin_topic, message)
+
+    async def send_to_student(self, session_id: int, student_name: str, message: dict):
+        # A student may have several sockets open (e.g. multiple tabs); deliver to all of them
+        connections = list(self._students.get(session_id, {}).get(student_name.strip(), ()))
+        await self._deliver(connections, message)
+
+    async def broadcast(self, session_id: int, message: dict):
+        connections = list(self.active_sessions.get(session_id, ()))
+        await self._deliver(connections, message)
+
+    async def _deliver(self, connections: List[WebSocket], message: dict):
+        if not connections:
+            return
+        encoded_message = jsonable_encoder(message)
+        for connection in connections:
+            try:
+                await connection.send_json(encoded_message)
+            except Exception:
+                pass
+        metrics.increment("ws.messages_sent", len(connections))
+
+manager = ConnectionManager()
@@ -0,0 +1,116 @@
+import hashlib
+import re
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Answers are compared as sets of lowercase words, so case, punctuation and word order
+# make no difference, by Jaccard similarity. MinHash signatures of NUM_PERM values are
+# split into BANDS bands; answers sharing any band are candidates, then checked exactly.
+# With 4 rows per band, a pair at 0.9 similarity is a candidate with p > 0.999, one at
+# 0.5 with p ~ 0.64, so lookups check few answers and miss practically none.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Graded answers kept per question instance; later ones are still looked up, just not added
+MAX_PER_QUESTION = 5000
+
+_WORD = re.compile(r"[a-z0-9]+")
+# A difference in one of these flips the meaning however similar the rest of the answer is
+# ("t" is what is left of don't, isn't, can't...)
+NEGATIONS = frozenset({"not", "no", "never", "nor", "none", "nothing", "cannot", "without", "t"})
+
+class Shingled(NamedTuple):
+    words: frozenset
+    signature: Tuple[int, ...]
+
+class Match(NamedTuple):
+    response_id: int
+    score: int
+    feedback: str
+    similarity: float
+
+def shingle(text: str) -> Shingled:
+    words = frozenset(_WORD.findall(text.lower()))
+    if not words:
+        return Shingled(words, ())
+    # NUM_PERM independent 64-bit hashes per word from one SHAKE digest (stable across
+    # processes, unlike hash()); the signature is their element-wise minimum over the words
+    hashes = [array("Q", hashlib.shake_128(w.encode("utf-8")).digest(8 * NUM_PERM)) for w in words]
+    return Shingled(words, tuple(map(min, *hashes)) if len(hashes) > 1 else tuple(hashes[0]))
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def _bands(signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+    return [(band, hash(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+class NearDuplicateIndex:
+    """LSH index over the graded answers to one question instance."""
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+        self._entries: List[Tuple[frozenset, Match]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def find(self, shingled: Shingled, threshold: float) -> Optional[Match]:
+        if not shingled.signature:
+            return None
+        candidates = set()
+        for key in _bands(shingled.signature):
+            candidates.update(self._buckets.get(key, ()))
+        best = None
+        for i in sorted(candidates):
+            words, match = self._entries[i]
+            similarity = jaccard(shingled.words, words)
+            if similarity < threshold or (shingled.words ^ words) & NEGATIONS:
+                continue
+            if best is None or similarity > best.similarity:
+                best = match._replace(similarity=similarity)
+        return best
+
+    def add(self, shingled: Shingled, response_id: int, score: int, feedback: str):
+        if not shingled.signature or len(self._entries) >= MAX_PER_QUESTION:
+            return
+        index = len(self._entries)
+        self._entries.append((shingled.words, Match(response_id, score, feedback, 1.0)))
+        for key in _bands(shingled.signature):
+            self._buckets.setdefault(key, []).append(index)
+
+class GradeReuse:
+    """
+    Grades already given per session_question, so an answer that is a near-duplicate
+    (at least threshold Jaccard-similar) of one graded before gets that grade instead of
+    another model call. In-process and LRU-bounded; after a restart answers are graded
+    afresh until the index fills again.
+    """
+    def __init__(self, threshold: float, max_questions: int = 1000):
+        self.threshold = threshold
+        self.max_questions = max_questions
+        self._questions: "OrderedDict[int, NearDuplicateIndex]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold <= 1.0
+
+    def find(self, session_question_id: int, shingled: Shingled) -> Optional[Match]:
+        index = self._questions.get(session_question_id)
+        if index is None or not self.enabled:
+            return None
+        self._questions.move_to_end(session_question_id)
+        return index.find(shingled, self.threshold)
+
+    def add(self, session_question_id: int, shingled: Shingled, response_id: int, score: int, feedback: str):
+        if not self.enabled:
+            return
+        index = self._questions.get(session_question_id)
+        if index is None:
+            index = self._questions[session_question_id] = NearDuplicateIndex()
+            while len(self._questions) > self.max_questions:
+                self._questions.popitem(last=False)
+        self._questions.move_to_end(session_question_id)
+        index.add(shingled, response_id, score, feedback)
+
+    def clear(self):
+        self._questions.clear()
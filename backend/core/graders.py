@@ -0,0 +1,81 @@
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+from core.ai_service import grade_response_streaming, ERROR_FEEDBACK, FAILED_FEEDBACK
+from core.config import settings
+from core.local_grader import LocalGrader
+from core.metrics import metrics
+from core import tracing
+from db.student_repo import StudentRepository
+
+logger = logging.getLogger(__name__)
+
+# A grader backend has a name and
+#   async grade(question, student_response, ai_model, on_feedback) -> (score, feedback) or None
+# returning None, or one of the FAILED_FEEDBACK messages, when it could not grade the answer.
+
+class OpenRouterGrader:
+    name = "openrouter"
+
+    async def grade(self, question: dict, student_response: str, ai_model: str,
+                    on_feedback: Callable[[str], Awaitable[None]]) -> Optional[Tuple[int, str]]:
+        return await grade_response_streaming(
+            question_text=question['text'],
+            grading_criteria=question['grading_criteria'],
+            student_response=student_response,
+            ai_model=ai_model,
+            on_feedback=on_feedback
+        )
+
+class GraderChain:
+    """
+    Tries each backend in order until one grades the answer. Every attempt is timed under
+    grading.<backend>.seconds and counted as grading.<backend>.graded or .failed, so the
+    metrics endpoint shows each backend's latency and throughput side by side.
+    """
+    def __init__(self, backends: List):
+        self.backends = backends
+
+    async def grade(self, question: dict, student_response: str, ai_model: str,
+                    on_feedback: Callable[[str], Awaitable[None]]) -> Tuple[int, str, str]:
+        """Returns (score, feedback, name of the backend that graded it)."""
+        result = None
+        for backend in self.backends:
+            started = time.perf_counter()
+            try:
+                result = await backend.grade(question, student_response, ai_model=ai_model, on_feedback=on_feedback)
+            except Exception:
+                logger.exception(f"Grader backend {backend.name} failed")
+                result = None
+            elapsed = time.perf_counter() - started
+            metrics.observe(f"grading.{backend.name}.seconds", elapsed)
+            tracing.record(f"grade.{backend.name}", elapsed)
+            if result is not None and result[1] not in FAILED_FEEDBACK:
+                metrics.increment(f"grading.{backend.name}.graded")
+                return result[0], result[1], backend.name
+            metrics.increment(f"grading.{backend.name}.failed")
+        # Nobody could grade it: keep the last backend's error, as a lone OpenRouter backend always did
+        score, feedback = result if result is not None else (0, ERROR_FEEDBACK)
+        return score, feedback, self.backends[-1].name
+
+    def shutdown(self):
+        for backend in self.backends:
+            if hasattr(backend, "shutdown"):
+                backend.shutdown()
+
+def build_graders(names: str) -> GraderChain:
+    backends = []
+    for name in filter(None, (n.strip() for n in names.split(","))):
+        if name == OpenRouterGrader.name:
+            backends.append(OpenRouterGrader())
+        elif name == LocalGrader.name:
+            backends.append(LocalGrader(StudentRepository.get_graded_examples, settings.LOCAL_GRADER_WORKERS,
+                                        settings.LOCAL_GRADER_MIN_EXAMPLES, settings.LOCAL_GRADER_MIN_SIMILARITY,
+                                        settings.LOCAL_GRADER_RETRAIN_SECONDS))
+        else:
+            raise ValueError(f"Unknown grader backend {name!r} in GRADER_BACKENDS")
+    if not backends:
+        raise ValueError("GRADER_BACKENDS names no grader backend")
+    return GraderChain(backends)
+
+graders = build_graders(settings.GRADER_BACKENDS)
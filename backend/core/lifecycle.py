@@ -0,0 +1,97 @@
+import asyncio
+import signal
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class ShuttingDown(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Server is shutting down")
+        self.retry_after = retry_after
+
+class Lifecycle:
+    """
+    Drain state for rolling restarts. Submits run inside track(); once drain() starts,
+    new ones are refused with ShuttingDown while in-flight ones (grading plus the save
+    that follows it) get until the deadline to finish.
+    """
+    # Clients are told to retry after this long, by when the replacement should be up
+    RETRY_AFTER_SECONDS = 5.0
+
+    def __init__(self):
+        self.draining = False
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._drained = False
+
+    @property
+    def in_flight(self) -> int:
+        return self._inflight
+
+    @asynccontextmanager
+    async def track(self):
+        if self.draining:
+            metrics.increment("lifecycle.refused")
+            raise ShuttingDown(self.RETRY_AFTER_SECONDS)
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> int:
+        """Stops admitting work and waits up to timeout for in-flight work. Returns how many were abandoned."""
+        self.draining = True
+        if self._drained:
+            return 0
+        logger.info(f"Draining {self._inflight} in-flight submission(s), up to {timeout:.0f}s")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Drain deadline passed with {self._inflight} submission(s) still in flight")
+        abandoned = self._inflight
+        self._drained = True
+        return abandoned
+
+    def install_signal_handler(self, on_signal: Callable[[], Awaitable[None]], sig=signal.SIGTERM):
+        """
+        Runs on_signal before the server's own handler for sig. uvicorn stops reading sockets
+        as soon as it sees SIGTERM, so the drain has to happen first for sockets to get hints.
+        A second signal skips straight to the server's handler.
+        """
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            return
+        loop = asyncio.get_running_loop()
+
+        def handler(signum, frame):
+            if self.draining:
+                return previous(signum, frame)
+
+            async def drain_then_exit():
+                try:
+                    await on_signal()
+                finally:
+                    previous(signum, frame)
+
+            self.draining = True
+            loop.call_soon_threadsafe(lambda: asyncio.ensure_future(drain_then_exit()))
+
+        try:
+            signal.signal(sig, handler)
+        except ValueError:
+            # Not the main thread (e.g. under a test client); shutdown_event still drains
+            pass
+
+    def reset(self):
+        self.draining = False
+        self._drained = False
+
+lifecycle = Lifecycle()
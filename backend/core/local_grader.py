@@ -0,0 +1,118 @@
+import asyncio
+import heapq
+import multiprocessing
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from core.ai_service import FAILED_FEEDBACK
+from core.clustering import vectorize, sparse_dot
+
+# Most recent graded answers a question's model is trained on
+MAX_EXAMPLES = 500
+# Trained models each pool worker keeps
+MODELS_PER_WORKER = 64
+# What a worker answers when it has no model for the key yet
+UNTRAINED = "untrained"
+
+class NearestNeighbours:
+    """
+    k-nearest-neighbour score classifier over hashed n-gram vectors, with the
+    fit/predict shape of a scikit-learn estimator. The predicted score is the
+    similarity-weighted vote of the k closest graded answers; the feedback is that of
+    the closest one with the winning score.
+    """
+    def __init__(self, k: int = 5, min_similarity: float = 0.3):
+        self.k = k
+        self.min_similarity = min_similarity
+        self._examples: List[Tuple[Dict[int, float], int, str]] = []
+
+    def fit(self, texts: List[str], scores: List[int], feedback: List[str]) -> "NearestNeighbours":
+        self._examples = [(vectorize(t), s, f) for t, s, f in zip(texts, scores, feedback)]
+        return self
+
+    def predict(self, text: str) -> Optional[Tuple[int, str, float]]:
+        """(score, feedback, similarity of the closest answer), or None if nothing graded is alike."""
+        vector = vectorize(text)
+        nearest = heapq.nlargest(self.k, ((sparse_dot(vector, v), i) for i, (v, _, _) in enumerate(self._examples)))
+        if not nearest or nearest[0][0] < self.min_similarity:
+            return None
+        votes: Dict[int, float] = defaultdict(float)
+        for similarity, i in nearest:
+            votes[self._examples[i][1]] += similarity
+        score = max(votes, key=votes.get)
+        closest = next(i for _, i in nearest if self._examples[i][1] == score)
+        return score, self._examples[closest][2], nearest[0][0]
+
+# Per worker process: trained models by (question_id, version)
+_models: "OrderedDict[Tuple[int, int], NearestNeighbours]" = OrderedDict()
+
+def predict(key: Tuple[int, int], text: str):
+    model = _models.get(key)
+    if model is None:
+        return UNTRAINED
+    _models.move_to_end(key)
+    return model.predict(text)
+
+def fit_predict(key: Tuple[int, int], examples: List[dict], min_similarity: float, text: str):
+    model = NearestNeighbours(min_similarity=min_similarity).fit(
+        [e['response_text'] for e in examples], [e['ai_score'] for e in examples],
+        [e['ai_feedback'] or "" for e in examples])
+    _models[key] = model
+    while len(_models) > MODELS_PER_WORKER:
+        _models.popitem(last=False)
+    return model.predict(text)
+
+class LocalGrader:
+    """
+    Grades offline from a question's own history: the answers the model already graded
+    for it. Models are trained and queried in a process pool. Each worker trains a
+    question's model the first time it is asked for it, and again once the model is older
+    than retrain_seconds. Returns None when there is too little history or nothing in it
+    is alike, so another backend can take the answer.
+    """
+    name = "local"
+
+    def __init__(self, loader, workers: int, min_examples: int, min_similarity: float, retrain_seconds: float):
+        # loader(question_id, limit) -> rows of {response_text, ai_score, ai_feedback}
+        self._loader = loader
+        self.workers = workers
+        self.min_examples = min_examples
+        self.min_similarity = min_similarity
+        self.retrain_seconds = retrain_seconds
+        self._versions: Dict[int, Tuple[int, float]] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, as for clustering: the parent runs an event loop and DB pool threads
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _key(self, question_id: int) -> Tuple[int, int]:
+        version, trained_at = self._versions.get(question_id, (0, 0.0))
+        if time.monotonic() - trained_at > self.retrain_seconds:
+            version, trained_at = version + 1, time.monotonic()
+            self._versions[question_id] = (version, trained_at)
+        return question_id, version
+
+    async def grade(self, question: dict, student_response: str, **_) -> Optional[Tuple[int, str]]:
+        loop = asyncio.get_running_loop()
+        key = self._key(question['id'])
+        result = await loop.run_in_executor(self._executor(), predict, key, student_response)
+        if result == UNTRAINED:
+            examples = [e for e in await self._loader(question['id'], MAX_EXAMPLES)
+                        if e['ai_feedback'] not in FAILED_FEEDBACK]
+            if len(examples) < self.min_examples:
+                return None
+            result = await loop.run_in_executor(
+                self._executor(), fit_predict, key, examples, self.min_similarity, student_response)
+        if result is None:
+            return None
+        score, feedback, _ = result
+        return score, feedback
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
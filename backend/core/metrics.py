@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+# Number of recent samples kept per timing metric for percentile estimates
+SAMPLE_WINDOW = 1024
+# Timings also report how many were observed per second over this trailing window,
+# counted in one-second buckets so the rate is not limited by SAMPLE_WINDOW
+RATE_WINDOW_SECONDS = 60.0
+
+class _Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+        # [whole second, observations in it], oldest first, none older than RATE_WINDOW_SECONDS
+        self.per_second = deque()
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+        second = int(time.monotonic())
+        if self.per_second and self.per_second[-1][0] == second:
+            self.per_second[-1][1] += 1
+        else:
+            self.per_second.append([second, 1])
+            while self.per_second[0][0] <= second - RATE_WINDOW_SECONDS:
+                self.per_second.popleft()
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        since = time.monotonic() - RATE_WINDOW_SECONDS
+
+        def pct(p):
+            if not ordered:
+                return None
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "per_second": sum(n for second, n in self.per_second if second + 1 > since) / RATE_WINDOW_SECONDS,
+        }
+
+class Metrics:
+    """
+    Minimal in-process metrics registry: monotonically increasing counters and
+    timing summaries. Values are per worker process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timings = defaultdict(_Timing)
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self._timings[name].observe(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {name: t.summary() for name, t in self._timings.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+metrics = Metrics()
@@ -0,0 +1,122 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+from core.config import settings
+from core.metrics import metrics
+from core.stats import MAX_SCORE
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_RUBRIC_LINE = re.compile(r"^\s*(\d+)\s*:\s*(.+?)\s*$")
+# Rubrics are plain phrases rather than regular expressions, which can backtrack for
+# seconds on a short answer; a line using regex syntax is refused instead of misread
+_REGEX_SYNTAX = re.compile(r"[\\()\[\]{}+?^$]")
+
+FEEDBACK = {
+    "empty": "No answer was submitted.",
+    "too_short": "This answer is too short to grade.",
+    "non_answer": "No answer was given. Even a partial answer is worth a try next time.",
+    "question_copy": "This answer repeats the question without answering it.",
+    "answer_key": "Correct.",
+}
+RUBRIC_FEEDBACK = {0: "This answer does not address the question.", MAX_SCORE: "Correct."}
+
+class PreGrade(NamedTuple):
+    score: int
+    feedback: str
+    rule: str
+
+def normalize(text: str) -> str:
+    # Case, punctuation and apostrophes ignored: "I don't know." == "i dont know"
+    return _NON_WORD.sub(" ", text.lower().replace("'", "").replace("’", "")).strip()
+
+@lru_cache(maxsize=1024)
+def parse_rubric(rubric: str) -> Tuple[Tuple[int, Tuple[str, ...]], ...]:
+    """
+    A rubric is one `score: phrase | phrase | ...` per line, tried in order; the first line
+    with a phrase found in the answer decides. Phrases match whole words, ignoring case and
+    punctuation, and a trailing * matches any ending ("mitochondri*"). Blank lines and lines
+    starting with # are skipped. Raises ValueError naming the first bad line.
+    """
+    rules = []
+    for n, line in enumerate(rubric.splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        match = _RUBRIC_LINE.match(line)
+        if not match or int(match.group(1)) > MAX_SCORE:
+            raise ValueError(f"Rubric line {n}: expected '<score 0-{MAX_SCORE}>: <phrase> | <phrase> ...'")
+        needles = []
+        for phrase in match.group(2).split("|"):
+            phrase = phrase.strip()
+            prefix = phrase.endswith("*")
+            body = phrase[:-1] if prefix else phrase
+            words = normalize(body)
+            if "*" in body or _REGEX_SYNTAX.search(body) or not words:
+                raise ValueError(f"Rubric line {n}: use words and phrases separated by |, with * only at the end "
+                                 f"of a word; regular expressions are not supported")
+            # Matched against the normalized answer padded with spaces, so these are whole words
+            needles.append(f" {words}" if prefix else f" {words} ")
+        rules.append((int(match.group(1)), tuple(needles)))
+    return tuple(rules)
+
+@lru_cache(maxsize=1024)
+def _answer_key(key: str) -> frozenset:
+    # One accepted answer per line
+    return frozenset(filter(None, (normalize(line) for line in key.splitlines())))
+
+@lru_cache(maxsize=1024)
+def _question_words(text: str) -> frozenset:
+    return frozenset(normalize(text).split())
+
+class PreGrader:
+    """
+    Decides the answers that need no model: blank ones, non-answers like "idk", the question
+    pasted back, and matches for a question's answer key or rubric. Everything else returns
+    None and goes to the model. Each decision is counted under pregrade.<rule>.
+    """
+    def __init__(self, enabled: bool, min_chars: int, non_answers: str, question_overlap: float):
+        self.enabled = enabled
+        self.min_chars = min_chars
+        self.non_answers = frozenset(filter(None, (normalize(a) for a in non_answers.split(","))))
+        self.question_overlap = question_overlap
+
+    def grade(self, question: dict, text: str) -> Optional[PreGrade]:
+        if not self.enabled:
+            return None
+        decided = self._decide(question, text)
+        metrics.increment(f"pregrade.{decided.rule}" if decided else "pregrade.to_model")
+        return decided
+
+    def _decide(self, question: dict, text: str) -> Optional[PreGrade]:
+        answer = normalize(text)
+        if not answer:
+            return PreGrade(0, FEEDBACK["empty"], "empty")
+
+        # The question's own key and rubric come first, so short correct answers ("4") count
+        if question.get('answer_key') and answer in _answer_key(question['answer_key']):
+            return PreGrade(MAX_SCORE, FEEDBACK["answer_key"], "answer_key")
+        if question.get('rubric'):
+            try:
+                rules = parse_rubric(question['rubric'])
+            except ValueError:
+                # Saved before the current checks; left to the model
+                rules = ()
+            padded = f" {answer} "
+            for score, needles in rules:
+                if any(needle in padded for needle in needles):
+                    return PreGrade(score, RUBRIC_FEEDBACK.get(score, "Partially correct."), "rubric")
+
+        if answer in self.non_answers:
+            return PreGrade(0, FEEDBACK["non_answer"], "non_answer")
+        if len(answer.replace(" ", "")) < self.min_chars:
+            return PreGrade(0, FEEDBACK["too_short"], "too_short")
+        # Only the question pasted back, near enough whole. Answers built from the question's
+        # words ("The sky is blue" to "Is the sky blue or red?") are real answers to a choice.
+        words = frozenset(answer.split())
+        asked = _question_words(question.get('text') or "")
+        shared = len(words & asked)
+        if asked and shared >= self.question_overlap * len(asked) and shared >= self.question_overlap * len(words):
+            return PreGrade(0, FEEDBACK["question_copy"], "question_copy")
+        return None
+
+pregrader = PreGrader(settings.PREGRADE_ENABLED, settings.PREGRADE_MIN_CHARS,
+                      settings.PREGRADE_NON_ANSWERS, settings.PREGRADE_QUESTION_OVERLAP)
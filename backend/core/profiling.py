@@ -0,0 +1,68 @@
+import asyncio
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+class ProfilerBusy(Exception):
+    pass
+
+def _label(frame) -> str:
+    code = frame.f_code
+    # Semicolons separate frames in the collapsed format
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}:{frame.f_lineno}".replace(";", ":")
+
+def collapse(frame, root: Optional[str] = None) -> str:
+    """A stack as one collapsed-format line, outermost frame first."""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    if root:
+        labels.append(root)
+    return ";".join(reversed(labels))
+
+class SamplingProfiler:
+    """
+    Time-boxed sampling profiler for the running worker. For the duration of a profile a
+    thread snapshots the stacks of the event loop thread (or every thread) each interval,
+    and the samples come back in collapsed-stack format, one "frame;frame;... count" line
+    per distinct stack, as flamegraph.pl, speedscope and inferno read it. No thread runs
+    and nothing is hooked between profiles. One profile at a time per process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, interval: float, all_threads: bool = False) -> str:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            counts: Counter = Counter()
+            target = None if all_threads else threading.get_ident()
+            stop = threading.Event()
+
+            def sample():
+                me = threading.get_ident()
+                while not stop.wait(interval):
+                    names = {t.ident: t.name for t in threading.enumerate()} if all_threads else {}
+                    for ident, frame in sys._current_frames().items():
+                        if ident == me or (target is not None and ident != target):
+                            continue
+                        counts[collapse(frame, names.get(ident, str(ident)) if all_threads else None)] += 1
+
+            sampler = threading.Thread(target=sample, name="sampling-profiler", daemon=True)
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+            return "".join(f"{stack} {n}\n" for stack, n in sorted(counts.items()))
+        finally:
+            self._lock.release()
+
+profiler = SamplingProfiler()
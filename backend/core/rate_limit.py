@@ -0,0 +1,209 @@
+import asyncio
+import math
+import random
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from core.config import settings
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Consumes one token. Returns 0 if allowed, else seconds until a token is available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.refill_per_second >= self.capacity
+
+class InMemoryRateLimitBackend:
+    """Per-process buckets. Correct for a single worker; each worker enforces its own limits otherwise."""
+    # Buckets that have refilled completely carry no state and are pruned this often
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._last_prune = time.monotonic()
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.monotonic()
+        if now - self._last_prune > self.PRUNE_INTERVAL:
+            self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full(now)}
+            self._last_prune = now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(capacity, refill_per_second, now)
+        return bucket.take(now)
+
+class RedisRateLimitBackend:
+    """
+    Shared buckets in Redis so all workers enforce one limit. Requires the optional
+    `redis` package; the bucket update runs atomically as a Lua script.
+    """
+    _SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local retry = 0
+    if tokens >= 1 then tokens = tokens - 1 else retry = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(retry)
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        retry = await self._script(keys=[f"ratelimit:{key}"], args=[capacity, refill_per_second, time.time()])
+        return float(retry)
+
+def _create_backend():
+    if settings.RATE_LIMIT_BACKEND_URL.startswith("redis://"):
+        logger.info("Using shared Redis rate limit backend")
+        return RedisRateLimitBackend(settings.RATE_LIMIT_BACKEND_URL)
+    return InMemoryRateLimitBackend()
+
+class SubmitRateLimiter:
+    """Token buckets for student submits: one per (session, student) and one per session."""
+    def __init__(self, backend=None):
+        self.backend = backend or _create_backend()
+
+    async def check(self, session_id: int, student_name: str) -> float:
+        """Returns 0 if the submit may proceed, else the suggested wait in seconds."""
+        retry = await self.backend.take(
+            f"student:{session_id}:{student_name.strip().lower()}",
+            settings.SUBMIT_BURST,
+            settings.SUBMIT_RATE_PER_MINUTE / 60.0
+        )
+        if retry:
+            metrics.increment("submit.rate_limited.student")
+            return retry
+        retry = await self.backend.take(
+            f"session:{session_id}",
+            settings.SESSION_SUBMIT_BURST,
+            settings.SESSION_SUBMIT_RATE_PER_SECOND
+        )
+        if retry:
+            metrics.increment("submit.rate_limited.session")
+        return retry
+
+class GateSaturated(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Grading queue is saturated")
+        self.retry_after = retry_after
+
+class AdmissionGate:
+    """
+    Bounds concurrent grading calls. Up to max_concurrency run at once, up to max_queue
+    wait for a slot, and anything beyond that is rejected immediately. When max_per_key
+    is set, callers admitted with the same key (a session) hold at most that many slots,
+    and up to max_queue more of them wait for one of those; callers waiting on their own
+    key's share do not count against the shared queue, so a busy session cannot fill it.
+    """
+    def __init__(self, max_concurrency: int, max_queue: int, max_per_key: Optional[int] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_key = max_per_key
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # key -> [semaphore, callers holding or waiting on it]; dropped when the key goes idle
+        self._shares: Dict[object, list] = {}
+        self.active = 0
+        # Callers waiting for a slot of the shared semaphore
+        self.waiting = 0
+        # Moving average of how long a grading slot is held, used for Retry-After hints
+        self.avg_hold_seconds = 2.0
+
+    def _retry_after(self, backlog: int, slots: int) -> float:
+        return self.avg_hold_seconds * math.ceil((backlog + 1) / slots)
+
+    def _check(self, key):
+        if key is not None and self.max_per_key:
+            share = self._shares.get(key)
+            queued = share[1] - self.max_per_key if share else 0
+            if queued >= self.max_queue:
+                metrics.increment("grading.admission_rejected")
+                raise GateSaturated(self._retry_after(queued, self.max_per_key))
+        if self.waiting >= self.max_queue and self.active >= self.max_concurrency:
+            metrics.increment("grading.admission_rejected")
+            raise GateSaturated(self._retry_after(self.waiting, self.max_concurrency))
+
+    @asynccontextmanager
+    async def _share(self, key):
+        if key is None or not self.max_per_key:
+            yield
+            return
+        share = self._shares.get(key)
+        if share is None:
+            share = self._shares[key] = [asyncio.Semaphore(self.max_per_key), 0]
+        share[1] += 1
+        try:
+            async with share[0]:
+                yield
+        finally:
+            share[1] -= 1
+            if not share[1]:
+                del self._shares[key]
+
+    @asynccontextmanager
+    async def admit(self, key=None):
+        self._check(key)
+        async with self._share(key):
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                held = time.perf_counter() - started
+                self.avg_hold_seconds = 0.8 * self.avg_hold_seconds + 0.2 * held
+                self.active -= 1
+                self._semaphore.release()
+
+class AcceptLimiter:
+    """
+    Caps how fast this process accepts new sockets, so a whole class reconnecting at once
+    is spread out instead of landing in the same second. Turned-away clients get a
+    retry hint with jitter added, so they do not all come back together either.
+    """
+    def __init__(self, rate_per_second: float, burst: int, jitter_seconds: float):
+        self.jitter_seconds = jitter_seconds
+        self._bucket = TokenBucket(burst, rate_per_second, time.monotonic())
+
+    def check(self) -> float:
+        """Returns 0 if the connection may be accepted, else the suggested wait in seconds (jittered)."""
+        wait = self._bucket.take(time.monotonic())
+        if not wait:
+            return 0.0
+        metrics.increment("ws.accept_deferred")
+        return wait + random.uniform(0, self.jitter_seconds)
+
+    def reset(self):
+        self._bucket = TokenBucket(self._bucket.capacity, self._bucket.refill_per_second, time.monotonic())
+
+submit_rate_limiter = SubmitRateLimiter()
+grading_gate = AdmissionGate(settings.GRADING_MAX_CONCURRENCY, settings.GRADING_MAX_QUEUE, settings.GRADING_MAX_PER_SESSION)
+ws_accept_limiter = AcceptLimiter(settings.WS_ACCEPT_RATE_PER_SECOND, settings.WS_ACCEPT_BURST, settings.WS_RECONNECT_JITTER_SECONDS)
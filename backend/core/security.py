@@ -17,11 +17,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str, credentials_exception):
+    # Scoped tokens (the short-lived socket token, which travels in query strings) are not admin logins
+    username = admin_username(token)
+    if username is None:
+        raise credentials_exception
+    return username
+
+def admin_username(token: str) -> Optional[str]:
+    """Returns the admin username of a valid access token, or None; scoped tokens do not count."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
     except JWTError:
-        raise credentials_exception
+        return None
+    return None if payload.get("scope") else payload.get("sub")
+
+# Dashboard sockets authenticate with a short-lived token scoped to one session, since
+# browsers cannot set an Authorization header on a WebSocket handshake
+WS_TOKEN_SCOPE = "admin_ws"
+WS_TOKEN_EXPIRE_SECONDS = 60
+
+def create_ws_token(username: str, session_id: int) -> str:
+    return create_access_token(
+        data={"sub": username, "scope": WS_TOKEN_SCOPE, "sid": session_id},
+        expires_delta=timedelta(seconds=WS_TOKEN_EXPIRE_SECONDS)
+    )
+
+def verify_ws_token(token: str, session_id: int) -> Optional[str]:
+    """Returns the admin username, or None if the token is invalid, expired or for another session."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("scope") != WS_TOKEN_SCOPE or payload.get("sid") != session_id:
+        return None
+    return payload.get("sub")
@@ -0,0 +1,100 @@
+import secrets
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from core.coalesce import SingleFlight
+
+# Join codes avoid characters that are easily confused when read off a projector (0/O, 1/I/L)
+JOIN_CODE_ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+JOIN_CODE_LENGTH = 6
+# Attempts at a fresh code before giving up on a (practically impossible) run of collisions
+MAX_CODE_ATTEMPTS = 10
+# Entries older than this are re-read so status changes made by other workers are picked up
+ENTRY_TTL_SECONDS = 30.0
+
+def generate_join_code(length: int = JOIN_CODE_LENGTH) -> str:
+    return ''.join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(length))
+
+class _Entry:
+    __slots__ = ("session_id", "code", "status", "admin_id", "loaded_at")
+
+    def __init__(self, session_id: int, code: str, status: str, admin_id: Optional[int]):
+        self.session_id = session_id
+        self.code = code
+        self.status = status
+        self.admin_id = admin_id
+        self.loaded_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {"id": self.session_id, "code": self.code, "status": self.status, "admin_id": self.admin_id}
+
+class SessionDirectory:
+    """
+    In-memory code -> session map, so student joins and socket handshakes resolve a
+    session without a database round-trip. Warmed with active sessions at startup and
+    kept current by this worker's writes; misses and stale entries fall back to the
+    loaders, with concurrent lookups for the same key sharing one query. Only sessions
+    this worker owns (see core.sharding) are kept: the owner sees every write to them,
+    while a join routed to any other worker would be answered from an entry it cannot
+    keep current, so those are always read from the database.
+    """
+    def __init__(self, load_by_code: Callable[[str], Awaitable[Optional[dict]]],
+                 load_by_id: Callable[[int], Awaitable[Optional[dict]]],
+                 owns: Callable[[int], bool] = lambda session_id: True):
+        self._load_by_code = load_by_code
+        self._load_by_id = load_by_id
+        self._owns = owns
+        self._by_code: Dict[str, _Entry] = {}
+        self._by_id: Dict[int, _Entry] = {}
+        self._loads = SingleFlight()
+
+    def put(self, session_id: int, code: str, status: str, admin_id: Optional[int] = None):
+        self._put_row({"id": session_id, "code": code, "status": status, "admin_id": admin_id})
+
+    def warm(self, rows):
+        for row in rows:
+            self._put_row(row)
+
+    def _put_row(self, row: dict) -> _Entry:
+        entry = _Entry(row['id'], row['code'], row['status'], row.get('admin_id'))
+        if not self._owns(entry.session_id):
+            return entry
+        self._by_code[entry.code] = entry
+        self._by_id[entry.session_id] = entry
+        return entry
+
+    def set_status(self, session_id: int, status: str):
+        entry = self._by_id.get(session_id)
+        if entry is not None:
+            entry.status = status
+
+    def remove(self, session_id: int):
+        entry = self._by_id.pop(session_id, None)
+        if entry is not None:
+            self._by_code.pop(entry.code, None)
+
+    def clear(self):
+        self._by_code.clear()
+        self._by_id.clear()
+
+    def _fresh(self, entry: Optional[_Entry]) -> bool:
+        return entry is not None and time.monotonic() - entry.loaded_at < ENTRY_TTL_SECONDS
+
+    async def _load(self, key, loader, arg) -> Optional[dict]:
+        async def load():
+            row = await loader(arg)
+            return self._put_row(row).as_dict() if row else None
+        entry, _ = await self._loads.do(key, load)
+        return entry
+
+    async def resolve_code(self, code: str) -> Optional[dict]:
+        """Returns {id, code, status, admin_id} for a join code, or None if no such session exists."""
+        entry = self._by_code.get(code)
+        if self._fresh(entry):
+            return entry.as_dict()
+        return await self._load(("code", code), self._load_by_code, code)
+
+    async def resolve_id(self, session_id: int) -> Optional[dict]:
+        entry = self._by_id.get(session_id)
+        if self._fresh(entry):
+            return entry.as_dict()
+        return await self._load(("id", session_id), self._load_by_id, session_id)
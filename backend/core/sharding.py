@@ -0,0 +1,236 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import re
+from typing import Dict, List, Optional
+import httpx
+import websockets
+from starlette.types import ASGIApp, Receive, Scope, Send
+from core.config import settings
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Paths whose state lives with one session: student sockets and calls, and the admin's
+# per-session routes and socket. Join-by-code and listings can be served by any worker.
+_SESSION_PATH = re.compile(r"^/api/(?:student/ws|student/session|admin/ws|admin/sessions)/(\d+)(/|$)")
+
+# Not forwarded between the dispatcher and a worker; each hop sets its own
+_HOP_HEADERS = {b"connection", b"keep-alive", b"transfer-encoding", b"upgrade", b"host", b"te", b"trailer",
+                b"proxy-authorization", b"proxy-authenticate"}
+
+def session_of(scope: Scope) -> Optional[int]:
+    """The session id a request or socket belongs to, or None if any worker can serve it."""
+    match = _SESSION_PATH.match(scope["path"])
+    if not match:
+        return None
+    # GET /api/admin/sessions/{code} looks a session up by join code, which can be all digits
+    if scope["path"].startswith("/api/admin/sessions/") and not match.group(2) and scope.get("method") == "GET":
+        return None
+    return int(match.group(1))
+
+def configured_workers() -> List[str]:
+    return [w.strip().rstrip("/") for w in settings.SHARD_WORKERS.split(",") if w.strip()]
+
+def _point(value: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+class HashRing:
+    """
+    Consistent hashing of session ids onto workers. Each worker has VNODES points on the
+    ring, so sessions spread evenly and adding or removing a worker only moves the
+    sessions that land on (or left) that worker.
+    """
+    VNODES = 128
+
+    def __init__(self, nodes: List[str]):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.nodes = list(nodes)
+        ring = sorted((_point(f"{node}#{i}"), node) for node in self.nodes for i in range(self.VNODES))
+        self._points = [p for p, _ in ring]
+        self._owners = [n for _, n in ring]
+
+    def owner(self, session_id: int) -> str:
+        i = bisect.bisect(self._points, _point(str(session_id))) % len(self._points)
+        return self._owners[i]
+
+class LocalShard:
+    """This worker's place on the ring. With sharding off (no workers configured) it owns every session."""
+    def __init__(self, workers: List[str], name: str):
+        self.name = name.rstrip("/")
+        self.ring = HashRing(workers) if workers and name else None
+        if self.ring is not None and self.name not in self.ring.nodes:
+            raise ValueError(f"SHARD_SELF {name!r} is not one of SHARD_WORKERS {workers}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ring is not None
+
+    def owns(self, session_id: int) -> bool:
+        return self.ring is None or self.ring.owner(session_id) == self.name
+
+class ShardGuardMiddleware:
+    """
+    Refuses session traffic this worker does not own, so a dispatcher with a different
+    worker list fails loudly (421) instead of splitting one session's sockets across
+    processes, where broadcasts would miss half the class.
+    """
+    def __init__(self, app: ASGIApp, shard: LocalShard):
+        self.app = app
+        self.shard = shard
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        session_id = session_of(scope) if scope["type"] in ("http", "websocket") else None
+        if session_id is None or self.shard.owns(session_id):
+            return await self.app(scope, receive, send)
+        metrics.increment("shard.misrouted")
+        logger.warning(f"Session {session_id} reached {self.shard.name} but is owned by {self.shard.ring.owner(session_id)}")
+        if scope["type"] == "websocket":
+            # Closing before accept rejects the handshake
+            return await send({"type": "websocket.close", "code": 1013})
+        body = json.dumps({"detail": "Session is served by another worker"}).encode()
+        await send({"type": "http.response.start", "status": 421,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+class WorkerProxy:
+    """ASGI app forwarding HTTP requests and WebSockets to one worker over the network."""
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.ws_url = "ws" + self.base_url[len("http"):]
+        # No read timeout: live-results is a long-lived event stream
+        self.client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
+
+    def _target(self, base: str, scope: Scope) -> str:
+        query = scope.get("query_string", b"").decode()
+        return base + scope["path"] + (f"?{query}" if query else "")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+
+    async def _http(self, scope: Scope, receive: Receive, send: Send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        headers = [(k, v) for k, v in scope["headers"] if k.lower() not in _HOP_HEADERS]
+        request = self.client.build_request(scope["method"], self._target(self.base_url, scope), headers=headers, content=body)
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            logger.error(f"Worker {self.base_url} unreachable: {e}")
+            await send({"type": "http.response.start", "status": 502, "headers": []})
+            return await send({"type": "http.response.body", "body": b""})
+
+        async def relay():
+            # Raw bytes, so the worker's Content-Encoding and Content-Length still hold
+            await send({"type": "http.response.start", "status": response.status_code,
+                        "headers": [(k, v) for k, v in response.headers.raw if k.lower() not in _HOP_HEADERS]})
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def client_gone():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        # A closed dashboard must also end the worker's event stream
+        tasks = [asyncio.ensure_future(relay()), asyncio.ensure_future(client_gone())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await response.aclose()
+
+    async def _websocket(self, scope: Scope, receive: Receive, send: Send):
+        await receive()  # websocket.connect
+        try:
+            # The browser hop negotiates permessage-deflate; this one is local
+            upstream = await websockets.connect(self._target(self.ws_url, scope), compression=None, open_timeout=10)
+        except Exception as e:
+            logger.error(f"Worker {self.base_url} refused socket {scope['path']}: {e}")
+            return await send({"type": "websocket.close", "code": 1013})
+        await send({"type": "websocket.accept"})
+
+        async def to_worker():
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                await upstream.send(message["text"] if message.get("text") is not None else message["bytes"])
+
+        async def to_client():
+            try:
+                async for data in upstream:
+                    await send({"type": "websocket.send", "text" if isinstance(data, str) else "bytes": data})
+            except websockets.ConnectionClosed:
+                pass
+            # Passes on the worker's close code, e.g. 1012 with a reconnect hint during a drain
+            code = upstream.close_code
+            await send({"type": "websocket.close", "code": code if code and code not in (1005, 1006) else 1011})
+
+        tasks = [asyncio.ensure_future(to_worker()), asyncio.ensure_future(to_client())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        except Exception as e:
+            logger.error(f"Relaying socket {scope['path']} to {self.base_url} failed: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class Dispatcher:
+    """
+    Front door of a sharded deployment. Session-scoped HTTP calls and sockets go to the
+    worker that owns the session on the hash ring; everything else is spread round-robin,
+    including creating and joining sessions (a join code does not say which session it
+    is), so workers only cache the sessions they own.
+    workers maps each worker name to the ASGI app that reaches it: a WorkerProxy in
+    production, or in-process apps as a stand-in for tests.
+    """
+    def __init__(self, workers: Dict[str, ASGIApp]):
+        self.workers = workers
+        self.ring = HashRing(list(workers))
+        self._any = itertools.cycle(list(workers))
+
+    def route(self, scope: Scope) -> str:
+        session_id = session_of(scope)
+        return next(self._any) if session_id is None else self.ring.owner(session_id)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        await self.workers[self.route(scope)](scope, receive, send)
+
+    async def _lifespan(self, receive: Receive, send: Send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                logger.info(f"Dispatching sessions across {len(self.workers)} worker(s): {', '.join(self.workers)}")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for worker in self.workers.values():
+                    if isinstance(worker, WorkerProxy):
+                        await worker.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+local_shard = LocalShard(configured_workers(), settings.SHARD_SELF)
@@ -0,0 +1,110 @@
+import time
+from collections import deque
+from typing import Dict, Optional
+from core.coalesce import SingleFlight
+
+# AI scores run from 0 (no answer / irrelevant) to 4
+MAX_SCORE = 4
+# Submission rate is reported over this trailing window
+RATE_WINDOW_SECONDS = 60.0
+
+class QuestionStats:
+    def __init__(self, session_question_id: int):
+        self.session_question_id = session_question_id
+        self.count = 0
+        self.score_sum = 0
+        self.histogram = [0] * (MAX_SCORE + 1)
+        self._recent = deque()
+
+    def add(self, score: Optional[int], n: int = 1, at: Optional[float] = None):
+        score = min(max(int(score or 0), 0), MAX_SCORE)
+        self.count += n
+        self.score_sum += score * n
+        self.histogram[score] += n
+        if at is not None:
+            self.touch(at)
+
+    def touch(self, at: float):
+        self._recent.append(at)
+
+    def _trim(self, now: float):
+        while self._recent and self._recent[0] < now - RATE_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def to_dict(self, now: float) -> dict:
+        self._trim(now)
+        return {
+            "session_question_id": self.session_question_id,
+            "count": self.count,
+            "mean": round(self.score_sum / self.count, 3) if self.count else None,
+            "histogram": list(self.histogram),
+            "submissions_per_minute": len(self._recent) * 60.0 / RATE_WINDOW_SECONDS,
+        }
+
+class SessionStatsStore:
+    """
+    Running per-session_question aggregates, updated in O(1) per saved response.
+    A session's aggregates are rebuilt from the DB the first time they are needed
+    (e.g. after a restart), after which only increments are applied.
+    """
+    def __init__(self, loader):
+        # loader(session_id) -> rows of {session_question_id, ai_score, n}
+        self._loader = loader
+        self._sessions: Dict[int, Dict[int, QuestionStats]] = {}
+        self._dirty = set()
+        self._loads = SingleFlight()
+
+    async def _ensure_loaded(self, session_id: int) -> Dict[int, QuestionStats]:
+        if session_id in self._sessions:
+            return self._sessions[session_id]
+
+        async def load():
+            # A response saved while the query runs may or may not be in its result,
+            # so keep reloading until a load completes with no concurrent saves.
+            while True:
+                self._dirty.discard(session_id)
+                rows = await self._loader(session_id)
+                if session_id not in self._dirty:
+                    break
+            stats: Dict[int, QuestionStats] = {}
+            for row in rows:
+                sq_id = row['session_question_id']
+                if sq_id not in stats:
+                    stats[sq_id] = QuestionStats(sq_id)
+                stats[sq_id].add(row['ai_score'], n=int(row['n']))
+            self._sessions[session_id] = stats
+            return stats
+
+        stats, _ = await self._loads.do(session_id, load)
+        return stats
+
+    async def record(self, session_id: int, session_question_id: int, score: Optional[int]) -> dict:
+        """Applies one saved response (already committed) and returns that question's stats."""
+        now = time.monotonic()
+        stats = self._sessions.get(session_id)
+        if stats is None:
+            # Cold: the committed row is picked up by the rebuild itself
+            if self._loads.in_flight(session_id):
+                self._dirty.add(session_id)
+            stats = await self._ensure_loaded(session_id)
+            q = stats.get(session_question_id)
+            if q is None:
+                q = stats[session_question_id] = QuestionStats(session_question_id)
+            q.touch(now)
+        else:
+            q = stats.get(session_question_id)
+            if q is None:
+                q = stats[session_question_id] = QuestionStats(session_question_id)
+            q.add(score, at=now)
+        return q.to_dict(now)
+
+    async def get_session(self, session_id: int) -> list:
+        stats = await self._ensure_loaded(session_id)
+        now = time.monotonic()
+        return [q.to_dict(now) for q in stats.values()]
+
+    def forget(self, session_id: int):
+        self._sessions.pop(session_id, None)
+
+    def clear(self):
+        self._sessions.clear()
@@ -0,0 +1,131 @@
+import contextvars
+import hmac
+import itertools
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import List, Optional
+from core.config import settings
+from core.security import admin_username
+
+# Opt-in per-request traces. A request sent with an X-Trace header by an admin (or carrying
+# TRACE_SECRET) records a span for each repository call, the grade call and the broadcast;
+# it is returned in a Server-Timing header and kept for GET /api/admin/traces. Untraced
+# requests only pay for the context variable lookup at each span site, the same as the
+# per-request query stats.
+
+class Trace:
+    _ids = itertools.count(1)
+
+    def __init__(self, method: str, path: str):
+        self.id = next(self._ids)
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[dict] = []
+
+    def add(self, name: str, started: float, seconds: float):
+        self.spans.append({"name": name, "start_ms": round((started - self._started) * 1000, 3),
+                           "duration_ms": round(seconds * 1000, 3)})
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def server_timing(self) -> str:
+        # One entry per span, in start order, then the whole request; browser dev tools chart these
+        entries = [f'{s["name"]};dur={s["duration_ms"]}' for s in sorted(self.spans, key=lambda s: s["start_ms"])]
+        return ", ".join(entries + [f"total;dur={self.duration_ms}"])
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "method": self.method, "path": self.path, "started_at": self.started_at,
+                "duration_ms": self.duration_ms, "spans": sorted(self.spans, key=lambda s: s["start_ms"])}
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_NOT_TRACED = nullcontext()
+
+class _Span:
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, self.started, time.perf_counter() - self.started)
+        return False
+
+def span(name: str):
+    """Context manager timing a block as a span of the current trace, if there is one."""
+    trace = _current.get()
+    return _NOT_TRACED if trace is None else _Span(trace, name)
+
+def record(name: str, seconds: float):
+    """Adds a span that has just ended, for code that has already timed itself."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - seconds, seconds)
+
+class TraceLog:
+    """The most recent traces, newest first."""
+    def __init__(self, keep: int):
+        self._traces: deque = deque(maxlen=max(keep, 1))
+
+    def add(self, trace: Trace):
+        self._traces.appendleft(trace)
+
+    def recent(self, limit: int) -> List[dict]:
+        return [t.to_dict() for t in itertools.islice(self._traces, limit)]
+
+    def clear(self):
+        self._traces.clear()
+
+traces = TraceLog(settings.TRACE_KEEP)
+
+def _trace_allowed(headers: List[tuple]) -> bool:
+    # Anyone can send the header; tracing it costs time and memory and the spans name
+    # internal statements, so only admins and holders of TRACE_SECRET get one
+    value = authorization = None
+    for k, v in headers:
+        if k == b"x-trace":
+            value = v
+        elif k == b"authorization":
+            authorization = v
+    if value is None:
+        return False
+    if settings.TRACE_SECRET and hmac.compare_digest(value, settings.TRACE_SECRET.encode()):
+        return True
+    scheme, _, token = (authorization or b"").decode("latin-1").partition(" ")
+    return scheme.lower() == "bearer" and admin_username(token.strip()) is not None
+
+class TraceMiddleware:
+    """Traces HTTP requests that carry an X-Trace header from an admin; leaves every other request alone."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _trace_allowed(scope["headers"]):
+            return await self.app(scope, receive, send)
+
+        trace = Trace(scope["method"], scope["path"])
+        token = _current.set(trace)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                trace.finish()
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", str(trace.id).encode()))
+                headers.append((b"server-timing", trace.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            _current.reset(token)
+            if trace.duration_ms is None:
+                trace.finish()
+            traces.add(trace)
@@ -1,26 +1,20 @@
-import aiomysql
 import bcrypt
-from db.session import get_db_pool
-class AdminUserRepository:
+from db import query
+from db.session import is_memory_backend
+
+_BY_USERNAME = query.register("admin_user.by_username", "SELECT * FROM admin_user WHERE username = %s")
+_INSERT = query.register("admin_user.insert", "INSERT INTO admin_user (username, password_hash) VALUES (%s, %s)")
+
+class MySQLAdminUserRepository:
     @staticmethod
     async def get_by_username(username: str):
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM admin_user WHERE username = %s", (username,))
-                return await cur.fetchone()
+        return await query.fetch_one(_BY_USERNAME, (username,))
 
     @staticmethod
     async def create(username: str, password: str):
-        pool = await get_db_pool()
         salt = bcrypt.gensalt()
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO admin_user (username, password_hash) VALUES (%s, %s)",
-                    (username, hashed)
-                )
+        await query.execute(_INSERT, (username, hashed))
         return {"username": username}
 
     @staticmethod
@@ -30,3 +24,8 @@ class AdminUserRepository:
             return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
         except ValueError:
             return False
+
+if is_memory_backend():
+    from db.memory_repo import MemoryAdminUserRepository as AdminUserRepository
+else:
+    AdminUserRepository = MySQLAdminUserRepository
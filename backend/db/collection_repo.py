@@ -1,79 +1,90 @@
-import aiomysql
-from db.session import get_db_pool
+from db import query
+from db.session import is_memory_backend
+from db.pagination import encode_cursor, decode_cursor, escape_like
+from db.question_repo import _BY_ID as _QUESTION_BY_ID
+from typing import Optional, Tuple
 
-class CollectionRepository:
+_ALL = query.register("collection.all", """
+    SELECT c.*, COUNT(q.id) as question_count
+    FROM collection c
+    LEFT JOIN question q ON q.collection_id = c.id
+    GROUP BY c.id
+    ORDER BY c.id ASC
+""")
+# Counting per page row through the collection_id index avoids grouping the whole question table
+_PAGE = query.register("collection.page", """
+    SELECT c.id, c.name, c.created_at,
+           (SELECT COUNT(*) FROM question q WHERE q.collection_id = c.id) as question_count
+    FROM collection c
+    {where}
+    ORDER BY c.id ASC
+    LIMIT %s
+""")
+_INSERT = query.register("collection.insert", "INSERT INTO collection (name) VALUES (%s)")
+_RENAME = query.register("collection.rename", "UPDATE collection SET name = %s WHERE id = %s")
+_MOVE_QUESTIONS = query.register("question.move_collection", "UPDATE question SET collection_id = %s WHERE collection_id = %s")
+_DELETE_QUESTIONS = query.register("question.delete_by_collection", "DELETE FROM question WHERE collection_id = %s")
+# student_response has no foreign keys (it is partitioned), so its rows are deleted here
+_DELETE_RESPONSES = query.register("student_response.delete_for_collection", """
+    DELETE r FROM student_response r
+    JOIN question q ON r.question_id = q.id
+    WHERE q.collection_id = %s
+""")
+_DELETE = query.register("collection.delete", "DELETE FROM collection WHERE id = %s")
+
+class MySQLCollectionRepository:
     @staticmethod
     async def get_all() -> list:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
-                    SELECT c.*, COUNT(q.id) as question_count
-                    FROM collection c
-                    LEFT JOIN question q ON q.collection_id = c.id
-                    GROUP BY c.id
-                    ORDER BY c.id ASC
-                """)
-                return await cur.fetchall()
+        return await query.fetch_all(_ALL)
+
+    @staticmethod
+    async def list_page(limit: int, cursor: Optional[str] = None, search: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        where, params = [], []
+        if cursor:
+            (last_id,) = decode_cursor(cursor, 1)
+            where.append("c.id > %s")
+            params.append(last_id)
+        if search:
+            where.append("c.name LIKE %s")
+            params.append(f"%{escape_like(search.strip())}%")
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+        # Fetch one extra row to learn whether another page exists
+        rows = await query.fetch_all(_PAGE, (*params, limit + 1), where=where_sql)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1]['id'])
+        return rows, None
 
     @staticmethod
     async def create(name: str) -> int:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO collection (name) VALUES (%s)", (name,)
-                )
-                await conn.commit()
-                return cur.lastrowid
+        result = await query.execute(_INSERT, (name,))
+        return result.lastrowid
 
     @staticmethod
     async def rename(collection_id: int, name: str) -> bool:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "UPDATE collection SET name = %s WHERE id = %s",
-                    (name, collection_id)
-                )
-                await conn.commit()
-                return cur.rowcount > 0
+        result = await query.execute(_RENAME, (name, collection_id))
+        return result.rowcount > 0
 
     @staticmethod
     async def delete_move(collection_id: int, target_id: int):
         """Move all questions to target collection, then delete the source collection."""
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            await conn.begin()
-            try:
-                async with conn.cursor() as cur:
-                    await cur.execute(
-                        "UPDATE question SET collection_id = %s WHERE collection_id = %s",
-                        (target_id, collection_id)
-                    )
-                    await cur.execute(
-                        "DELETE FROM collection WHERE id = %s", (collection_id,)
-                    )
-                await conn.commit()
-            except Exception as e:
-                await conn.rollback()
-                raise e
+        async with query.transaction() as conn:
+            await query.execute(_MOVE_QUESTIONS, (target_id, collection_id), conn=conn)
+            await query.execute(_DELETE, (collection_id,), conn=conn)
+        query.invalidate(_QUESTION_BY_ID)
 
     @staticmethod
     async def delete_purge(collection_id: int):
         """Delete all questions in the collection, then delete the collection itself."""
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            await conn.begin()
-            try:
-                async with conn.cursor() as cur:
-                    await cur.execute(
-                        "DELETE FROM question WHERE collection_id = %s", (collection_id,)
-                    )
-                    await cur.execute(
-                        "DELETE FROM collection WHERE id = %s", (collection_id,)
-                    )
-                await conn.commit()
-            except Exception as e:
-                await conn.rollback()
-                raise e
+        async with query.transaction() as conn:
+            await query.execute(_DELETE_RESPONSES, (collection_id,), conn=conn)
+            await query.execute(_DELETE_QUESTIONS, (collection_id,), conn=conn)
+            await query.execute(_DELETE, (collection_id,), conn=conn)
+        # Submits read questions through this cache; a purged one must stop grading here
+        query.invalidate(_QUESTION_BY_ID)
+
+if is_memory_backend():
+    from db.memory_repo import MemoryCollectionRepository as CollectionRepository
+else:
+    CollectionRepository = MySQLCollectionRepository
@@ -0,0 +1,463 @@
+"""
+In-process repository backend selected with DATABASE_URL=memory://.
+
+Each class mirrors the public API and row shapes of its MySQL counterpart in
+db/*_repo.py, including the schema's cascading deletes and unique constraints,
+so the API layer cannot tell the two apart. State lives in one module-level
+store and is lost on restart; it is meant for tests and load-test targets.
+"""
+import functools
+import bcrypt
+import pymysql
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from db import query
+from db.pagination import encode_cursor, decode_cursor, fulltext_terms
+from models.schemas import QuestionCreate, SessionCreate
+from core.session_directory import generate_join_code, MAX_CODE_ATTEMPTS
+from core.archive import archive
+
+# Seed rows from database/init.sql
+_DEFAULT_COLLECTION = "Default"
+_ADMIN_SEED = ("admin", "$2b$12$A//WYZ.2uhuZ9dM/VkvIeu6wCwt2l1tOtG4t0PryzniXGW72YC6/6")
+
+def _now() -> datetime:
+    # MySQL TIMESTAMP columns have second precision
+    return datetime.now().replace(microsecond=0)
+
+class MemoryStore:
+    TABLES = ("admin_user", "collection", "question", "session", "session_question", "student_response")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Empties every table and re-applies the init.sql seed rows."""
+        self.tables: Dict[str, Dict[int, dict]] = {name: {} for name in self.TABLES}
+        self._next_id = {name: 1 for name in self.TABLES}
+        self.insert("collection", {"name": _DEFAULT_COLLECTION, "created_at": _now()})
+        self.insert("admin_user", {"username": _ADMIN_SEED[0], "password_hash": _ADMIN_SEED[1]})
+
+    def insert(self, table: str, row: dict) -> int:
+        row_id = self._next_id[table]
+        self._next_id[table] += 1
+        self.tables[table][row_id] = {"id": row_id, **row}
+        return row_id
+
+    def rows(self, table: str) -> List[dict]:
+        return list(self.tables[table].values())
+
+    def delete_where(self, table: str, **match) -> int:
+        doomed = [r["id"] for r in self.tables[table].values() if all(r.get(k) == v for k, v in match.items())]
+        for row_id in doomed:
+            self._cascade(table, row_id)
+            del self.tables[table][row_id]
+        return len(doomed)
+
+    # Foreign keys declared ON DELETE CASCADE in init.sql. student_response is partitioned
+    # and has none, so the repositories delete responses explicitly, as with MySQL.
+    _CASCADES = {
+        "collection": [("question", "collection_id")],
+        "question": [("session_question", "question_id")],
+        "session": [("session_question", "session_id")],
+    }
+
+    def _cascade(self, table: str, row_id: int):
+        for child, column in self._CASCADES.get(table, []):
+            self.delete_where(child, **{column: row_id})
+
+store = MemoryStore()
+
+def _duplicate(key: str, value: Any) -> pymysql.err.IntegrityError:
+    # Same error MySQL raises for a UNIQUE violation, so callers handle both backends alike
+    return pymysql.err.IntegrityError(1062, f"Duplicate entry '{value}' for key '{key}'")
+
+def _page(rows: List[dict], limit: int, key) -> Tuple[List[dict], Optional[str]]:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(*key(rows[-1]))
+    return rows, None
+
+def _stamp(value: datetime) -> str:
+    return value.isoformat(sep=" ")
+
+def _matches_text(text: str, search: str) -> bool:
+    terms = fulltext_terms(search)
+    if terms:
+        # Boolean-mode "+word*" semantics: every term must prefix some word
+        words = ["".join(ch for ch in w if ch.isalnum()) for w in text.lower().split()]
+        return all(any(w.startswith(t[1:-1].lower()) for w in words) for t in terms.split())
+    return search.strip().lower() in text.lower()
+
+def _queries(*names: str):
+    """
+    Records a call under the statement names its MySQL counterpart issues, so
+    per-request query counts (and N+1 checks in tests) mean the same on both backends.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with query.observe(names[0]) as obs:
+                result = await fn(*args, **kwargs)
+                # Paged methods return (rows, cursor)
+                rows = result[0] if isinstance(result, tuple) else result
+                obs.rows = len(rows) if isinstance(rows, list) else int(bool(rows))
+            for name in names[1:]:
+                query.record(name, 0.0, 0)
+            return result
+        return wrapper
+    return decorate
+
+class MemoryAdminUserRepository:
+    @staticmethod
+    @_queries("admin_user.by_username")
+    async def get_by_username(username: str):
+        for row in store.rows("admin_user"):
+            if row["username"] == username:
+                return dict(row)
+        return None
+
+    @staticmethod
+    @_queries("admin_user.insert")
+    async def create(username: str, password: str):
+        if any(r["username"] == username for r in store.rows("admin_user")):
+            raise _duplicate("username", username)
+        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        store.insert("admin_user", {"username": username, "password_hash": hashed})
+        return {"username": username}
+
+    @staticmethod
+    def verify_password(plain_password, hashed_password):
+        try:
+            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        except ValueError:
+            return False
+
+class MemoryCollectionRepository:
+    @staticmethod
+    def _with_count(c: dict) -> dict:
+        count = sum(1 for q in store.rows("question") if q["collection_id"] == c["id"])
+        return {**c, "question_count": count}
+
+    @staticmethod
+    @_queries("collection.all")
+    async def get_all() -> list:
+        return [MemoryCollectionRepository._with_count(c) for c in sorted(store.rows("collection"), key=lambda c: c["id"])]
+
+    @staticmethod
+    @_queries("collection.page")
+    async def list_page(limit: int, cursor: Optional[str] = None, search: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        rows = sorted(store.rows("collection"), key=lambda c: c["id"])
+        if cursor:
+            (last_id,) = decode_cursor(cursor, 1)
+            rows = [c for c in rows if c["id"] > last_id]
+        if search:
+            rows = [c for c in rows if search.strip().lower() in c["name"].lower()]
+        rows = [MemoryCollectionRepository._with_count(c) for c in rows[:limit + 1]]
+        return _page(rows, limit, lambda c: (c["id"],))
+
+    @staticmethod
+    @_queries("collection.insert")
+    async def create(name: str) -> int:
+        return store.insert("collection", {"name": name, "created_at": _now()})
+
+    @staticmethod
+    @_queries("collection.rename")
+    async def rename(collection_id: int, name: str) -> bool:
+        row = store.tables["collection"].get(collection_id)
+        if row is None:
+            return False
+        row["name"] = name
+        return True
+
+    @staticmethod
+    @_queries("question.move_collection", "collection.delete")
+    async def delete_move(collection_id: int, target_id: int):
+        for q in store.rows("question"):
+            if q["collection_id"] == collection_id:
+                q["collection_id"] = target_id
+        store.delete_where("collection", id=collection_id)
+
+    @staticmethod
+    @_queries("student_response.delete_for_collection", "question.delete_by_collection", "collection.delete")
+    async def delete_purge(collection_id: int):
+        doomed = {q["id"] for q in store.rows("question") if q["collection_id"] == collection_id}
+        for r in store.rows("student_response"):
+            if r["question_id"] in doomed:
+                store.delete_where("student_response", id=r["id"])
+        store.delete_where("question", collection_id=collection_id)
+        store.delete_where("collection", id=collection_id)
+
+class MemoryQuestionRepository:
+    @staticmethod
+    def _with_collection(q: dict) -> dict:
+        c = store.tables["collection"].get(q["collection_id"])
+        return {**q, "collection_name": c["name"] if c else None}
+
+    @staticmethod
+    def _newest_first(rows: List[dict]) -> List[dict]:
+        return sorted(rows, key=lambda q: (q["created_at"], q["id"]), reverse=True)
+
+    @staticmethod
+    @_queries("question.all")
+    async def get_all() -> List[Dict[str, Any]]:
+        rows = MemoryQuestionRepository._newest_first(store.rows("question"))
+        return [MemoryQuestionRepository._with_collection(q) for q in rows]
+
+    @staticmethod
+    @_queries("question.page")
+    async def list_page(limit: int, cursor: Optional[str] = None, collection_id: Optional[int] = None,
+                        search: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        rows = MemoryQuestionRepository._newest_first(store.rows("question"))
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, 2)
+            rows = [q for q in rows if (_stamp(q["created_at"]), q["id"]) < (created_at, last_id)]
+        if collection_id is not None:
+            rows = [q for q in rows if q["collection_id"] == collection_id]
+        if search:
+            rows = [q for q in rows if _matches_text(q["text"], search)]
+        projected = []
+        for q in rows[:limit + 1]:
+            full = MemoryQuestionRepository._with_collection(q)
+            projected.append({k: full[k] for k in ("id", "collection_id", "text", "created_at", "collection_name")})
+        return _page(projected, limit, lambda q: (q["created_at"], q["id"]))
+
+    @staticmethod
+    @_queries("question.by_collection")
+    async def get_by_collection(collection_id: int) -> List[Dict[str, Any]]:
+        return [q for q in await MemoryQuestionRepository.get_all() if q["collection_id"] == collection_id]
+
+    @staticmethod
+    @_queries("question.by_id")
+    async def get_by_id(question_id: int) -> dict:
+        row = store.tables["question"].get(question_id)
+        return dict(row) if row else None
+
+    @staticmethod
+    @_queries("question.insert")
+    async def create(q: QuestionCreate) -> int:
+        return store.insert("question", {
+            "collection_id": q.collection_id,
+            "text": q.text,
+            "grading_criteria": q.grading_criteria,
+            "answer_key": q.answer_key,
+            "rubric": q.rubric,
+            "created_at": _now()
+        })
+
+    @staticmethod
+    @_queries("question.update")
+    async def update(question_id: int, q: QuestionCreate) -> bool:
+        row = store.tables["question"].get(question_id)
+        if row is None:
+            return False
+        row.update(text=q.text, grading_criteria=q.grading_criteria, answer_key=q.answer_key, rubric=q.rubric,
+                   collection_id=q.collection_id)
+        return True
+
+    @staticmethod
+    @_queries("student_response.delete_for_question", "question.delete")
+    async def delete(question_id: int) -> bool:
+        store.delete_where("student_response", question_id=question_id)
+        return store.delete_where("question", id=question_id) > 0
+
+class MemorySessionRepository:
+    @staticmethod
+    @_queries("session.insert")
+    async def create(s: SessionCreate, admin_id: int) -> str:
+        taken = {r["code"] for r in store.rows("session")}
+        for _ in range(MAX_CODE_ATTEMPTS):
+            code = generate_join_code()
+            if code not in taken:
+                store.insert("session", {"code": code, "ai_model": s.ai_model, "status": "active", "admin_id": admin_id,
+                                        "created_at": _now(), "closed_at": None, "archived_at": None})
+                return code
+        raise RuntimeError("Could not allocate a unique session code")
+
+    @staticmethod
+    @_queries("session.by_code")
+    async def get_by_code(code: str) -> dict:
+        for row in store.rows("session"):
+            if row["code"] == code:
+                return dict(row)
+        return None
+
+    @staticmethod
+    @_queries("session.all")
+    async def get_all(admin_id: int) -> list:
+        return [dict(r) for r in sorted(store.rows("session"), key=lambda r: r["id"], reverse=True)
+                if r["admin_id"] == admin_id]
+
+    @staticmethod
+    @_queries("session.page")
+    async def list_page(admin_id: int, limit: int, cursor: Optional[str] = None,
+                        status: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        rows = await MemorySessionRepository.get_all(admin_id)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, 1)
+            rows = [r for r in rows if r["id"] < last_id]
+        if status:
+            rows = [r for r in rows if r["status"] == status]
+        return _page(rows[:limit + 1], limit, lambda r: (r["id"],))
+
+    @staticmethod
+    @_queries("session.by_id")
+    async def get_by_id(session_id: int) -> dict:
+        row = store.tables["session"].get(session_id)
+        return dict(row) if row else None
+
+    @staticmethod
+    @_queries("session.live_by_id")
+    async def get_live(session_id: int) -> dict:
+        row = store.tables["session"].get(session_id)
+        return dict(row) if row else None
+
+    @staticmethod
+    @_queries("session.directory")
+    async def get_directory_entries() -> list:
+        return [{"id": r["id"], "code": r["code"], "status": r["status"], "admin_id": r["admin_id"]}
+                for r in store.rows("session") if r["status"] == "active"]
+
+    @staticmethod
+    @_queries("session.close", "session_question.close_for_session")
+    async def close_session(session_id: int):
+        row = store.tables["session"].get(session_id)
+        if row:
+            row["status"] = "closed"
+            row["closed_at"] = _now()
+        for sq in store.rows("session_question"):
+            if sq["session_id"] == session_id:
+                sq["status"] = "closed"
+
+    @staticmethod
+    @_queries("student_response.delete_for_session", "session.delete")
+    async def delete_session(session_id: int):
+        store.delete_where("student_response", session_id=session_id)
+        store.delete_where("session", id=session_id)
+
+    @staticmethod
+    @_queries("session.expired")
+    async def get_expired(closed_before: datetime, limit: int) -> list:
+        rows = [r for r in store.rows("session") if r["status"] == "closed" and r["closed_at"] <= closed_before]
+        return [{"id": r["id"]} for r in sorted(rows, key=lambda r: r["closed_at"])[:limit]]
+
+    @staticmethod
+    @_queries("session.archivable")
+    async def get_archivable(closed_before: datetime, limit: int) -> list:
+        rows = [r for r in store.rows("session")
+                if r["status"] == "closed" and r["archived_at"] is None and r["closed_at"] <= closed_before]
+        return [{"id": r["id"]} for r in sorted(rows, key=lambda r: r["closed_at"])[:limit]]
+
+    @staticmethod
+    @_queries("student_response.delete_for_session", "session_question.delete_for_session", "session.mark_archived")
+    async def mark_archived(session_id: int):
+        store.delete_where("student_response", session_id=session_id)
+        store.delete_where("session_question", session_id=session_id)
+        row = store.tables["session"].get(session_id)
+        if row:
+            row["archived_at"] = _now()
+
+    @staticmethod
+    @_queries("session_question.insert")
+    async def launch_question(session_id: int, question_id: int) -> int:
+        if session_id not in store.tables["session"] or question_id not in store.tables["question"]:
+            raise pymysql.err.IntegrityError(1452, "Cannot add or update a child row: a foreign key constraint fails")
+        return store.insert("session_question", {"session_id": session_id, "question_id": question_id, "status": "open"})
+
+    @staticmethod
+    @_queries("session_question.close")
+    async def close_question(session_question_id: int):
+        row = store.tables["session_question"].get(session_question_id)
+        if row:
+            row["status"] = "closed"
+
+    @staticmethod
+    @_queries("session_question.close_all")
+    async def close_all_questions(session_id: int):
+        for sq in store.rows("session_question"):
+            if sq["session_id"] == session_id and sq["status"] == "open":
+                sq["status"] = "closed"
+
+    @staticmethod
+    @_queries("session_question.active")
+    async def get_active_questions(session_id: int) -> list:
+        result = []
+        for sq in store.rows("session_question"):
+            if sq["session_id"] == session_id and sq["status"] == "open":
+                q = store.tables["question"][sq["question_id"]]
+                shown = {k: v for k, v in q.items() if k not in ("answer_key", "rubric")}
+                result.append({"session_question_id": sq["id"], "status": sq["status"], **shown})
+        return result
+
+    @staticmethod
+    @_queries("session_question.results", "student_response.by_session")
+    async def fetch_results(session_id: int):
+        sqs = []
+        for sq in store.rows("session_question"):
+            if sq["session_id"] != session_id:
+                continue
+            q = store.tables["question"][sq["question_id"]]
+            row = {**sq, "text": q["text"], "grading_criteria": q["grading_criteria"]}
+            row["responses"] = [dict(r) for r in store.rows("student_response") if r["session_question_id"] == sq["id"]]
+            sqs.append(row)
+        if not sqs:
+            session = store.tables["session"].get(session_id)
+            query.record("session.by_id", 0.0, int(bool(session)))
+            if session and session["archived_at"]:
+                return await archive.load(session_id) or []
+        return sqs
+
+class MemoryStudentRepository:
+    @staticmethod
+    @_queries("student_response.insert")
+    async def save_response(session_id: int, question_id: int, session_question_id: int, student_name: str, response_text: str, ai_score: int, ai_feedback: str,
+                            graded_by: Optional[str] = None, graded_from: Optional[int] = None) -> int:
+        return store.insert("student_response", {
+            "session_id": session_id,
+            "question_id": question_id,
+            "session_question_id": session_question_id,
+            "student_name": student_name,
+            "response_text": response_text,
+            "ai_score": ai_score,
+            "ai_feedback": ai_feedback,
+            "graded_by": graded_by,
+            "graded_from": graded_from,
+            "created_at": _now()
+        })
+
+    @staticmethod
+    @_queries("student_response.score_summary")
+    async def get_score_summary(session_id: int) -> list:
+        counts: Dict[Tuple[int, Any], int] = {}
+        for r in store.rows("student_response"):
+            if r["session_id"] == session_id:
+                key = (r["session_question_id"], r["ai_score"])
+                counts[key] = counts.get(key, 0) + 1
+        return [{"session_question_id": sq, "ai_score": score, "n": n} for (sq, score), n in counts.items()]
+
+    @staticmethod
+    @_queries("student_response.graded_examples")
+    async def get_graded_examples(question_id: int, limit: int) -> list:
+        rows = [r for r in store.rows("student_response")
+                if r["question_id"] == question_id and r["ai_score"] is not None
+                and r.get("graded_by") in (None, "openrouter")]
+        rows.sort(key=lambda r: r["id"], reverse=True)
+        return [{"response_text": r["response_text"], "ai_score": r["ai_score"], "ai_feedback": r["ai_feedback"]}
+                for r in rows[:limit]]
+
+class MemoryRetentionRepository:
+    # There are no partitions in memory; expiring whole months removes the same rows dropping them would
+    @staticmethod
+    @_queries("student_response.partitions", "student_response.add_partitions")
+    async def ensure_response_partitions(through: datetime, now: Optional[datetime] = None) -> List[str]:
+        return []
+
+    @staticmethod
+    @_queries("student_response.partitions", "student_response.drop_partitions")
+    async def drop_response_partitions(before: datetime) -> List[str]:
+        from db.retention_repo import month_start, partition_name
+        boundary = month_start(before)
+        expired = [r for r in store.rows("student_response") if month_start(r["created_at"]) < boundary]
+        for r in expired:
+            store.delete_where("student_response", id=r["id"])
+        return sorted({partition_name(month_start(r["created_at"])) for r in expired})
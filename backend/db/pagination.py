@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+
+# Keyset pagination helpers. A cursor is an opaque, URL-safe encoding of the sort key
+# of the last row on the previous page; the next page starts strictly after it.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(*values) -> str:
+    plain = [v.isoformat(sep=" ") if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(plain, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, arity: int) -> list:
+    """Raises ValueError for malformed or foreign cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != arity:
+        raise ValueError("Invalid cursor")
+    return values
+
+def fulltext_terms(search: str) -> str:
+    """
+    Builds a boolean-mode MATCH query requiring every word as a prefix. Returns "" when
+    no word is long enough for the InnoDB full-text index (default min token size 3).
+    """
+    words = ["".join(ch for ch in w if ch.isalnum()) for w in search.split()]
+    return " ".join(f"+{w}*" for w in words if len(w) >= 3)
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,184 @@
+import time
+import logging
+import contextvars
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional, Tuple
+import aiomysql
+from core.config import settings
+from core.coalesce import TTLCache
+from core.metrics import metrics
+from core import tracing
+from db.session import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Every SQL statement the repositories run is registered here under a stable name, so
+# timings, row counts and slow-query logs can be attributed to a query rather than a
+# string of SQL. aiomysql has no binary protocol, so parameters are still interpolated
+# client-side; registration gives a single inventory of the hot-path SQL instead.
+
+class Statement:
+    def __init__(self, name: str, sql: str, cache_ttl: Optional[float] = None):
+        self.name = name
+        self.sql = sql
+        self.cache_ttl = cache_ttl
+        self.cache = TTLCache(cache_ttl, 1024) if cache_ttl else None
+
+    def render(self, **fragments) -> str:
+        # Only statements with dynamic WHERE clauses take fragments, e.g. {where}
+        return self.sql.format(**fragments) if fragments else self.sql
+
+_statements: Dict[str, Statement] = {}
+
+def register(name: str, sql: str, cache_ttl: Optional[float] = None) -> Statement:
+    existing = _statements.get(name)
+    if existing is not None and existing.sql != sql:
+        raise ValueError(f"Statement '{name}' is already registered with different SQL")
+    statement = existing or Statement(name, sql, cache_ttl)
+    _statements[name] = statement
+    return statement
+
+def registered() -> Dict[str, Statement]:
+    return dict(_statements)
+
+def invalidate(*statements: Statement):
+    """Drops cached results, called by writes that change what the statements return."""
+    for statement in statements:
+        if statement.cache is not None:
+            statement.cache.clear()
+
+class QueryStats:
+    """Queries issued while handling one request."""
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.by_name = Counter()
+
+_request_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+@contextmanager
+def collect_stats():
+    stats = QueryStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+def current_stats() -> Optional[QueryStats]:
+    return _request_stats.get()
+
+def record(name: str, elapsed: float, rows: int):
+    metrics.observe(f"db.query.{name}", elapsed)
+    metrics.increment(f"db.rows.{name}", rows)
+    tracing.record(f"db.{name}", elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_seconds += elapsed
+        stats.by_name[name] += 1
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(f"Slow query {name}: {elapsed * 1000:.1f} ms, {rows} rows")
+
+@contextmanager
+def observe(name: str):
+    """Times a unit of work as one query. Set .rows on the yielded object."""
+    class _Observation:
+        rows = 0
+    obs = _Observation()
+    started = time.perf_counter()
+    try:
+        yield obs
+    finally:
+        record(name, time.perf_counter() - started, obs.rows)
+
+class ExecResult:
+    def __init__(self, rowcount: int, lastrowid: int):
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+async def _run(statement: Statement, params: Tuple, mode: str, conn, fragments: dict):
+    if conn is None:
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            return await _run(statement, params, mode, conn, fragments)
+
+    with observe(statement.name) as obs:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(statement.render(**fragments), params)
+            if mode == "all":
+                result = await cur.fetchall()
+                obs.rows = len(result)
+            elif mode == "one":
+                result = await cur.fetchone()
+                obs.rows = 1 if result else 0
+            else:
+                result = ExecResult(cur.rowcount, cur.lastrowid)
+                obs.rows = max(cur.rowcount, 0)
+    return result
+
+async def _cached(statement: Statement, params: Tuple, mode: str, conn, fragments: dict):
+    if statement.cache is None or conn is not None or fragments:
+        return await _run(statement, params, mode, conn, fragments)
+    key = (mode, params)
+    hit = statement.cache.get(key)
+    if hit is not None:
+        metrics.increment(f"db.cache_hits.{statement.name}")
+        return _copy(hit)
+    result = await _run(statement, params, mode, conn, fragments)
+    if result is not None:
+        statement.cache.set(key, _copy(result))
+    return result
+
+def _copy(result):
+    # Callers are free to mutate rows, so the cache never hands out its own objects
+    if isinstance(result, dict):
+        return dict(result)
+    return [dict(row) for row in result]
+
+async def fetch_all(statement: Statement, params: Tuple = (), conn=None, **fragments) -> list:
+    return await _cached(statement, params, "all", conn, fragments)
+
+async def fetch_one(statement: Statement, params: Tuple = (), conn=None, **fragments) -> Optional[dict]:
+    return await _cached(statement, params, "one", conn, fragments)
+
+async def execute(statement: Statement, params: Tuple = (), conn=None, **fragments) -> ExecResult:
+    return await _run(statement, params, "exec", conn, fragments)
+
+@asynccontextmanager
+async def transaction():
+    """Yields a connection inside BEGIN ... COMMIT, rolling back on error."""
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        await conn.begin()
+        try:
+            yield conn
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+class QueryStatsMiddleware:
+    """
+    Counts the queries issued by each HTTP request and reports them in the
+    X-Query-Count and X-Query-Time-Ms response headers, so N+1 patterns are
+    visible to clients and tests.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with collect_stats() as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(stats.count).encode()))
+                    headers.append((b"x-query-time-ms", f"{stats.total_seconds * 1000:.1f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
@@ -1,74 +1,109 @@
-import aiomysql
-from db.session import get_db_pool
+from db import query
+from db.session import is_memory_backend
+from db.pagination import encode_cursor, decode_cursor, fulltext_terms, escape_like
 from models.schemas import QuestionCreate
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-class QuestionRepository:
+_ALL = query.register("question.all", """
+    SELECT q.*, c.name as collection_name
+    FROM question q
+    LEFT JOIN collection c ON q.collection_id = c.id
+    ORDER BY q.created_at DESC
+""")
+_PAGE = query.register("question.page", """
+    SELECT q.id, q.collection_id, q.text, q.created_at, c.name as collection_name
+    FROM question q
+    LEFT JOIN collection c ON q.collection_id = c.id
+    {where}
+    ORDER BY q.created_at DESC, q.id DESC
+    LIMIT %s
+""")
+_BY_COLLECTION = query.register("question.by_collection", """
+    SELECT q.*, c.name as collection_name
+    FROM question q
+    LEFT JOIN collection c ON q.collection_id = c.id
+    WHERE q.collection_id = %s
+    ORDER BY q.created_at DESC
+""")
+# Read on every submit; writes below and in collection_repo invalidate it
+_BY_ID = query.register("question.by_id", "SELECT * FROM question WHERE id = %s", cache_ttl=10.0)
+_INSERT = query.register(
+    "question.insert",
+    "INSERT INTO question (text, grading_criteria, answer_key, rubric, collection_id) VALUES (%s, %s, %s, %s, %s)"
+)
+_UPDATE = query.register(
+    "question.update",
+    "UPDATE question SET text = %s, grading_criteria = %s, answer_key = %s, rubric = %s, collection_id = %s WHERE id = %s"
+)
+_DELETE = query.register("question.delete", "DELETE FROM question WHERE id = %s")
+# student_response has no foreign keys (it is partitioned), so its rows are deleted here
+_DELETE_RESPONSES = query.register("student_response.delete_for_question", "DELETE FROM student_response WHERE question_id = %s")
+
+class MySQLQuestionRepository:
     @staticmethod
     async def get_all() -> List[Dict[str, Any]]:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
-                    SELECT q.*, c.name as collection_name
-                    FROM question q
-                    LEFT JOIN collection c ON q.collection_id = c.id
-                    ORDER BY q.created_at DESC
-                """)
-                return await cur.fetchall()
+        return await query.fetch_all(_ALL)
+
+    @staticmethod
+    async def list_page(limit: int, cursor: Optional[str] = None, collection_id: Optional[int] = None,
+                        search: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of the question bank, newest first, keyed on (created_at, id). Leaves out
+        grading_criteria; fetch a single question for the full record.
+        """
+        where, params = [], []
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, 2)
+            where.append("(q.created_at < %s OR (q.created_at = %s AND q.id < %s))")
+            params += [created_at, created_at, last_id]
+        if collection_id is not None:
+            where.append("q.collection_id = %s")
+            params.append(collection_id)
+        if search:
+            terms = fulltext_terms(search)
+            if terms:
+                where.append("MATCH(q.text) AGAINST (%s IN BOOLEAN MODE)")
+                params.append(terms)
+            else:
+                where.append("q.text LIKE %s")
+                params.append(f"%{escape_like(search.strip())}%")
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+        # Fetch one extra row to learn whether another page exists
+        rows = await query.fetch_all(_PAGE, (*params, limit + 1), where=where_sql)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+        return rows, None
 
     @staticmethod
     async def get_by_collection(collection_id: int) -> List[Dict[str, Any]]:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
-                    SELECT q.*, c.name as collection_name
-                    FROM question q
-                    LEFT JOIN collection c ON q.collection_id = c.id
-                    WHERE q.collection_id = %s
-                    ORDER BY q.created_at DESC
-                """, (collection_id,))
-                return await cur.fetchall()
+        return await query.fetch_all(_BY_COLLECTION, (collection_id,))
 
     @staticmethod
     async def get_by_id(question_id: int) -> dict:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM question WHERE id = %s", (question_id,))
-                return await cur.fetchone()
+        return await query.fetch_one(_BY_ID, (question_id,))
 
     @staticmethod
     async def create(q: QuestionCreate) -> int:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO question (text, grading_criteria, collection_id) VALUES (%s, %s, %s)",
-                    (q.text, q.grading_criteria, q.collection_id)
-                )
-                await conn.commit()
-                return cur.lastrowid
+        result = await query.execute(_INSERT, (q.text, q.grading_criteria, q.answer_key, q.rubric, q.collection_id))
+        return result.lastrowid
 
     @staticmethod
     async def update(question_id: int, q: QuestionCreate) -> bool:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "UPDATE question SET text = %s, grading_criteria = %s, collection_id = %s WHERE id = %s",
-                    (q.text, q.grading_criteria, q.collection_id, question_id)
-                )
-                await conn.commit()
-                return cur.rowcount > 0
+        result = await query.execute(_UPDATE, (q.text, q.grading_criteria, q.answer_key, q.rubric, q.collection_id, question_id))
+        query.invalidate(_BY_ID)
+        return result.rowcount > 0
 
     @staticmethod
     async def delete(question_id: int) -> bool:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("DELETE FROM question WHERE id = %s", (question_id,))
-                await conn.commit()
-                return cur.rowcount > 0
+        async with query.transaction() as conn:
+            await query.execute(_DELETE_RESPONSES, (question_id,), conn=conn)
+            result = await query.execute(_DELETE, (question_id,), conn=conn)
+        query.invalidate(_BY_ID)
+        return result.rowcount > 0
 
+if is_memory_backend():
+    from db.memory_repo import MemoryQuestionRepository as QuestionRepository
+else:
+    QuestionRepository = MySQLQuestionRepository
@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from db import query
+from db.session import is_memory_backend
+
+# student_response is partitioned on UNIX_TIMESTAMP(created_at), one partition per UTC
+# month named pYYYYMM, plus pmax catching anything past the last month created
+_PARTITIONS = query.register("student_response.partitions", """
+    SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS less_than
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'student_response' AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+""")
+_OLDEST_UNSPLIT = query.register(
+    "student_response.oldest_in_pmax",
+    "SELECT MIN(created_at) AS oldest FROM student_response PARTITION (pmax)"
+)
+_SPLIT_PMAX = query.register("student_response.add_partitions", """
+    ALTER TABLE student_response REORGANIZE PARTITION pmax INTO (
+        {partitions},
+        PARTITION pmax VALUES LESS THAN MAXVALUE
+    )
+""")
+_DROP_PARTITIONS = query.register("student_response.drop_partitions", "ALTER TABLE student_response DROP PARTITION {names}")
+
+def month_start(at: datetime) -> datetime:
+    # Naive datetimes are local time, like datetime.now()
+    at = at.astimezone(timezone.utc)
+    return datetime(at.year, at.month, 1, tzinfo=timezone.utc)
+
+def next_month(start: datetime) -> datetime:
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+def partition_name(start: datetime) -> str:
+    return f"p{start.year:04d}{start.month:02d}"
+
+def partition_months(last_bound: Optional[datetime], oldest: Optional[datetime],
+                     now: datetime, through: datetime) -> List[datetime]:
+    """
+    The months to split out of pmax: from the end of the last monthly partition, or on the
+    first run from the month of the oldest row in pmax (the current month if it is empty,
+    or only holds rows dated ahead), up to and including the month of through.
+    """
+    if last_bound is not None:
+        start = month_start(last_bound)
+    else:
+        start = min(month_start(oldest), month_start(now)) if oldest is not None else month_start(now)
+    months = []
+    while start <= month_start(through):
+        months.append(start)
+        start = next_month(start)
+    return months
+
+class MySQLRetentionRepository:
+    @staticmethod
+    async def ensure_response_partitions(through: datetime, now: Optional[datetime] = None) -> List[str]:
+        """Adds monthly partitions up to and including the month of through. Returns the new partition names."""
+        partitions = await query.fetch_all(_PARTITIONS)
+        if not partitions:
+            # Not partitioned yet (database/migrations/003_partition_student_response.sql)
+            return []
+        bounds = [int(p['less_than']) for p in partitions if p['less_than'] != 'MAXVALUE']
+        last_bound = datetime.fromtimestamp(max(bounds), timezone.utc) if bounds else None
+        # First run: split what is already in pmax by month, starting from its oldest row
+        oldest = None if bounds else (await query.fetch_one(_OLDEST_UNSPLIT))['oldest']
+        months = partition_months(last_bound, oldest, now or datetime.now(), through)
+        if not months:
+            return []
+        await query.execute(_SPLIT_PMAX, partitions=",\n        ".join(
+            f"PARTITION {partition_name(m)} VALUES LESS THAN ({int(next_month(m).timestamp())})" for m in months))
+        return [partition_name(m) for m in months]
+
+    @staticmethod
+    async def drop_response_partitions(before: datetime) -> List[str]:
+        """Drops the monthly partitions that end on or before before. Returns their names."""
+        cutoff = before.astimezone(timezone.utc).timestamp()
+        expired = [p['name'] for p in await query.fetch_all(_PARTITIONS)
+                   if p['less_than'] != 'MAXVALUE' and int(p['less_than']) <= cutoff]
+        if expired:
+            await query.execute(_DROP_PARTITIONS, names=", ".join(expired))
+        return expired
+
+if is_memory_backend():
+    from db.memory_repo import MemoryRetentionRepository as RetentionRepository
+else:
+    RetentionRepository = MySQLRetentionRepository
@@ -4,8 +4,14 @@ from core.config import settings
 # Global pool instance
 _pool = None
 
+def is_memory_backend() -> bool:
+    # DATABASE_URL=memory:// swaps every repository for the in-process backend in db/memory_repo.py
+    return settings.DATABASE_URL.startswith("memory://")
+
 async def init_db_pool():
     global _pool
+    if is_memory_backend():
+        return None
     # Parse the SQLAlchemy style URL to aiomysql args
     # format: mysql+aiomysql://root:my-secret-pw@db:3306/fb_tool
     db_url = settings.DATABASE_URL.replace("mysql+aiomysql://", "")
@@ -31,7 +37,7 @@ async def init_db_pool():
     return _pool
 
 async def get_db_pool():
-    if _pool is None:
+    if _pool is None and not is_memory_backend():
         await init_db_pool()
     return _pool
 
@@ -40,3 +46,4 @@ async def close_db_pool():
     if _pool is not None:
         _pool.close()
         await _pool.wait_closed()
+        _pool = None
@@ -1,144 +1,204 @@
-import aiomysql
-import uuid
-import string
-import random
-from db.session import get_db_pool
+import pymysql
+from db import query
+from db.session import is_memory_backend
 from models.schemas import SessionCreate
+from db.pagination import encode_cursor, decode_cursor
+from core.session_directory import generate_join_code, MAX_CODE_ATTEMPTS
+from core.archive import archive
+from datetime import datetime
+from typing import Optional, Tuple
 
-class SessionRepository:
-    @staticmethod
-    def _generate_code(length=6):
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
+_INSERT = query.register("session.insert", "INSERT INTO session (code, ai_model, status, admin_id) VALUES (%s, %s, %s, %s)")
+_BY_CODE = query.register("session.by_code", "SELECT * FROM session WHERE code = %s")
+# Listings are per admin and served by idx_session_admin
+_ALL = query.register("session.all", "SELECT * FROM session WHERE admin_id = %s ORDER BY id DESC")
+_PAGE = query.register("session.page", """
+    SELECT id, code, ai_model, status, admin_id
+    FROM session
+    WHERE admin_id = %s {where}
+    ORDER BY id DESC
+    LIMIT %s
+""")
+# Warms the join-code directory; served by idx_session_status
+_DIRECTORY = query.register("session.directory", "SELECT id, code, status, admin_id FROM session WHERE status = 'active'")
+# Read on every submit; status changes below invalidate it
+_BY_ID = query.register("session.by_id", "SELECT * FROM session WHERE id = %s", cache_ttl=5.0)
+# The same row uncached, for submits: the cache is per worker, and another worker may have closed the session
+_LIVE_BY_ID = query.register("session.live_by_id", "SELECT * FROM session WHERE id = %s")
+_CLOSE = query.register("session.close", "UPDATE session SET status = 'closed', closed_at = CURRENT_TIMESTAMP WHERE id = %s")
+_DELETE = query.register("session.delete", "DELETE FROM session WHERE id = %s")
+# Oldest first; served by idx_session_archivable
+_ARCHIVABLE = query.register("session.archivable", """
+    SELECT id FROM session
+    WHERE status = 'closed' AND archived_at IS NULL AND closed_at <= %s
+    ORDER BY closed_at
+    LIMIT %s
+""")
+# Past the retention window; archived or not
+_EXPIRED = query.register("session.expired", """
+    SELECT id FROM session
+    WHERE status = 'closed' AND closed_at <= %s
+    ORDER BY closed_at
+    LIMIT %s
+""")
+_MARK_ARCHIVED = query.register("session.mark_archived", "UPDATE session SET archived_at = CURRENT_TIMESTAMP WHERE id = %s")
+# student_response has no foreign keys (it is partitioned), so a session's rows are deleted explicitly
+_DELETE_RESPONSES = query.register("student_response.delete_for_session", "DELETE FROM student_response WHERE session_id = %s")
+_DELETE_SESSION_QUESTIONS = query.register("session_question.delete_for_session", "DELETE FROM session_question WHERE session_id = %s")
+_LAUNCH_QUESTION = query.register(
+    "session_question.insert",
+    "INSERT INTO session_question (session_id, question_id, status) VALUES (%s, %s, 'open')"
+)
+_CLOSE_QUESTION = query.register("session_question.close", "UPDATE session_question SET status = 'closed' WHERE id = %s")
+_CLOSE_ALL_QUESTIONS = query.register(
+    "session_question.close_all",
+    "UPDATE session_question SET status = 'closed' WHERE session_id = %s AND status = 'open'"
+)
+_CLOSE_SESSION_QUESTIONS = query.register(
+    "session_question.close_for_session",
+    "UPDATE session_question SET status = 'closed' WHERE session_id = %s"
+)
+# Sent to students, so not the answer key or rubric
+_ACTIVE_QUESTIONS = query.register("session_question.active", """
+    SELECT sq.id as session_question_id, sq.status, q.id, q.collection_id, q.text, q.grading_criteria, q.created_at
+    FROM session_question sq
+    JOIN question q ON sq.question_id = q.id
+    WHERE sq.session_id = %s AND sq.status = 'open'
+""")
+_RESULT_QUESTIONS = query.register("session_question.results", """
+    SELECT sq.*, q.text, q.grading_criteria
+    FROM session_question sq
+    JOIN question q ON sq.question_id = q.id
+    WHERE sq.session_id = %s
+""")
+_RESULT_RESPONSES = query.register(
+    "student_response.by_session",
+    "SELECT * FROM student_response WHERE session_id = %s"
+)
 
+class MySQLSessionRepository:
     @staticmethod
-    async def create(s: SessionCreate) -> str:
-        pool = await get_db_pool()
-        code = SessionRepository._generate_code()
-        # Ensure code uniqueness in real app, skipping loop for brevity
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO session (code, ai_model, status) VALUES (%s, %s, %s)",
-                    (code, s.ai_model, 'active')
-                )
-        return code
+    async def create(s: SessionCreate, admin_id: int) -> str:
+        # The UNIQUE index on code is the arbiter; on a duplicate just draw another code
+        for _ in range(MAX_CODE_ATTEMPTS):
+            code = generate_join_code()
+            try:
+                await query.execute(_INSERT, (code, s.ai_model, 'active', admin_id))
+                return code
+            except pymysql.err.IntegrityError as e:
+                if e.args[0] != 1062:
+                    raise
+        raise RuntimeError("Could not allocate a unique session code")
 
     @staticmethod
     async def get_by_code(code: str) -> dict:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM session WHERE code = %s", (code,))
-                return await cur.fetchone()
+        return await query.fetch_one(_BY_CODE, (code,))
 
     @staticmethod
-    async def get_all() -> list:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM session ORDER BY id DESC")
-                return await cur.fetchall()
+    async def get_all(admin_id: int) -> list:
+        return await query.fetch_all(_ALL, (admin_id,))
 
     @staticmethod
-    async def get_active_session() -> dict:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM session WHERE status = 'active' LIMIT 1")
-                return await cur.fetchone()
+    async def list_page(admin_id: int, limit: int, cursor: Optional[str] = None,
+                        status: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        where, params = [], [admin_id]
+        if cursor:
+            (last_id,) = decode_cursor(cursor, 1)
+            where.append("id < %s")
+            params.append(last_id)
+        if status:
+            where.append("status = %s")
+            params.append(status)
+        where_sql = "".join(f" AND {w}" for w in where)
+
+        rows = await query.fetch_all(_PAGE, (*params, limit + 1), where=where_sql)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1]['id'])
+        return rows, None
 
     @staticmethod
     async def get_by_id(session_id: int) -> dict:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM session WHERE id = %s", (session_id,))
-                return await cur.fetchone()
+        return await query.fetch_one(_BY_ID, (session_id,))
+
+    @staticmethod
+    async def get_live(session_id: int) -> dict:
+        return await query.fetch_one(_LIVE_BY_ID, (session_id,))
+
+    @staticmethod
+    async def get_directory_entries() -> list:
+        return await query.fetch_all(_DIRECTORY)
 
     @staticmethod
     async def close_session(session_id: int):
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            await conn.begin()
-            try:
-                async with conn.cursor() as cur:
-                    await cur.execute("UPDATE session SET status = 'closed' WHERE id = %s", (session_id,))
-                    await cur.execute("UPDATE session_question SET status = 'closed' WHERE session_id = %s", (session_id,))
-                await conn.commit()
-            except Exception as e:
-                await conn.rollback()
-                raise e
+        async with query.transaction() as conn:
+            await query.execute(_CLOSE, (session_id,), conn=conn)
+            await query.execute(_CLOSE_SESSION_QUESTIONS, (session_id,), conn=conn)
+        query.invalidate(_BY_ID)
 
     @staticmethod
     async def delete_session(session_id: int):
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("DELETE FROM session WHERE id = %s", (session_id,))
+        async with query.transaction() as conn:
+            await query.execute(_DELETE_RESPONSES, (session_id,), conn=conn)
+            await query.execute(_DELETE, (session_id,), conn=conn)
+        query.invalidate(_BY_ID)
+
+    @staticmethod
+    async def get_archivable(closed_before: datetime, limit: int) -> list:
+        return await query.fetch_all(_ARCHIVABLE, (closed_before, limit))
+
+    @staticmethod
+    async def get_expired(closed_before: datetime, limit: int) -> list:
+        return await query.fetch_all(_EXPIRED, (closed_before, limit))
+
+    @staticmethod
+    async def mark_archived(session_id: int):
+        # Only call once the archive file is written: this drops the hot copy
+        async with query.transaction() as conn:
+            await query.execute(_DELETE_RESPONSES, (session_id,), conn=conn)
+            await query.execute(_DELETE_SESSION_QUESTIONS, (session_id,), conn=conn)
+            await query.execute(_MARK_ARCHIVED, (session_id,), conn=conn)
+        query.invalidate(_BY_ID)
 
     @staticmethod
     async def launch_question(session_id: int, question_id: int) -> int:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO session_question (session_id, question_id, status) VALUES (%s, %s, 'open')",
-                    (session_id, question_id)
-                )
-                return cur.lastrowid
+        result = await query.execute(_LAUNCH_QUESTION, (session_id, question_id))
+        return result.lastrowid
 
     @staticmethod
     async def close_question(session_question_id: int):
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "UPDATE session_question SET status = 'closed' WHERE id = %s",
-                    (session_question_id,)
-                )
+        await query.execute(_CLOSE_QUESTION, (session_question_id,))
 
     @staticmethod
     async def close_all_questions(session_id: int):
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "UPDATE session_question SET status = 'closed' WHERE session_id = %s AND status = 'open'",
-                    (session_id,)
-                )
+        await query.execute(_CLOSE_ALL_QUESTIONS, (session_id,))
 
     @staticmethod
     async def get_active_questions(session_id: int) -> list:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
-                    SELECT sq.id as session_question_id, sq.status, q.*
-                    FROM session_question sq
-                    JOIN question q ON sq.question_id = q.id
-                    WHERE sq.session_id = %s AND sq.status = 'open'
-                """, (session_id,))
-                return await cur.fetchall()
+        return await query.fetch_all(_ACTIVE_QUESTIONS, (session_id,))
 
     @staticmethod
     async def fetch_results(session_id: int):
-        # Used for admin dashboard to see closed and open questions with stats
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
-                    SELECT sq.*, q.text, q.grading_criteria
-                    FROM session_question sq
-                    JOIN question q ON sq.question_id = q.id
-                    WHERE sq.session_id = %s
-                """, (session_id,))
-                sqs = await cur.fetchall()
-                
-                for sq in sqs:
-                    await cur.execute("""
-                        SELECT * FROM student_response 
-                        WHERE session_question_id = %s
-                    """, (sq['id'],))
-                    sq['responses'] = await cur.fetchall()
-                
-                return sqs
+        # Used for admin dashboard to see closed and open questions with stats.
+        # Two queries regardless of question count: the questions, then every response in the session.
+        sqs = await query.fetch_all(_RESULT_QUESTIONS, (session_id,))
+        if not sqs:
+            # Archived sessions have nothing left in the hot tables; read them from their file.
+            # Sessions without questions yet also get here, on every dashboard poll, so check first.
+            session = await query.fetch_one(_BY_ID, (session_id,))
+            if session and session['archived_at']:
+                return await archive.load(session_id) or []
+            return []
+        responses = await query.fetch_all(_RESULT_RESPONSES, (session_id,))
+        by_question = {sq['id']: [] for sq in sqs}
+        for r in responses:
+            if r['session_question_id'] in by_question:
+                by_question[r['session_question_id']].append(r)
+        for sq in sqs:
+            sq['responses'] = by_question[sq['id']]
+        return sqs
+
+if is_memory_backend():
+    from db.memory_repo import MemorySessionRepository as SessionRepository
+else:
+    SessionRepository = MySQLSessionRepository
@@ -1,17 +1,48 @@
-import aiomysql
-from db.session import get_db_pool
+from typing import Optional
+from db import query
+from db.session import is_memory_backend
+
+_INSERT = query.register("student_response.insert", """
+    INSERT INTO student_response
+    (session_id, question_id, session_question_id, student_name, response_text, ai_score, ai_feedback, graded_by, graded_from)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+""")
+# Grouped counts used to rebuild in-memory score aggregates without reading response bodies
+_SCORE_SUMMARY = query.register("student_response.score_summary", """
+    SELECT session_question_id, ai_score, COUNT(*) AS n
+    FROM student_response
+    WHERE session_id = %s
+    GROUP BY session_question_id, ai_score
+""")
+# Answers the model graded (rows from before graded_by have NULL), to train the local grader on
+_GRADED_EXAMPLES = query.register("student_response.graded_examples", """
+    SELECT response_text, ai_score, ai_feedback
+    FROM student_response
+    WHERE question_id = %s AND ai_score IS NOT NULL AND (graded_by IS NULL OR graded_by = 'openrouter')
+    ORDER BY id DESC
+    LIMIT %s
+""")
+
+class MySQLStudentRepository:
+    @staticmethod
+    async def save_response(session_id: int, question_id: int, session_question_id: int, student_name: str, response_text: str, ai_score: int, ai_feedback: str,
+                            graded_by: Optional[str] = None, graded_from: Optional[int] = None) -> int:
+        result = await query.execute(
+            _INSERT,
+            (session_id, question_id, session_question_id, student_name, response_text, ai_score, ai_feedback,
+             graded_by, graded_from)
+        )
+        return result.lastrowid
 
-class StudentRepository:
     @staticmethod
-    async def save_response(session_id: int, question_id: int, session_question_id: int, student_name: str, response_text: str, ai_score: int, ai_feedback: str) -> int:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    """INSERT INTO student_response 
-                       (session_id, question_id, session_question_id, student_name, response_text, ai_score, ai_feedback) 
-                       VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                    (session_id, question_id, session_question_id, student_name, response_text, ai_score, ai_feedback)
-                )
-                await conn.commit()
-                return cur.lastrowid
+    async def get_score_summary(session_id: int) -> list:
+        return await query.fetch_all(_SCORE_SUMMARY, (session_id,))
+
+    @staticmethod
+    async def get_graded_examples(question_id: int, limit: int) -> list:
+        return await query.fetch_all(_GRADED_EXAMPLES, (question_id, limit))
+
+if is_memory_backend():
+    from db.memory_repo import MemoryStudentRepository as StudentRepository
+else:
+    StudentRepository = MySQLStudentRepository
@@ -0,0 +1,13 @@
+"""
+Session-affinity front for a sharded deployment. Start one backend per core, each with
+SHARD_WORKERS listing all of them and SHARD_SELF naming itself, then put this in front:
+
+    SHARD_WORKERS=http://127.0.0.1:8001,http://127.0.0.1:8002 uvicorn dispatch:app --port 8000
+"""
+from core.sharding import Dispatcher, WorkerProxy, configured_workers
+
+workers = configured_workers()
+if not workers:
+    raise RuntimeError("SHARD_WORKERS must list the worker base URLs to dispatch to")
+
+app = Dispatcher({url: WorkerProxy(url) for url in workers})
@@ -0,0 +1,49 @@
+"""
+Moves closed sessions older than ARCHIVE_AFTER_DAYS out of the hot tables. Each session's
+results are written to a compressed file under ARCHIVE_DIR, then its questions and
+responses are deleted; the session row stays, so it is still listed, and its results and
+CSV export are read back from the file. Safe to re-run, e.g. nightly from cron:
+
+    cd backend && python -m jobs.archive [--days N] [--limit N]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List
+from core.archive import archive
+from core.config import settings
+from db.session import init_db_pool, close_db_pool
+from db.session_repo import SessionRepository
+
+logger = logging.getLogger(__name__)
+
+async def archive_closed_sessions(older_than_days: float, limit: int = 100) -> List[int]:
+    """Archives up to limit sessions closed at least older_than_days ago, oldest first. Returns their ids."""
+    closed_before = datetime.now() - timedelta(days=older_than_days)
+    archived = []
+    for row in await SessionRepository.get_archivable(closed_before, limit):
+        session_id = row['id']
+        results = await SessionRepository.fetch_results(session_id)
+        await asyncio.to_thread(archive.write, session_id, results)
+        await SessionRepository.mark_archived(session_id)
+        archived.append(session_id)
+        logger.info(f"Archived session {session_id}: {len(results)} question(s), "
+                    f"{sum(len(q['responses']) for q in results)} response(s)")
+    return archived
+
+async def main(days: float, limit: int):
+    await init_db_pool()
+    try:
+        archived = await archive_closed_sessions(days, limit)
+        print(f"Archived {len(archived)} session(s) to {archive.root}")
+    finally:
+        await close_db_pool()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Archive closed sessions")
+    parser.add_argument("--days", type=float, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.days, args.limit))
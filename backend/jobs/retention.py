@@ -0,0 +1,58 @@
+"""
+Applies the retention policy. Drops student_response partitions for months that ended
+more than RESPONSE_RETENTION_DAYS ago (a metadata change, unlike deleting the rows one by
+one), deletes sessions closed before then along with their archive files, and adds the
+monthly partitions for the next RESPONSE_PARTITIONS_AHEAD_MONTHS so inserts never land
+in the catch-all partition. Safe to re-run, e.g. nightly from cron:
+
+    cd backend && python -m jobs.retention [--days N] [--ahead N]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from core.archive import archive
+from core.config import settings
+from db.session import init_db_pool, close_db_pool
+from db.retention_repo import RetentionRepository
+from db.session_repo import SessionRepository
+
+logger = logging.getLogger(__name__)
+
+async def apply_retention(retention_days: float, ahead_months: int, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=retention_days)
+
+    added = await RetentionRepository.ensure_response_partitions(now + timedelta(days=31 * ahead_months), now)
+    dropped = await RetentionRepository.drop_response_partitions(cutoff)
+
+    deleted = []
+    while True:
+        expired = await SessionRepository.get_expired(cutoff, 100)
+        if not expired:
+            break
+        for row in expired:
+            # Most of their responses went with the partitions; this removes the rest
+            await SessionRepository.delete_session(row['id'])
+            await asyncio.to_thread(archive.remove, row['id'])
+            deleted.append(row['id'])
+
+    logger.info(f"Retention: added partitions {added or 'none'}, dropped {dropped or 'none'}, "
+                f"deleted {len(deleted)} session(s) closed before {cutoff:%Y-%m-%d}")
+    return {"added_partitions": added, "dropped_partitions": dropped, "deleted_sessions": deleted}
+
+async def main(days: float, ahead: int):
+    await init_db_pool()
+    try:
+        print(await apply_retention(days, ahead))
+    finally:
+        await close_db_pool()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Apply the response retention policy")
+    parser.add_argument("--days", type=float, default=settings.RESPONSE_RETENTION_DAYS)
+    parser.add_argument("--ahead", type=int, default=settings.RESPONSE_PARTITIONS_AHEAD_MONTHS)
+    args = parser.parse_args()
+    asyncio.run(main(args.days, args.ahead))
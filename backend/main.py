@@ -1,10 +1,20 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import sys
 
 from db.session import init_db_pool, close_db_pool
-from api import admin_auth, questions, admin_sessions, student, collections
+from db.query import QueryStatsMiddleware
+from core.compression import CompressionMiddleware
+from core.tracing import TraceMiddleware
+from core.config import settings
+from db.session_repo import SessionRepository
+from core.connections import manager
+from core.lifecycle import lifecycle
+from core.graders import graders
+from core.sharding import local_shard, ShardGuardMiddleware
+from api import admin_auth, questions, admin_sessions, student, collections, metrics
 
 # Configure Application Logging
 logging.basicConfig(
@@ -24,18 +34,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Query-Count", "X-Query-Time-Ms", "X-Trace-Id", "Server-Timing"],
 )
+app.add_middleware(QueryStatsMiddleware)
+# Not installed at all when off, so untraced requests cost nothing
+if settings.TRACING_ENABLED:
+    app.add_middleware(TraceMiddleware)
+if local_shard.enabled:
+    app.add_middleware(ShardGuardMiddleware, shard=local_shard)
+# Outermost, so the query headers above are set before the body is compressed
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
 
 @app.on_event("startup")
 async def startup_event():
     await init_db_pool()
+    # Active sessions are resolved from memory during join storms; a shard only keeps its own
+    student.session_directory.warm(await SessionRepository.get_directory_entries())
+    manager.start_heartbeat()
+    lifecycle.install_signal_handler(drain)
+
+async def drain():
+    # Refuse new submits, let in-flight grading finish and save, then move sockets over
+    abandoned = await lifecycle.drain(settings.SHUTDOWN_DRAIN_SECONDS)
+    if abandoned:
+        logging.getLogger(__name__).error(f"Shutting down with {abandoned} submission(s) unfinished")
+    await manager.close_all(lifecycle.RETRY_AFTER_SECONDS)
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    # A no-op if SIGTERM already drained; covers SIGINT and servers without our signal handler
+    await drain()
+    await manager.stop_heartbeat()
+    student.response_clusters.shutdown()
+    graders.shutdown()
     await close_db_pool()
 
 @app.get("/health")
 async def health_check():
+    # Load balancers stop routing here as soon as a drain starts
+    if lifecycle.draining:
+        return JSONResponse(status_code=503, content={"status": "draining"})
     return {"status": "ok"}
 
 # Include routers
@@ -44,3 +82,4 @@ app.include_router(questions.router, prefix="/api/admin", tags=["Questions"])
 app.include_router(collections.router, prefix="/api/admin", tags=["Collections"])
 app.include_router(admin_sessions.router, prefix="/api/admin", tags=["Admin Sessions"])
 app.include_router(student.router, prefix="/api/student", tags=["Student"])
+app.include_router(metrics.router, prefix="/api/admin", tags=["Metrics"])
@@ -21,6 +21,10 @@ class QuestionBase(BaseModel):
     text: str
     grading_criteria: str
     collection_id: int = 1
+    # Checked before the model is called: accepted answers one per line (full marks on an
+    # exact match, ignoring case and punctuation), and `score: regex` lines
+    answer_key: Optional[str] = None
+    rubric: Optional[str] = None
 
 class QuestionCreate(QuestionBase):
     pass
@@ -33,6 +37,18 @@ class Question(QuestionBase):
     class Config:
         from_attributes = True
 
+class QuestionSummary(BaseModel):
+    # List-view projection: everything but the (potentially large) grading criteria
+    id: int
+    text: str
+    collection_id: int
+    collection_name: Optional[str] = None
+    created_at: datetime
+
+class QuestionPage(BaseModel):
+    items: List[QuestionSummary]
+    next_cursor: Optional[str] = None
+
 # ==========================================
 # Collection Schemas
 # ==========================================
@@ -68,6 +84,7 @@ class Session(SessionBase):
     id: int
     code: str
     status: str
+    admin_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -99,6 +116,8 @@ class StudentResponse(BaseModel):
     response_text: str
     ai_score: Optional[int]
     ai_feedback: Optional[str]
+    graded_by: Optional[str] = None
+    graded_from: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -1,9 +1,21 @@
+import os
+
+# Run against the in-process backend unless DATABASE_URL points at a MySQL test database
+os.environ.setdefault("DATABASE_URL", "memory://")
+
 import pytest
 import asyncio
+from types import SimpleNamespace
 import pytest_asyncio
 from httpx import AsyncClient
 from main import app
-from db.session import get_db_pool, init_db_pool, close_db_pool
+from db import query
+from db.session import get_db_pool, init_db_pool, close_db_pool, is_memory_backend
+from core.rate_limit import submit_rate_limiter, InMemoryRateLimitBackend, ws_accept_limiter
+from api.student import submissions, stats_store, grade_reuse, response_clusters, session_directory, active_questions
+from core.lifecycle import lifecycle
+from core.connections import manager
+from core.tracing import traces
 
 @pytest_asyncio.fixture(autouse=True)
 async def setup_db():
@@ -13,21 +25,39 @@ async def setup_db():
 
 @pytest_asyncio.fixture(autouse=True)
 async def reset_db(setup_db):
-    pool = await get_db_pool()
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute("SET FOREIGN_KEY_CHECKS = 0")
-            await cur.execute("TRUNCATE TABLE student_response")
-            await cur.execute("TRUNCATE TABLE session_question")
-            await cur.execute("TRUNCATE TABLE session")
-            await cur.execute("TRUNCATE TABLE question")
-            # Clear admin_user and re-seed to ensure clean state
-            await cur.execute("TRUNCATE TABLE admin_user")
-            await cur.execute("INSERT INTO admin_user (username, password_hash) VALUES ('admin', '$2b$12$A//WYZ.2uhuZ9dM/VkvIeu6wCwt2l1tOtG4t0PryzniXGW72YC6/6')")
-            # Clear collection and re-seed Default
-            await cur.execute("TRUNCATE TABLE collection")
-            await cur.execute("INSERT INTO collection (id, name) VALUES (1, 'Default')")
-            await cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+    if is_memory_backend():
+        from db.memory_repo import store
+        store.reset()
+    else:
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+                await cur.execute("TRUNCATE TABLE student_response")
+                await cur.execute("TRUNCATE TABLE session_question")
+                await cur.execute("TRUNCATE TABLE session")
+                await cur.execute("TRUNCATE TABLE question")
+                # Clear admin_user and re-seed to ensure clean state
+                await cur.execute("TRUNCATE TABLE admin_user")
+                await cur.execute("INSERT INTO admin_user (username, password_hash) VALUES ('admin', '$2b$12$A//WYZ.2uhuZ9dM/VkvIeu6wCwt2l1tOtG4t0PryzniXGW72YC6/6')")
+                # Clear collection and re-seed Default
+                await cur.execute("TRUNCATE TABLE collection")
+                await cur.execute("INSERT INTO collection (id, name) VALUES (1, 'Default')")
+                await cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+        # Ids restart after the truncate, so cached lookups (session.by_id) would see the last test's rows
+        query.invalidate(*query.registered().values())
+    # Ids restart after a reset, so in-process limiter and duplicate state must not leak between tests
+    submit_rate_limiter.backend = InMemoryRateLimitBackend()
+    submissions.clear()
+    stats_store.clear()
+    response_clusters.clear()
+    grade_reuse.clear()
+    session_directory.clear()
+    lifecycle.reset()
+    manager.clear()
+    active_questions.clear()
+    ws_accept_limiter.reset()
+    traces.clear()
 
 @pytest_asyncio.fixture
 async def async_client():
@@ -43,3 +73,25 @@ async def admin_token(async_client):
     if response.status_code != 200:
         raise Exception(f"Failed to login: {response.text}")
     return response.json()["access_token"]
+
+@pytest_asyncio.fixture
+async def live_question(async_client, admin_token):
+    """
+    Starts a session with one question live, the way most contract tests begin:
+    await live_question({"text": ..., "grading_criteria": ...}) creates the question (or
+    reuses question_id), starts a session, joins it and activates the question. Returns
+    headers, q_id, code, s_id, sq_id and submit_url.
+    """
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    async def start(question: dict = None, question_id: int = None, ai_model: str = "test-model") -> SimpleNamespace:
+        if question_id is None:
+            question_id = (await async_client.post("/api/admin/questions", json=question or {"text": "Q", "grading_criteria": "C"},
+                                                   headers=headers)).json()["id"]
+        code = (await async_client.post("/api/admin/sessions", json={"ai_model": ai_model}, headers=headers)).json()["code"]
+        s_id = (await async_client.post(f"/api/student/join/{code}")).json()["session_id"]
+        sq_id = (await async_client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={question_id}",
+                                         headers=headers)).json()["session_question_id"]
+        return SimpleNamespace(headers=headers, q_id=question_id, code=code, s_id=s_id, sq_id=sq_id,
+                               submit_url=f"/api/student/session/{s_id}/question/{question_id}/instance/{sq_id}/submit")
+    return start
@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from main import app
+from core.security import create_ws_token
+from db.session import is_memory_backend
+
+# TestClient runs the app on its own event loop, which only the in-process backend tolerates
+pytestmark = pytest.mark.skipif(not is_memory_backend(), reason="requires DATABASE_URL=memory://")
+
+def _start_session(client: TestClient) -> int:
+    token = client.post("/api/admin/login", data={"username": "admin", "password": "admin"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    code = client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers).json()["code"]
+    return client.post(f"/api/student/join/{code}").json()["session_id"]
+
+def test_admin_socket_rejects_bad_token():
+    client = TestClient(app)
+    session_id = _start_session(client)
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/api/admin/ws/{session_id}?token=nope"):
+            pass
+    # A token for another session is rejected too
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/api/admin/ws/{session_id}?token={create_ws_token('admin', session_id + 1)}"):
+            pass
+
+def test_admin_socket_topics():
+    client = TestClient(app)
+    session_id = _start_session(client)
+    token = create_ws_token("admin", session_id)
+
+    with client.websocket_connect(f"/api/admin/ws/{session_id}?token={token}&topics=roster") as admin:
+        snapshot = admin.receive_json()
+        assert snapshot == {"type": "roster_update", "count": 0, "names": []}, f"Unexpected snapshot: {snapshot}"
+
+        with client.websocket_connect(f"/api/student/ws/{session_id}") as student:
+            student.receive_json()  # active_questions
+            student.send_json({"type": "join", "name": "Ada"})
+            event = admin.receive_json()
+            assert event["type"] == "roster_update" and event["names"] == ["Ada"], f"Unexpected event: {event}"
+
+        # Subscribing to a new topic delivers its current state first
+        admin.send_json({"type": "subscribe", "topics": ["roster", "questions"]})
+        messages = [admin.receive_json(), admin.receive_json()]
+        types = sorted(m["type"] for m in messages)
+        assert types == ["active_questions", "roster_update"], f"Unexpected messages: {messages}"
@@ -0,0 +1,71 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from core import clustering
+from core.clustering import ResponseClusterStore, absorb, vectorize
+
+TILT = ["The earth is tilted on its axis so sunlight hits at different angles",
+        "Because of the tilt of Earth's axis, the angle of sunlight changes",
+        "earths axis is tilted 23.5 degrees which changes how direct the sunlight is",
+        "The tilt of the axis makes the sun's rays more direct in summer",
+        "Earth's tilt changes the angle sunlight hits us",
+        "tilted axis -> more direct sunlight and longer days in summer"]
+DISTANCE = ["Because the earth is closer to the sun in summer and farther in winter",
+            "The distance from the sun changes, closer means hotter",
+            "in summer we are closer to the sun",
+            "When Earth gets closer to the sun it becomes summer",
+            "the earth is farther away from the sun in winter"]
+
+def test_vectors_fold_case_punctuation_and_word_forms():
+    """Verify trivially different answers vectorize identically and paraphrases stay close."""
+    assert vectorize("The Earth's axis is TILTED!") == vectorize("the earth's axis is tilted")
+    a, b = vectorize("the axis tilts"), vectorize("the axis is tilted")
+    assert sum(v * b.get(k, 0.0) for k, v in a.items()) > 0.8
+
+def test_clusters_separate_a_misconception_in_any_order():
+    """Verify the correct answers and the distance misconception end up in separate, pure groups."""
+    answers = [(i, text) for i, text in enumerate(TILT + DISTANCE)]
+    for seed in range(5):
+        random.Random(seed).shuffle(answers)
+        # Arriving in batches, as they do from the store
+        absorb(seed, 0.25, answers[:4], fresh=True)
+        responses, summary = absorb(seed, 0.25, answers[4:], fresh=False)
+        assert responses == len(answers)
+        big = summary[:2]
+        groups = [{"tilt" if rid < len(TILT) else "distance" for rid in c["response_ids"]} for c in big]
+        assert all(len(g) == 1 for g in groups) and groups[0] != groups[1], f"Mixed groups (seed {seed}): {summary}"
+        assert sum(c["size"] for c in big) >= len(answers) - 1, f"Too fragmented (seed {seed}): {summary}"
+
+def test_worker_keeps_clusters_between_batches():
+    """Verify later batches build on the clusters kept in the worker and a lost state is reported, not restarted."""
+    absorb(100, 0.25, [(1, TILT[0])], fresh=True)
+    assert absorb(100, 0.25, [(2, TILT[1]), (1, TILT[0])], fresh=False)[0] == 2, "Duplicates and earlier answers are kept"
+    clustering.discard([100])
+    with pytest.raises(LookupError):
+        absorb(100, 0.25, [(3, TILT[2])], fresh=False)
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_kept_for_the_next_rebuild(monkeypatch):
+    """Verify answers in a batch the worker failed on still show up once the next answer rebuilds the clusters."""
+    calls = []
+    def flaky(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("worker lost")
+        return absorb(*args)
+    monkeypatch.setattr(clustering, "absorb", flaky)
+    executor = ThreadPoolExecutor(1)
+    store = ResponseClusterStore(None, 1, 0.25)
+    monkeypatch.setattr(store, "_executor", lambda key: executor)
+
+    async def loader(session_id):
+        return [{"id": 900, "responses": [{"id": i, "response_text": t} for i, t in enumerate(TILT[:3])]}]
+    store._loader = loader
+    try:
+        assert (await store.get_session(1))[0]["responses"] == 0, "The first batch was meant to fail"
+        await store.record(1, 900, 3, TILT[3])
+        summary = await store.get_session(1)
+        assert summary[0]["responses"] == 4, f"The failed batch was lost: {summary}"
+        assert calls[-1][3] is True, "The answers after a failed rebuild must rebuild the clusters"
+    finally:
+        executor.shutdown()
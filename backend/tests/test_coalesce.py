@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from core.coalesce import IdempotentExecutor, IdempotencyConflict
+
+@pytest.mark.asyncio
+async def test_fingerprint_expires_with_the_cached_result():
+    """A key reused with a different request is refused for as long as its result is cached."""
+    executor = IdempotentExecutor(ttl_seconds=0.2, max_entries=10)
+
+    async def slow_grade():
+        # Longer than half the TTL, so a fingerprint stored at request time would expire first
+        await asyncio.sleep(0.15)
+        return "graded v1"
+
+    assert await executor.run("key", slow_grade, "v1") == ("graded v1", "executed")
+    await asyncio.sleep(0.1)
+    with pytest.raises(IdempotencyConflict):
+        await executor.run("key", slow_grade, "v2")
+    assert await executor.run("key", slow_grade, "v1") == ("graded v1", "cached")
+
+    await asyncio.sleep(0.2)
+
+    async def grade_v2():
+        return "graded v2"
+    assert await executor.run("key", grade_v2, "v2") == ("graded v2", "executed"), \
+        "Once the result expires the key is free for a new request"
+
+@pytest.mark.asyncio
+async def test_in_flight_key_refuses_a_different_request():
+    executor = IdempotentExecutor(ttl_seconds=10, max_entries=10)
+    release = asyncio.Event()
+
+    async def grade():
+        await release.wait()
+        return "graded"
+
+    first = asyncio.ensure_future(executor.run("key", grade, "v1"))
+    await asyncio.sleep(0)
+    with pytest.raises(IdempotencyConflict):
+        await executor.run("key", grade, "v2")
+    duplicate = asyncio.ensure_future(executor.run("key", grade, "v1"))
+    await asyncio.sleep(0)
+    release.set()
+    assert await first == ("graded", "executed")
+    assert await duplicate == ("graded", "coalesced")
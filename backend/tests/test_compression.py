@@ -0,0 +1,49 @@
+import gzip
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from core.compression import CompressionMiddleware
+
+BIG = {"rows": ["the same answer text again"] * 200}
+
+async def big(request):
+    return JSONResponse(BIG)
+
+async def small(request):
+    return JSONResponse({"ok": True})
+
+async def events(request):
+    return StreamingResponse(iter([b"data: one\n\n", b"data: two\n\n"] * 100), media_type="text/event-stream")
+
+app = Starlette(routes=[Route("/big", big), Route("/small", small), Route("/events", events)])
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+async def _raw(client, path, headers):
+    async with client.stream("GET", path, headers=headers) as response:
+        return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response, body = await _raw(client, "/big", {"Accept-Encoding": "gzip"})
+    assert response.headers.get("content-encoding") == "gzip", f"Expected gzip, got {dict(response.headers)}"
+    assert len(body) < len(JSONResponse(BIG).body) / 5, f"Compressed body is {len(body)} bytes"
+    assert gzip.decompress(body) == JSONResponse(BIG).body
+
+@pytest.mark.asyncio
+async def test_brotli_only_clients_get_identity():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response, body = await _raw(client, "/big", {"Accept-Encoding": "br"})
+    assert "content-encoding" not in response.headers, f"Only gzip is offered, got {dict(response.headers)}"
+    assert body == JSONResponse(BIG).body
+
+@pytest.mark.asyncio
+async def test_small_and_streamed_events_are_not_compressed():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response, _ = await _raw(client, "/small", {"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers, "Small responses should be sent as-is"
+        response, body = await _raw(client, "/events", {"Accept-Encoding": "gzip, br", "Accept": "text/event-stream"})
+        assert "content-encoding" not in response.headers, "Event streams must not be buffered by a compressor"
+        assert body.startswith(b"data: one"), f"Unexpected stream body: {body[:20]}"
@@ -513,3 +513,752 @@ async def test_delete_collection_purge_contract(async_client, admin_token):
     list_res = await async_client.get("/api/admin/collections", headers=headers)
     ids = [c["id"] for c in list_res.json()]
     assert c_id not in ids, f"Purged collection id={c_id} still found in list"
+
+# ---------------------------------------------------------------------------
+# Metrics endpoint
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_get_metrics_contract(async_client, admin_token):
+    """Verify GET /metrics reports grading time-to-first-feedback after a submit."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    # Setup: submit one response so the grading path records a sample
+    q_res = await async_client.post("/api/admin/questions", json={
+        "text": "Metrics Q", "grading_criteria": "N/A", "collection_id": 1
+    }, headers=headers)
+    q_id = q_res.json()["id"]
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    gs_res = await async_client.get(f"/api/admin/sessions/{s_res.json()['code']}", headers=headers)
+    s_id = gs_res.json()["id"]
+    l_res = await async_client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={q_id}", headers=headers)
+    sq_id = l_res.json()["session_question_id"]
+    await async_client.post(
+        f"/api/student/session/{s_id}/question/{q_id}/instance/{sq_id}/submit",
+        json={"student_name": "Metrics Student", "response_text": "An answer"}
+    )
+
+    # Contract: fetch metrics
+    response = await async_client.get("/api/admin/metrics", headers=headers)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert "counters" in data, f"Expected 'counters' key, got: {data}"
+    assert "timings" in data, f"Expected 'timings' key, got: {data}"
+    ttff = data["timings"].get("grading.time_to_first_feedback_seconds.blocking")
+    assert ttff is not None, f"Expected a time-to-first-feedback timing, got: {list(data['timings'])}"
+    assert ttff["count"] >= 1, f"Expected at least one sample, got: {ttff}"
+
+# ---------------------------------------------------------------------------
+# Submit admission control
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_submit_rate_limit_contract(async_client, admin_token):
+    """Verify a student who exceeds the submit burst gets 429 with Retry-After."""
+    from core.config import settings
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    q_res = await async_client.post("/api/admin/questions", json={
+        "text": "Rate limit Q", "grading_criteria": "N/A", "collection_id": 1
+    }, headers=headers)
+    q_id = q_res.json()["id"]
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    gs_res = await async_client.get(f"/api/admin/sessions/{s_res.json()['code']}", headers=headers)
+    s_id = gs_res.json()["id"]
+    l_res = await async_client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={q_id}", headers=headers)
+    sq_id = l_res.json()["session_question_id"]
+    url = f"/api/student/session/{s_id}/question/{q_id}/instance/{sq_id}/submit"
+
+    # Use up the burst allowance
+    for i in range(settings.SUBMIT_BURST):
+        res = await async_client.post(url, json={"student_name": "Hammer", "response_text": f"Answer {i}"})
+        assert res.status_code == 200, f"Submit {i} within burst failed: {res.status_code} {res.text}"
+
+    # Contract: the next submit is rejected with a Retry-After hint
+    response = await async_client.post(url, json={"student_name": "Hammer", "response_text": "One too many"})
+    assert response.status_code == 429, f"Expected 429, got {response.status_code}: {response.text}"
+    assert int(response.headers.get("Retry-After", "0")) >= 1, f"Expected Retry-After header, got: {response.headers}"
+
+    # Other students in the same session are unaffected
+    other = await async_client.post(url, json={"student_name": "Someone Else", "response_text": "My answer"})
+    assert other.status_code == 200, f"Expected 200 for a different student, got {other.status_code}: {other.text}"
+
+
+@pytest.mark.asyncio
+async def test_submit_duplicate_is_idempotent_contract(async_client, admin_token):
+    """Verify duplicate submits (concurrent and repeated) produce a single stored response."""
+    import asyncio
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    q_res = await async_client.post("/api/admin/questions", json={
+        "text": "Idempotency Q", "grading_criteria": "N/A", "collection_id": 1
+    }, headers=headers)
+    q_id = q_res.json()["id"]
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    gs_res = await async_client.get(f"/api/admin/sessions/{s_res.json()['code']}", headers=headers)
+    s_id = gs_res.json()["id"]
+    l_res = await async_client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={q_id}", headers=headers)
+    sq_id = l_res.json()["session_question_id"]
+    url = f"/api/student/session/{s_id}/question/{q_id}/instance/{sq_id}/submit"
+    payload = {"student_name": "Double Tapper", "response_text": "Same answer"}
+
+    # Contract: concurrent duplicates plus a late retry all return the same response
+    first, second = await asyncio.gather(
+        async_client.post(url, json=payload),
+        async_client.post(url, json=payload)
+    )
+    retry = await async_client.post(url, json=payload)
+    for res in (first, second, retry):
+        assert res.status_code == 200, f"Expected 200, got {res.status_code}: {res.text}"
+    ids = {first.json()["response_id"], second.json()["response_id"], retry.json()["response_id"]}
+    assert len(ids) == 1, f"Expected one response id for duplicate submits, got: {ids}"
+
+    # An explicit Idempotency-Key replays the same submit; reused for a different answer it is refused
+    keyed = {"Idempotency-Key": "attempt-1"}
+    k1 = await async_client.post(url, json={"student_name": "Keyed", "response_text": "v1"}, headers=keyed)
+    k2 = await async_client.post(url, json={"student_name": "Keyed", "response_text": "v1"}, headers=keyed)
+    assert k1.json()["response_id"] == k2.json()["response_id"], \
+        f"Expected same response for same Idempotency-Key, got {k1.json()} and {k2.json()}"
+    edited = await async_client.post(url, json={"student_name": "Keyed", "response_text": "v1 edited"}, headers=keyed)
+    assert edited.status_code == 409, f"Expected 409 for a key reused with another answer, got {edited.status_code}"
+
+    # The same key from another student is that student's own submit
+    other = await async_client.post(url, json={"student_name": "Other", "response_text": "my own answer"}, headers=keyed)
+    assert other.status_code == 200 and other.json()["response_id"] != k1.json()["response_id"], \
+        f"Another student's key must not return the first student's result, got {other.json()}"
+
+    # Confirm only one row per logical submit was stored
+    results = await async_client.get(f"/api/admin/sessions/{s_id}/results", headers=headers)
+    responses = results.json()[0]["responses"]
+    assert len(responses) == 3, f"Expected 3 stored responses, got {len(responses)}: {responses}"
+
+# ---------------------------------------------------------------------------
+# Aggregate statistics
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_session_stats_contract(async_client, admin_token):
+    """Verify GET /sessions/{id}/stats returns per-question aggregates without response bodies."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    q_res = await async_client.post("/api/admin/questions", json={
+        "text": "Stats Q", "grading_criteria": "N/A", "collection_id": 1
+    }, headers=headers)
+    q_id = q_res.json()["id"]
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    gs_res = await async_client.get(f"/api/admin/sessions/{s_res.json()['code']}", headers=headers)
+    s_id = gs_res.json()["id"]
+    l_res = await async_client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={q_id}", headers=headers)
+    sq_id = l_res.json()["session_question_id"]
+    for name in ("Stats A", "Stats B"):
+        await async_client.post(
+            f"/api/student/session/{s_id}/question/{q_id}/instance/{sq_id}/submit",
+            json={"student_name": name, "response_text": "An answer"}
+        )
+
+    # Contract: fetch stats
+    response = await async_client.get(f"/api/admin/sessions/{s_id}/stats", headers=headers)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert data["session_id"] == s_id
+    assert isinstance(data["questions"], list) and len(data["questions"]) == 1, f"Unexpected questions: {data}"
+    q_stats = data["questions"][0]
+    assert q_stats["session_question_id"] == sq_id
+    assert q_stats["count"] == 2, f"Expected count=2, got: {q_stats}"
+    assert q_stats["mean"] == 3, f"Expected mean=3 for test-model scores, got: {q_stats}"
+    assert q_stats["histogram"] == [0, 0, 0, 2, 0], f"Unexpected histogram: {q_stats['histogram']}"
+    assert "submissions_per_minute" in q_stats
+    assert "responses" not in q_stats, "Stats payload must not include response bodies"
+
+# ---------------------------------------------------------------------------
+# Paginated listings
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_questions_page_contract(async_client, admin_token):
+    """Verify GET /questions/page pages with a cursor and omits grading_criteria."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    for i in range(3):
+        await async_client.post("/api/admin/questions", json={
+            "text": f"Paged question {i}", "grading_criteria": "Long criteria", "collection_id": 1
+        }, headers=headers)
+
+    # Contract: first page
+    first = await async_client.get("/api/admin/questions/page?limit=2", headers=headers)
+    assert first.status_code == 200, f"Expected 200, got {first.status_code}: {first.text}"
+    data = first.json()
+    assert len(data["items"]) == 2, f"Expected 2 items, got: {data['items']}"
+    assert data["next_cursor"], f"Expected a next_cursor, got: {data}"
+    item = data["items"][0]
+    assert "id" in item and "text" in item and "collection_name" in item
+    assert "grading_criteria" not in item, f"List view must not include grading_criteria: {item}"
+
+    # Contract: the cursor yields the remaining question with no further cursor
+    second = await async_client.get(
+        "/api/admin/questions/page", params={"limit": 2, "cursor": data["next_cursor"]}, headers=headers
+    )
+    assert second.status_code == 200, f"Expected 200, got {second.status_code}: {second.text}"
+    rest = second.json()
+    assert len(rest["items"]) == 1, f"Expected 1 remaining item, got: {rest['items']}"
+    assert rest["next_cursor"] is None
+    seen = {q["id"] for q in data["items"]} | {q["id"] for q in rest["items"]}
+    assert len(seen) == 3, f"Expected 3 distinct questions across pages, got: {seen}"
+
+    # A malformed cursor is a client error
+    bad = await async_client.get("/api/admin/questions/page?cursor=not-a-cursor", headers=headers)
+    assert bad.status_code == 400, f"Expected 400 for a bad cursor, got {bad.status_code}: {bad.text}"
+
+
+@pytest.mark.asyncio
+async def test_questions_page_filters_contract(async_client, admin_token):
+    """Verify GET /questions/page filters by collection and text search."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    coll_res = await async_client.post("/api/admin/collections", json={"name": "Biology"}, headers=headers)
+    c_id = coll_res.json()["id"]
+    await async_client.post("/api/admin/questions", json={
+        "text": "Explain photosynthesis", "grading_criteria": "N/A", "collection_id": c_id
+    }, headers=headers)
+    await async_client.post("/api/admin/questions", json={
+        "text": "What is gravity?", "grading_criteria": "N/A", "collection_id": 1
+    }, headers=headers)
+
+    by_collection = await async_client.get(f"/api/admin/questions/page?collection_id={c_id}", headers=headers)
+    assert by_collection.status_code == 200, f"Expected 200, got {by_collection.status_code}: {by_collection.text}"
+    texts = [q["text"] for q in by_collection.json()["items"]]
+    assert texts == ["Explain photosynthesis"], f"Unexpected collection filter result: {texts}"
+
+    by_text = await async_client.get("/api/admin/questions/page?q=gravity", headers=headers)
+    assert by_text.status_code == 200, f"Expected 200, got {by_text.status_code}: {by_text.text}"
+    texts = [q["text"] for q in by_text.json()["items"]]
+    assert texts == ["What is gravity?"], f"Unexpected search result: {texts}"
+
+
+@pytest.mark.asyncio
+async def test_get_question_contract(async_client, admin_token):
+    """Verify GET /questions/{id} returns the full question including grading_criteria."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    create_res = await async_client.post("/api/admin/questions", json={
+        "text": "Full record", "grading_criteria": "Detailed criteria", "collection_id": 1
+    }, headers=headers)
+    q_id = create_res.json()["id"]
+
+    response = await async_client.get(f"/api/admin/questions/{q_id}", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    assert response.json()["grading_criteria"] == "Detailed criteria"
+
+    missing = await async_client.get("/api/admin/questions/999999", headers=headers)
+    assert missing.status_code == 404, f"Expected 404, got {missing.status_code}: {missing.text}"
+
+
+@pytest.mark.asyncio
+async def test_sessions_page_contract(async_client, admin_token):
+    """Verify GET /sessions/page pages newest first and filters by status."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    create_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    code = create_res.json()["code"]
+    gs_res = await async_client.get(f"/api/admin/sessions/{code}", headers=headers)
+    s_id = gs_res.json()["id"]
+    await async_client.put(f"/api/admin/sessions/{s_id}/end", headers=headers)
+
+    response = await async_client.get("/api/admin/sessions/page?limit=10&status=closed", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert "items" in data and "next_cursor" in data, f"Unexpected shape: {data}"
+    ids = [s["id"] for s in data["items"]]
+    assert s_id in ids, f"Closed session {s_id} missing from page: {ids}"
+    assert all(s["status"] == "closed" for s in data["items"]), f"Status filter not applied: {data['items']}"
+
+
+@pytest.mark.asyncio
+async def test_collections_page_contract(async_client, admin_token):
+    """Verify GET /collections/page returns collections with question counts."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = await async_client.get("/api/admin/collections/page?limit=1", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert len(data["items"]) == 1, f"Expected 1 item, got: {data}"
+    first = data["items"][0]
+    assert first["id"] == 1 and "question_count" in first, f"Unexpected collection row: {first}"
+
+# ---------------------------------------------------------------------------
+# Query layer
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_session_results_query_count_contract(async_client, admin_token):
+    """Verify /results issues a constant number of queries regardless of question count (no N+1)."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    gs_res = await async_client.get(f"/api/admin/sessions/{s_res.json()['code']}", headers=headers)
+    s_id = gs_res.json()["id"]
+
+    counts = []
+    for i in range(3):
+        q_res = await async_client.post("/api/admin/questions", json={
+            "text": f"N+1 Q{i}", "grading_criteria": "N/A", "collection_id": 1
+        }, headers=headers)
+        await async_client.post(
+            f"/api/admin/sessions/{s_id}/activate-question?question_id={q_res.json()['id']}", headers=headers
+        )
+        response = await async_client.get(f"/api/admin/sessions/{s_id}/results", headers=headers)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        assert "x-query-count" in response.headers, f"Expected X-Query-Count header, got: {dict(response.headers)}"
+        counts.append(int(response.headers["x-query-count"]))
+
+    # One auth lookup, the questions, and the responses
+    assert counts == [3, 3, 3], f"Query count grew with the number of questions: {counts}"
+
+# ---------------------------------------------------------------------------
+# Join codes
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_join_served_from_directory_contract(async_client, admin_token):
+    """Verify /join resolves codes without database queries and sees sessions being closed."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    code = s_res.json()["code"]
+
+    response = await async_client.post(f"/api/student/join/{code}")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    assert response.headers["x-query-count"] == "0", f"Join touched the database: {response.headers['x-query-count']} queries"
+    s_id = response.json()["session_id"]
+
+    await async_client.put(f"/api/admin/sessions/{s_id}/end", headers=headers)
+    response = await async_client.post(f"/api/student/join/{code}")
+    assert response.status_code == 400, f"Expected 400 for a closed session, got {response.status_code}: {response.text}"
+
+    response = await async_client.post("/api/student/join/NOPE00")
+    assert response.status_code == 404, f"Expected 404 for an unknown code, got {response.status_code}"
+
+@pytest.mark.asyncio
+async def test_session_code_collision_retry_contract(async_client, admin_token, monkeypatch):
+    """Verify session creation draws a new code when the first one is already taken."""
+    import db.memory_repo
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    codes = iter(["AAAAAA", "AAAAAA", "BBBBBB"])
+    monkeypatch.setattr(db.memory_repo, "generate_join_code", lambda: next(codes))
+
+    first = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    s_id = (await async_client.post(f"/api/student/join/{first.json()['code']}")).json()["session_id"]
+    await async_client.put(f"/api/admin/sessions/{s_id}/end", headers=headers)
+
+    second = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    assert second.status_code == 200, f"Expected 200, got {second.status_code}: {second.text}"
+    assert second.json()["code"] == "BBBBBB", f"Expected the colliding code to be skipped, got {second.json()}"
+
+# ---------------------------------------------------------------------------
+# Admin socket
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_admin_ws_token_contract(async_client, admin_token):
+    """Verify POST /ws-token returns a short-lived token scoped to the session."""
+    from core.security import verify_ws_token
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    code = (await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)).json()["code"]
+    s_id = (await async_client.get(f"/api/admin/sessions/{code}", headers=headers)).json()["id"]
+
+    response = await async_client.post(f"/api/admin/sessions/{s_id}/ws-token", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert data["expires_in"] <= 300, f"Token should be short-lived, got {data['expires_in']}s"
+    assert verify_ws_token(data["token"], s_id) == "admin", "Token should verify for its own session"
+    assert verify_ws_token(data["token"], s_id + 1) is None, "Token must not verify for another session"
+    assert verify_ws_token(admin_token, s_id) is None, "A regular access token must not open the socket"
+
+    response = await async_client.post(f"/api/admin/sessions/{s_id}/ws-token")
+    assert response.status_code == 401, f"Expected 401 without auth, got {response.status_code}"
+
+    # It travels in query strings (and so in access logs): it must not work as an admin login
+    ws_headers = {"Authorization": f"Bearer {data['token']}"}
+    for method, url in (("GET", "/api/admin/sessions"), ("DELETE", f"/api/admin/sessions/{s_id}"), ("GET", "/api/admin/traces")):
+        response = await async_client.request(method, url, headers=ws_headers)
+        assert response.status_code == 401, f"Expected 401 for a socket token on {method} {url}, got {response.status_code}"
+
+@pytest.mark.asyncio
+async def test_live_results_require_session_token_contract(async_client, admin_token):
+    """Verify the live-results stream refuses requests without a valid token for that session."""
+    from core.security import create_ws_token
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    code = (await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)).json()["code"]
+    s_id = (await async_client.get(f"/api/admin/sessions/{code}", headers=headers)).json()["id"]
+
+    for params in ({}, {"token": admin_token}, {"token": create_ws_token("admin", s_id + 1)}, {"token": create_ws_token("nobody", s_id)}):
+        response = await async_client.get(f"/api/admin/sessions/{s_id}/live-results", params=params)
+        assert response.status_code == 401, f"Expected 401 for {params}, got {response.status_code}"
+
+# ---------------------------------------------------------------------------
+# Shutdown
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_submit_while_draining_contract(async_client, admin_token):
+    """Verify submits are refused with 503 and Retry-After once a drain starts, and /health reports it."""
+    from core.lifecycle import lifecycle
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    s_id = (await async_client.post(f"/api/student/join/{s_res.json()['code']}")).json()["session_id"]
+    q_res = await async_client.post("/api/admin/questions", json={
+        "text": "Drain Q", "grading_criteria": "N/A", "collection_id": 1
+    }, headers=headers)
+    q_id = q_res.json()["id"]
+    act = await async_client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={q_id}", headers=headers)
+    sq_id = act.json()["session_question_id"]
+
+    await lifecycle.drain(timeout=0.1)
+
+    response = await async_client.post(
+        f"/api/student/session/{s_id}/question/{q_id}/instance/{sq_id}/submit",
+        json={"student_name": "Late", "response_text": "An answer"}
+    )
+    assert response.status_code == 503, f"Expected 503 while draining, got {response.status_code}: {response.text}"
+    assert "retry-after" in response.headers, f"Expected Retry-After header, got: {dict(response.headers)}"
+
+    response = await async_client.get("/health")
+    assert response.status_code == 503, f"Expected /health to report draining, got {response.status_code}"
+
+@pytest.mark.asyncio
+async def test_active_questions_coalesced_contract(async_client, admin_token):
+    """Verify concurrent active-question reads share one query and see admin changes immediately."""
+    import asyncio
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    s_res = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+    s_id = (await async_client.post(f"/api/student/join/{s_res.json()['code']}")).json()["session_id"]
+
+    responses = await asyncio.gather(*(
+        async_client.get(f"/api/student/session/{s_id}/active-questions") for _ in range(20)
+    ))
+    total_queries = sum(int(r.headers["x-query-count"]) for r in responses)
+    assert total_queries <= 1, f"Expected at most one active-question query across 20 reads, got {total_queries}"
+
+    q_res = await async_client.post("/api/admin/questions", json={
+        "text": "Fresh Q", "grading_criteria": "N/A", "collection_id": 1
+    }, headers=headers)
+    await async_client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={q_res.json()['id']}", headers=headers)
+    response = await async_client.get(f"/api/student/session/{s_id}/active-questions")
+    assert [q["text"] for q in response.json()] == ["Fresh Q"], f"Cached list is stale: {response.json()}"
+
+# ---------------------------------------------------------------------------
+# Concurrent sessions
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_per_admin_contract(async_client, admin_token):
+    """Verify several sessions can be active at once, each admin sees only their own, and results do not mix."""
+    from db.admin_repo import AdminUserRepository
+    await AdminUserRepository.create("teacher2", "secret")
+    login = await async_client.post("/api/admin/login", data={"username": "teacher2", "password": "secret"})
+    admin_a = {"Authorization": f"Bearer {admin_token}"}
+    admin_b = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    sessions = {}
+    for name, headers in (("a1", admin_a), ("a2", admin_a), ("b1", admin_b)):
+        response = await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)
+        assert response.status_code == 200, f"Starting {name} alongside other active sessions failed: {response.text}"
+        code = response.json()["code"]
+        sessions[name] = (await async_client.post(f"/api/student/join/{code}")).json()["session_id"]
+
+    listed = await async_client.get("/api/admin/sessions", headers=admin_a)
+    assert {s["id"] for s in listed.json()} == {sessions["a1"], sessions["a2"]}, f"Admin A listing: {listed.json()}"
+    page = await async_client.get("/api/admin/sessions/page?status=active", headers=admin_b)
+    assert [s["id"] for s in page.json()["items"]] == [sessions["b1"]], f"Admin B page: {page.json()}"
+
+    response = await async_client.get(f"/api/admin/sessions/{sessions['a1']}/results", headers=admin_b)
+    assert response.status_code == 404, f"Expected 404 for another admin's session, got {response.status_code}"
+    response = await async_client.put(f"/api/admin/sessions/{sessions['a1']}/end", headers=admin_b)
+    assert response.status_code == 404, f"Another admin must not end the session, got {response.status_code}"
+
+    q_res = await async_client.post("/api/admin/questions", json={"text": "Q", "grading_criteria": "C"}, headers=admin_a)
+    q_id = q_res.json()["id"]
+    for name, headers in (("a1", admin_a), ("b1", admin_b)):
+        await async_client.post(f"/api/admin/sessions/{sessions[name]}/activate-question?question_id={q_id}", headers=headers)
+    questions = (await async_client.get(f"/api/student/session/{sessions['a1']}/active-questions")).json()
+    response = await async_client.post(
+        f"/api/student/session/{sessions['a1']}/question/{q_id}/instance/{questions[0]['session_question_id']}/submit",
+        json={"student_name": "Ada", "response_text": "Answer"})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+
+    results_a = (await async_client.get(f"/api/admin/sessions/{sessions['a1']}/results", headers=admin_a)).json()
+    results_b = (await async_client.get(f"/api/admin/sessions/{sessions['b1']}/results", headers=admin_b)).json()
+    assert len(results_a[0]["responses"]) == 1, f"Session A1 should have the response: {results_a}"
+    assert results_b[0]["responses"] == [], f"Session B1 should not see A1's response: {results_b}"
+
+# ---------------------------------------------------------------------------
+# Archival
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_archived_session_read_through_contract(async_client, live_question, tmp_path, monkeypatch):
+    """Verify archiving empties the hot tables while results and the CSV export still work."""
+    from core.archive import archive
+    from jobs.archive import archive_closed_sessions
+    from db.session_repo import SessionRepository
+    monkeypatch.setattr(archive, "root", str(tmp_path))
+    live = await live_question({"text": "2+2?", "grading_criteria": "4"})
+    headers, s_id = live.headers, live.s_id
+    await async_client.post(live.submit_url, json={"student_name": "Ada", "response_text": "It is 4"})
+
+    assert await archive_closed_sessions(0) == [], "Active sessions must not be archived"
+    await async_client.put(f"/api/admin/sessions/{s_id}/end", headers=headers)
+    before = (await async_client.get(f"/api/admin/sessions/{s_id}/results", headers=headers)).json()
+    assert await archive_closed_sessions(30) == [], "A session closed just now is not old enough"
+    assert await archive_closed_sessions(0) == [s_id], "The closed session should be archived"
+    assert await archive_closed_sessions(0) == [], "Archiving again should be a no-op"
+
+    archived_file = tmp_path / f"session_{s_id}.json.gz"
+    assert archived_file.exists(), "Archive file was not written"
+    archived_file.rename(tmp_path / "aside")
+    assert await SessionRepository.fetch_results(s_id) == [], "The hot tables should no longer hold the session"
+    (tmp_path / "aside").rename(archived_file)
+
+    after = (await async_client.get(f"/api/admin/sessions/{s_id}/results", headers=headers))
+    assert after.status_code == 200, f"Expected 200, got {after.status_code}: {after.text}"
+    assert after.json() == before, f"Archived results differ: {after.json()} vs {before}"
+
+    csv_res = await async_client.get(f"/api/admin/sessions/{s_id}/export-csv", headers=headers)
+    assert "It is 4" in csv_res.text, f"CSV export lost the archived response: {csv_res.text}"
+
+    await async_client.delete(f"/api/admin/sessions/{s_id}", headers=headers)
+    assert not archived_file.exists(), "Deleting a session should remove its archive"
+
+@pytest.mark.asyncio
+async def test_unarchived_results_skip_the_archive_contract(async_client, admin_token, monkeypatch):
+    """Verify polling the results of a session without questions does not look for an archive file."""
+    from core.archive import archive
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    code = (await async_client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)).json()["code"]
+    s_id = (await async_client.get(f"/api/admin/sessions/{code}", headers=headers)).json()["id"]
+
+    async def no_archive(session_id):
+        raise AssertionError(f"Read the archive of session {session_id}, which was never archived")
+    monkeypatch.setattr(archive, "load", no_archive)
+    for _ in range(2):
+        response = await async_client.get(f"/api/admin/sessions/{s_id}/results", headers=headers)
+        assert response.status_code == 200 and response.json() == [], f"Expected no results, got {response.status_code}: {response.text}"
+
+@pytest.mark.asyncio
+async def test_retention_drops_expired_months_contract(async_client, live_question, tmp_path, monkeypatch):
+    """Verify retention removes responses older than the window and sessions closed before it, sparing active ones."""
+    from datetime import datetime, timedelta
+    from core.archive import archive
+    from jobs.retention import apply_retention
+    monkeypatch.setattr(archive, "root", str(tmp_path))
+
+    sessions = []
+    q_id = None
+    for _ in range(2):
+        live = await live_question(question_id=q_id)
+        q_id, headers = live.q_id, live.headers
+        await async_client.post(live.submit_url, json={"student_name": "Ada", "response_text": "Answer"})
+        sessions.append(live.s_id)
+    closed, active = sessions
+    await async_client.put(f"/api/admin/sessions/{closed}/end", headers=headers)
+
+    result = await apply_retention(365, 3)
+    assert result["dropped_partitions"] == [] and result["deleted_sessions"] == [], f"Nothing is old enough yet: {result}"
+
+    result = await apply_retention(365, 3, now=datetime.now() + timedelta(days=800))
+    assert result["dropped_partitions"], f"The month holding the responses should be dropped: {result}"
+    assert result["deleted_sessions"] == [closed], f"Only the closed session should be deleted: {result}"
+
+    listed = {s["id"] for s in (await async_client.get("/api/admin/sessions", headers=headers)).json()}
+    assert listed == {active}, f"Unexpected sessions after retention: {listed}"
+    results = (await async_client.get(f"/api/admin/sessions/{active}/results", headers=headers)).json()
+    assert results[0]["responses"] == [], f"Expired responses of the active session should be gone: {results}"
+
+# ---------------------------------------------------------------------------
+# Response clustering
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_response_clusters_contract(async_client, live_question):
+    """Verify similar answers are grouped with representatives, and answers submitted later are folded in."""
+    live = await live_question({"text": "Why do we have seasons?", "grading_criteria": "Tilt"})
+    headers, s_id, sq_id, submit_url = live.headers, live.s_id, live.sq_id, live.submit_url
+
+    answers = ["The earth is tilted on its axis so sunlight hits at different angles",
+               "Because of the tilt of Earth's axis the angle of sunlight changes",
+               "The tilt of the axis makes sunlight more direct in summer",
+               "Because the earth is closer to the sun in summer",
+               "In summer the earth is closer to the sun and farther in winter"]
+    for i, text in enumerate(answers):
+        await async_client.post(submit_url, json={"student_name": f"S{i}", "response_text": text})
+
+    response = await async_client.get(f"/api/admin/sessions/{s_id}/clusters", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    question = response.json()["questions"][0]
+    assert question["session_question_id"] == sq_id and question["responses"] == 5, f"Unexpected question: {question}"
+    groups = sorted(sorted(c["size"] for c in question["clusters"]), reverse=True)
+    assert groups == [3, 2], f"Expected a tilt group and a distance group, got {question['clusters']}"
+    assert "axis" in question["clusters"][0]["terms"], f"Tilt group terms: {question['clusters'][0]['terms']}"
+    assert question["clusters"][0]["representatives"], "Expected representative answers"
+
+    # Clusters are now live: a new answer is added without a reload
+    await async_client.post(submit_url, json={"student_name": "S9", "response_text": "The axis is tilted so the angle of sunlight changes"})
+    question = (await async_client.get(f"/api/admin/sessions/{s_id}/clusters", headers=headers)).json()["questions"][0]
+    assert question["responses"] == 6 and question["clusters"][0]["size"] == 4, f"Unexpected after a new answer: {question}"
+
+# ---------------------------------------------------------------------------
+# Grade reuse
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_near_duplicate_reuses_grade_contract(async_client, live_question, monkeypatch):
+    """Verify a near-identical answer reuses the earlier grade without a model call, and the row says so."""
+    import core.graders
+    live = await live_question({"text": "What causes tides?", "grading_criteria": "Moon"})
+    headers, s_id, submit_url = live.headers, live.s_id, live.submit_url
+
+    calls = []
+    async def grade(**kwargs):
+        calls.append(kwargs["student_response"])
+        return 4, "Right, the moon's gravity."
+    monkeypatch.setattr(core.graders, "grade_response_streaming", grade)
+
+    first = (await async_client.post(submit_url, json={"student_name": "Ada", "response_text": "The moon's gravity pulls on the oceans"})).json()
+    second = (await async_client.post(submit_url, json={"student_name": "Bo", "response_text": "On the oceans, the Moon's gravity PULLS!"})).json()
+    negated = (await async_client.post(submit_url, json={"student_name": "Cy", "response_text": "The moon's gravity never pulls on the oceans"})).json()
+    assert len(calls) == 2, f"Expected the model to grade only the first and the negated answer, got {calls}"
+    assert (second["score"], second["feedback"]) == (4, "Right, the moon's gravity."), f"Reused grade differs: {second}"
+
+    responses = {r["id"]: r for r in (await async_client.get(f"/api/admin/sessions/{s_id}/results", headers=headers)).json()[0]["responses"]}
+    assert responses[first["response_id"]]["graded_from"] is None, "A graded answer must not be flagged"
+    assert responses[second["response_id"]]["graded_from"] == first["response_id"], f"Reuse not flagged: {responses[second['response_id']]}"
+    assert responses[negated["response_id"]]["graded_from"] is None, "A negated answer must be graded afresh"
+
+# ---------------------------------------------------------------------------
+# Local pre-grading
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_pregrader_short_circuits_trivial_answers_contract(async_client, admin_token, live_question, monkeypatch):
+    """Verify blank answers and answer-key matches skip the model, and the key never reaches students."""
+    import core.graders
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    bad = await async_client.post("/api/admin/questions", json={"text": "Q", "grading_criteria": "C", "rubric": "4: (oops"}, headers=headers)
+    assert bad.status_code == 422, f"Expected 422 for an invalid rubric, got {bad.status_code}"
+    live = await live_question({"text": "What is 6 times 7?", "grading_criteria": "42", "answer_key": "42\nforty-two"})
+    s_id, submit_url = live.s_id, live.submit_url
+
+    active = (await async_client.get(f"/api/student/session/{s_id}/active-questions")).json()
+    assert "answer_key" not in active[0], f"Answer key sent to students: {active[0]}"
+
+    calls = []
+    async def grade(**kwargs):
+        calls.append(kwargs["student_response"])
+        return 2, "Check your multiplication."
+    monkeypatch.setattr(core.graders, "grade_response_streaming", grade)
+
+    blank = (await async_client.post(submit_url, json={"student_name": "Ada", "response_text": "  "})).json()
+    keyed = (await async_client.post(submit_url, json={"student_name": "Bo", "response_text": "Forty-two."})).json()
+    graded = (await async_client.post(submit_url, json={"student_name": "Cy", "response_text": "It is 48"})).json()
+    assert calls == ["It is 48"], f"Only the ambiguous answer should reach the model, got {calls}"
+    assert (blank["score"], keyed["score"], graded["score"]) == (0, 4, 2), f"Scores: {blank}, {keyed}, {graded}"
+
+# ---------------------------------------------------------------------------
+# Grader backends
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_local_grader_takes_over_when_the_model_is_down_contract(async_client, live_question, monkeypatch):
+    """Verify the local classifier grades from the model's earlier grades once the model fails, and the rows say who graded."""
+    import api.student
+    import core.graders
+    from core.ai_service import ERROR_FEEDBACK
+    from core.graders import GraderChain, OpenRouterGrader
+    from core.local_grader import LocalGrader
+    from db.student_repo import StudentRepository
+    live = await live_question({"text": "Why do we have seasons?", "grading_criteria": "Axis tilt"})
+    headers, s_id, submit_url = live.headers, live.s_id, live.submit_url
+
+    model_up = True
+    async def grade(**kwargs):
+        if not model_up:
+            return 0, ERROR_FEEDBACK
+        return (4, "Right, the tilt.") if "tilt" in kwargs["student_response"] else (1, "Distance is not the cause.")
+    monkeypatch.setattr(core.graders, "grade_response_streaming", grade)
+    local = LocalGrader(StudentRepository.get_graded_examples, workers=1, min_examples=4, min_similarity=0.3, retrain_seconds=300)
+    monkeypatch.setattr(api.student, "graders", GraderChain([OpenRouterGrader(), local]))
+
+    try:
+        for name, text in [("A", "The earth is tilted on its axis"), ("B", "Because of the tilt of Earth's axis"),
+                           ("C", "We are closer to the sun in summer"), ("D", "The distance from the sun changes")]:
+            await async_client.post(submit_url, json={"student_name": name, "response_text": text})
+        model_up = False
+        offline = (await async_client.post(submit_url, json={"student_name": "E", "response_text": "the axis of the earth is tilted"})).json()
+    finally:
+        local.shutdown()
+    assert (offline["score"], offline["feedback"]) == (4, "Right, the tilt."), f"Local grade differs: {offline}"
+
+    responses = {r["id"]: r for r in (await async_client.get(f"/api/admin/sessions/{s_id}/results", headers=headers)).json()[0]["responses"]}
+    assert responses[offline["response_id"]]["graded_by"] == "local", f"Not flagged as local: {responses[offline['response_id']]}"
+    assert {r["graded_by"] for r in responses.values()} == {"openrouter", "local"}, f"graded_by values: {responses}"
+
+    data = (await async_client.get("/api/admin/metrics", headers=headers)).json()
+    assert data["counters"].get("grading.openrouter.failed", 0) >= 1, f"Expected the model failure counted, got {data['counters']}"
+    assert data["timings"]["grading.local.seconds"]["per_second"] > 0, f"Expected local throughput, got {data['timings']}"
+
+# ---------------------------------------------------------------------------
+# Profiling and request traces
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_sampling_profile_contract(async_client, admin_token):
+    """Verify GET /profile is admin-only, bounded, and returns collapsed stacks with sample counts."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert (await async_client.get("/api/admin/profile?seconds=0.1")).status_code == 401
+    assert (await async_client.get("/api/admin/profile?seconds=3600", headers=headers)).status_code == 422
+
+    response = await async_client.get("/api/admin/profile?seconds=0.3&interval_ms=2", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert lines, "Expected at least one sampled stack"
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) >= 1 and stack, f"Not a collapsed stack line: {line!r}"
+    # The event loop was sampled while the endpoint itself waited
+    assert any("asyncio.base_events" in line for line in lines), f"Expected event loop frames, got {lines[:3]}"
+
+@pytest.mark.asyncio
+async def test_request_trace_contract(async_client, live_question, monkeypatch):
+    """Verify an admin's X-Trace submit reports repository, grade and broadcast spans, and other requests are not traced."""
+    live = await live_question({"text": "Trace Q", "grading_criteria": "N/A"})
+    headers, submit_url = live.headers, live.submit_url
+
+    plain = await async_client.post(submit_url, json={"student_name": "Ada", "response_text": "An untraced answer"})
+    assert "server-timing" not in plain.headers, "Untraced requests must not be traced"
+    assert (await async_client.get("/api/admin/traces", headers=headers)).json() == []
+
+    anonymous = await async_client.post(submit_url, json={"student_name": "Cy", "response_text": "An anonymous trace"}, headers={"X-Trace": "1"})
+    assert anonymous.status_code == 200 and "server-timing" not in anonymous.headers, "X-Trace needs an admin token or TRACE_SECRET"
+    assert (await async_client.get("/api/admin/traces", headers=headers)).json() == []
+
+    traced = await async_client.post(submit_url, json={"student_name": "Bo", "response_text": "A traced answer"}, headers={"X-Trace": "1", **headers})
+    assert traced.status_code == 200
+    timing = traced.headers["server-timing"]
+    for name in ("db.session.live_by_id", "grade;", "grade.openrouter", "db.student_response.insert", "broadcast;", "total;"):
+        assert name in timing, f"Expected a {name} span in Server-Timing, got {timing}"
+
+    recorded = (await async_client.get("/api/admin/traces", headers=headers)).json()
+    assert [t["id"] for t in recorded] == [int(traced.headers["x-trace-id"])], f"Expected only the traced request, got {recorded}"
+    spans = recorded[0]["spans"]
+    assert [s["start_ms"] for s in spans] == sorted(s["start_ms"] for s in spans)
+    assert all(s["duration_ms"] <= recorded[0]["duration_ms"] for s in spans), f"Span longer than its request: {recorded[0]}"
+
+    from core.config import settings
+    monkeypatch.setattr(settings, "TRACE_SECRET", "load-test")
+    wrong = await async_client.post(submit_url, json={"student_name": "Di", "response_text": "A guessed trace"}, headers={"X-Trace": "1"})
+    assert "server-timing" not in wrong.headers, "Only the configured TRACE_SECRET enables tracing without a token"
+    secret = await async_client.post(submit_url, json={"student_name": "Ed", "response_text": "A load test trace"}, headers={"X-Trace": "load-test"})
+    assert "server-timing" in secret.headers, "X-Trace with TRACE_SECRET must be traced"
@@ -0,0 +1,38 @@
+from core.dedup import NearDuplicateIndex, shingle
+from benchmarks.dedup import answers
+
+THRESHOLD = 0.9
+
+def test_near_duplicates_precision_and_recall_at_1000_per_question():
+    """Verify reused grades come from the same answer (precision) and repeats are found (recall)."""
+    index = NearDuplicateIndex()
+    first_of = {}
+    true_pos = false_pos = false_neg = 0
+    for response_id, (group, text) in enumerate(answers(1000)):
+        shingled = shingle(text)
+        match = index.find(shingled, THRESHOLD)
+        if match is not None:
+            if first_of.get(group) is not None and match.response_id in first_of[group]:
+                true_pos += 1
+            else:
+                false_pos += 1
+        elif group in first_of:
+            false_neg += 1
+        if match is None:
+            index.add(shingled, response_id, 3, "feedback")
+        first_of.setdefault(group, set()).add(response_id)
+
+    precision = true_pos / (true_pos + false_pos)
+    recall = true_pos / (true_pos + false_neg)
+    assert precision == 1.0, f"Precision {precision:.3f}: {false_pos} grade(s) reused from a different answer"
+    assert recall >= 0.99, f"Recall {recall:.3f}: {false_neg} repeat(s) graded again"
+    assert true_pos > 500, f"Only {true_pos} repeats in the sample"
+
+def test_negation_and_different_answers_are_not_reused():
+    """Verify a negated or substantively different answer is never matched, and trivial differences always are."""
+    index = NearDuplicateIndex()
+    index.add(shingle("The moon causes the tides because of its gravity pulling on the oceans"), 1, 4, "Good")
+    assert index.find(shingle("because of its gravity, the MOON causes the tides pulling on the oceans!"), THRESHOLD).response_id == 1
+    assert index.find(shingle("The moon doesn't cause the tides because of its gravity pulling on the oceans"), THRESHOLD) is None
+    assert index.find(shingle("The sun causes the tides because of its heat pulling on the oceans"), THRESHOLD) is None
+    assert index.find(shingle(""), THRESHOLD) is None
@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+from core.lifecycle import Lifecycle, ShuttingDown
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_in_flight_work_and_refuses_new():
+    lifecycle = Lifecycle()
+    finished = []
+    async def submit():
+        async with lifecycle.track():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+    task = asyncio.ensure_future(submit())
+    await asyncio.sleep(0)
+    abandoned = await lifecycle.drain(timeout=1.0)
+
+    assert abandoned == 0 and finished == [True], "In-flight work should finish before drain returns"
+    with pytest.raises(ShuttingDown):
+        async with lifecycle.track():
+            pass
+    await task
+
+@pytest.mark.asyncio
+async def test_drain_gives_up_at_the_deadline():
+    lifecycle = Lifecycle()
+    release = asyncio.Event()
+
+    async def stuck():
+        async with lifecycle.track():
+            await release.wait()
+
+    task = asyncio.ensure_future(stuck())
+    await asyncio.sleep(0)
+    assert await lifecycle.drain(timeout=0.01) == 1, "The stuck submission should be reported as abandoned"
+    release.set()
+    await task
@@ -0,0 +1,52 @@
+import pytest
+from core.ai_service import ERROR_FEEDBACK
+from core.graders import GraderChain
+from core.local_grader import NearestNeighbours
+
+GRADED = [("The earth is tilted on its axis so sunlight hits at different angles", 4, "Right, the tilt."),
+          ("Because of the tilt of Earth's axis, the angle of sunlight changes", 4, "Right, the tilt."),
+          ("earths axis is tilted which changes how direct the sunlight is", 4, "Right, the tilt."),
+          ("Because the earth is closer to the sun in summer and farther in winter", 1, "Distance is not the cause."),
+          ("The distance from the sun changes, closer means hotter", 1, "Distance is not the cause."),
+          ("in summer we are closer to the sun", 1, "Distance is not the cause.")]
+
+def _model() -> NearestNeighbours:
+    texts, scores, feedback = zip(*GRADED)
+    return NearestNeighbours(k=3, min_similarity=0.3).fit(list(texts), list(scores), list(feedback))
+
+def test_predicts_the_grade_of_similar_answers():
+    """Verify unseen paraphrases get the grade and feedback of the answers they resemble."""
+    model = _model()
+    assert model.predict("The tilt of the earth's axis changes the angle of the sunlight")[:2] == (4, "Right, the tilt.")
+    assert model.predict("we are closer to the sun in the summer")[:2] == (1, "Distance is not the cause.")
+
+def test_abstains_on_unlike_answers():
+    """Verify an answer unlike anything graded is left to another backend."""
+    assert _model().predict("Photosynthesis turns light into chemical energy") is None
+    assert NearestNeighbours().predict("anything") is None
+
+class _Backend:
+    def __init__(self, name, result):
+        self.name, self.result, self.calls = name, result, 0
+
+    async def grade(self, question, student_response, **_):
+        self.calls += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+@pytest.mark.asyncio
+async def test_chain_falls_through_failed_backends():
+    """Verify failures, abstentions and errors move on to the next backend, and a grade stops the chain."""
+    down = _Backend("openrouter", (0, ERROR_FEEDBACK))
+    unsure = _Backend("local", None)
+    broken = _Backend("broken", RuntimeError("boom"))
+    last = _Backend("last", (3, "Good."))
+    never = _Backend("never", (4, "Too late."))
+    chain = GraderChain([down, unsure, broken, last, never])
+    assert await chain.grade({}, "answer", ai_model="m", on_feedback=None) == (3, "Good.", "last")
+    assert never.calls == 0
+
+    # When nobody grades it, the error stands
+    assert await GraderChain([unsure, down]).grade({}, "answer", ai_model="m", on_feedback=None) == (0, ERROR_FEEDBACK, "openrouter")
+    assert await GraderChain([unsure]).grade({}, "answer", ai_model="m", on_feedback=None) == (0, ERROR_FEEDBACK, "local")
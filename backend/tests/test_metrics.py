@@ -0,0 +1,19 @@
+from core import metrics as metrics_module
+from core.metrics import Metrics, RATE_WINDOW_SECONDS, SAMPLE_WINDOW
+
+def test_throughput_is_not_capped_by_the_sample_window(monkeypatch):
+    """per_second counts every observation in the trailing window, however many there were."""
+    now = [1000.0]
+    monkeypatch.setattr(metrics_module.time, "monotonic", lambda: now[0])
+    m = Metrics()
+    for i in range(SAMPLE_WINDOW * 10):
+        now[0] = 1000.0 + i * 0.001
+        m.observe("grading.local.seconds", 0.01)
+    summary = m.snapshot()["timings"]["grading.local.seconds"]
+    assert summary["per_second"] == SAMPLE_WINDOW * 10 / RATE_WINDOW_SECONDS, f"Throughput was capped: {summary}"
+
+    now[0] += RATE_WINDOW_SECONDS + 1
+    m.observe("grading.local.seconds", 0.01)
+    summary = m.snapshot()["timings"]["grading.local.seconds"]
+    assert summary["per_second"] == 1 / RATE_WINDOW_SECONDS, f"Observations past the window still counted: {summary}"
+    assert summary["count"] == SAMPLE_WINDOW * 10 + 1
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import socket
+import httpx
+import pytest
+import uvicorn
+from benchmarks.openrouter_stub import StubSettings, create_app, latency_sampler, synthetic_content
+from core import ai_service
+from core.config import settings
+
+URL = "http://stub/api/v1/chat/completions"
+
+def _payload(answer: str, stream: bool = False) -> dict:
+    return {"model": "stub-model", "messages": [{"role": "user", "content": f"Student Answer: {answer}"}], "stream": stream}
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+
+def test_latency_specs():
+    """Verify each latency distribution parses and a bad spec names the accepted forms."""
+    import random
+    rng = random.Random(0)
+    assert latency_sampler("fixed:0.25", rng)() == 0.25
+    assert 0.1 <= latency_sampler("uniform:0.1,0.2", rng)() <= 0.2
+    assert latency_sampler("normal:-5,0.1", rng)() == 0.0
+    assert latency_sampler("lognormal:0.8,0.5", rng)() > 0
+    with pytest.raises(ValueError, match="lognormal"):
+        latency_sampler("gamma:1,2", rng)
+
+@pytest.mark.asyncio
+async def test_failures_and_429_bursts():
+    """Verify the configured error share, invalid replies and 429 bursts with Retry-After."""
+    app = create_app(StubSettings(LATENCY="fixed:0", ERROR_RATE=0.3, INVALID_JSON_RATE=0.2, SEED=1))
+    async with _client(app) as client:
+        statuses, invalid = [], 0
+        for i in range(200):
+            resp = await client.post(URL, json=_payload(f"answer {i}"))
+            statuses.append(resp.status_code)
+            if resp.status_code == 200:
+                try:
+                    json.loads(resp.json()["choices"][0]["message"]["content"])
+                except json.JSONDecodeError:
+                    invalid += 1
+    assert 40 <= statuses.count(500) <= 80, f"Expected ~30% 500s, got {statuses.count(500)}"
+    assert 20 <= invalid <= 60, f"Expected ~20% invalid replies, got {invalid}"
+
+    burst = create_app(StubSettings(LATENCY="fixed:0", RATE_LIMIT_EVERY=60, RATE_LIMIT_BURST=30))
+    async with _client(burst) as client:
+        resp = await client.post(URL, json=_payload("x"))
+    assert resp.status_code == 429 and int(resp.headers["Retry-After"]) >= 1, f"Expected a 429 burst, got {resp.status_code}"
+
+@pytest.mark.asyncio
+async def test_record_then_replay_is_deterministic(tmp_path):
+    """Verify recorded exchanges replay with the same content, blocking or streamed, and unknown prompts are refused."""
+    cassette = str(tmp_path / "cassette.jsonl")
+    upstream = create_app(StubSettings(LATENCY="uniform:0,0.01", SEED=3))
+    recorder = create_app(StubSettings(MODE="record", UPSTREAM=URL, CASSETTE=cassette), upstream=httpx.ASGITransport(app=upstream))
+    answers = ["the tilt of the axis", "distance from the sun", "idk"]
+    async with _client(recorder) as client:
+        recorded = [(await client.post(URL, json=_payload(a))).json()["choices"][0]["message"]["content"] for a in answers]
+
+    player = create_app(StubSettings(MODE="replay", CASSETTE=cassette, REPLAY_SPEED=0))
+    async with _client(player) as client:
+        for answer, content in zip(answers, recorded):
+            resp = await client.post(URL, json=_payload(answer))
+            assert resp.json()["choices"][0]["message"]["content"] == content
+            streamed = (await client.post(URL, json=_payload(answer, stream=True))).text
+            deltas = [json.loads(line[5:])["choices"][0]["delta"]["content"]
+                      for line in streamed.splitlines() if line.startswith("data:") and "[DONE]" not in line]
+            assert "".join(deltas) == content, f"Streamed replay differs: {deltas}"
+        assert (await client.post(URL, json=_payload("never recorded"))).status_code == 404
+
+@pytest.mark.asyncio
+async def test_grading_path_against_the_stub(monkeypatch):
+    """Verify the real HTTP grading path, streamed and failing, against the stub on a local port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(StubSettings(LATENCY="fixed:0.05", STREAM_CHUNK_SECONDS=0)),
+                                           port=port, log_level="warning"))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.02)
+    monkeypatch.setattr(settings, "OPENROUTER_URL", f"http://127.0.0.1:{port}/api/v1/chat/completions")
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "stub")
+    monkeypatch.setattr(settings, "GRADING_STREAM_ENABLED", True)
+    try:
+        partial = []
+        async def on_feedback(text):
+            partial.append(text)
+        score, feedback = await ai_service.grade_response_streaming("Q", "C", "The axis is tilted", "stub-model", on_feedback)
+        expected = json.loads(synthetic_content({"messages": [{"role": "user", "content": ai_service._build_prompt("Q", "C", "The axis is tilted")}]}))
+        assert (score, feedback) == (expected["score"], expected["feedback"])
+        assert len(partial) > 1 and partial[-1] == feedback, f"Expected feedback to arrive in pieces, got {partial}"
+
+        monkeypatch.setattr(settings, "OPENROUTER_URL", f"http://127.0.0.1:{port}/missing")
+        assert await ai_service.grade_response("Q", "C", "x", "stub-model") == (0, ai_service.HTTP_ERROR_FEEDBACK)
+    finally:
+        server.should_exit = True
+        await serving
+
+async def _lines(*lines):
+    for line in lines:
+        yield line
+
+@pytest.mark.asyncio
+async def test_sse_parsing_and_partial_feedback():
+    """Verify comments and keep-alives are skipped, [DONE] ends the stream and feedback is read while incomplete."""
+    deltas = [d async for d in ai_service._iter_deltas(_lines(
+        ": OPENROUTER PROCESSING", "", 'data: {"choices": [{"delta": {"content": "{\\"score\\": 3, "}}]}',
+        'data: {"choices": [{"delta": {}}]}', 'data: {"choices": [{"delta": {"content": "\\"feedback\\": \\"Go"}}]}',
+        "data: [DONE]", 'data: {"choices": [{"delta": {"content": "ignored"}}]}'))]
+    assert deltas == ['{"score": 3, ', '"feedback": "Go'], f"Unexpected deltas {deltas}"
+    assert ai_service._extract_partial_feedback("".join(deltas)) == "Go"
+    assert ai_service._extract_partial_feedback('{"score": 3, "feedback": "Say \\"hi\\') == 'Say "hi'
+    assert ai_service._extract_partial_feedback('{"score": 3') is None
+
+    for bad in ("data: {not json", 'data: {"error": {"message": "overloaded"}}'):
+        with pytest.raises(httpx.HTTPError):
+            [d async for d in ai_service._iter_deltas(_lines(bad))]
+
+@pytest.mark.asyncio
+async def test_malformed_stream_falls_back_to_blocking_call(monkeypatch):
+    """Verify a broken SSE frame mid-stream regrades with the blocking call instead of failing the answer."""
+    def handler(request):
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(200, text='data: {"choices": [{"delta": {"content": "{\\"sco"}}]}\n\ndata: {"choi\n\n')
+        return httpx.Response(200, json={"choices": [{"message": {"content": '{"score": 4, "feedback": "Complete."}'}}]})
+    client = httpx.AsyncClient
+    monkeypatch.setattr(ai_service.httpx, "AsyncClient", lambda: client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "stub")
+    monkeypatch.setattr(settings, "GRADING_STREAM_ENABLED", True)
+
+    async def on_feedback(text):
+        pass
+    assert await ai_service.grade_response_streaming("Q", "C", "x", "stub-model", on_feedback) == (4, "Complete.")
@@ -0,0 +1,69 @@
+import time
+import pytest
+from core.pregrade import PreGrader, parse_rubric
+
+QUESTION = {"text": "What is the powerhouse of the cell?", "answer_key": "mitochondria\nthe mitochondria",
+            "rubric": "1: chloroplast | chloroplasts\n4: mitochondri*"}
+pregrader = PreGrader(True, 1, "idk,i dont know,no idea", 0.9)
+
+@pytest.mark.parametrize("answer, expected", [
+    ("", ("empty", 0)),
+    ("   \n ", ("empty", 0)),
+    ("?!", ("empty", 0)),
+    ("IDK", ("non_answer", 0)),
+    ("I don't know.", ("non_answer", 0)),
+    ("what is the powerhouse of the cell", ("question_copy", 0)),
+    ("The Mitochondria!", ("answer_key", 4)),
+    ("It's the chloroplast", ("rubric", 1)),
+    ("I think it is the mitochondrion", ("rubric", 4)),
+])
+def test_trivial_answers_are_decided_locally(answer, expected):
+    """Verify each rule decides its case with the expected score."""
+    decided = pregrader.grade(QUESTION, answer)
+    assert decided and (decided.rule, decided.score) == expected, f"{answer!r} -> {decided}"
+
+@pytest.mark.parametrize("answer", ["The cell", "It makes energy for the cell from glucose", "ribosomes"])
+def test_ambiguous_answers_go_to_the_model(answer):
+    """Verify real answers, including short ones sharing words with the question, are not decided."""
+    assert pregrader.grade(QUESTION, answer) is None
+
+@pytest.mark.parametrize("question, answer", [
+    ("Is the sky blue or red?", "The sky is blue"),
+    ("Which is larger, 3/4 or 2/3?", "3/4 is larger"),
+    ("Is water wet? Yes or no.", "yes"),
+])
+def test_answers_from_the_question_words_go_to_the_model(question, answer):
+    """Verify choice and yes/no answers made of the question's words are not taken for a pasted-back question."""
+    assert pregrader.grade({"text": question}, answer) is None
+
+def test_rubric_errors_name_the_line():
+    """Verify a malformed rubric is rejected with the offending line."""
+    with pytest.raises(ValueError, match="line 2"):
+        parse_rubric("4: ok\n9: too high")
+    with pytest.raises(ValueError, match="line 1"):
+        parse_rubric("3: (unclosed")
+
+@pytest.mark.parametrize("pattern", ["(a+)+$", "(a|aa)*c", "^(\\w+\\s?)*$", "a*b", "mitochondri(a|on)", "x | "])
+def test_regular_expressions_are_rejected(pattern):
+    """Verify regex syntax, which can backtrack exponentially, is refused when a rubric is saved."""
+    with pytest.raises(ValueError, match="regular expressions are not supported"):
+        parse_rubric(f"4: {pattern}")
+
+def test_rubric_phrases_match_whole_words():
+    """Verify phrases match whole words, a trailing * matches a prefix, and matching stays linear."""
+    question = {"text": "Q", "rubric": "2: a | aa\n4: light reaction*"}
+    assert pregrader.grade(question, "The Light-Reactions happen first").score == 4
+    assert pregrader.grade(question, "delight reactions") is None
+    assert pregrader.grade(question, "aaa aaaa") is None
+    started = time.perf_counter()
+    assert pregrader.grade(question, "a" * 100000 + "c") is None
+    assert time.perf_counter() - started < 0.05, "Rubric matching must not backtrack"
+
+def test_decisions_take_microseconds():
+    """Verify the local stage is cheap enough to run on every submit."""
+    answers = ["", "idk", "The Mitochondria!", "It makes energy for the cell from glucose"] * 2500
+    started = time.perf_counter()
+    for answer in answers:
+        pregrader.grade(QUESTION, answer)
+    per_answer = (time.perf_counter() - started) / len(answers)
+    assert per_answer < 50e-6, f"{per_answer * 1e6:.1f}us per answer"
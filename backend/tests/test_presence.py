@@ -0,0 +1,112 @@
+import time
+import pytest
+from core.config import settings
+from core.connections import ConnectionManager
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+@pytest.mark.asyncio
+async def test_roster_counts_students_not_sockets():
+    """Verify a student with two tabs is one roster entry and leaves only when both close."""
+    manager = ConnectionManager()
+    admin = manager.subscribe_admin(1, {"roster"})
+    tab1, tab2, other = FakeSocket(), FakeSocket(), FakeSocket()
+    for ws in (tab1, tab2, other):
+        await manager.connect(ws, 1)
+
+    assert manager.get_connected_count(1) == 0, "Anonymous sockets should not be on the roster"
+    manager.update_name(tab1, 1, "Ada")
+    manager.update_name(tab2, 1, "Ada")
+    manager.update_name(other, 1, "Grace")
+    assert manager.get_connected_count(1) == 2, f"Expected 2 students, got {manager.get_connected_names(1)}"
+
+    manager.disconnect(tab1, 1)
+    assert sorted(manager.get_connected_names(1)) == ["Ada", "Grace"], "Ada still has a tab open"
+    manager.disconnect(tab2, 1)
+    assert manager.get_connected_names(1) == ["Grace"], f"Unexpected roster: {manager.get_connected_names(1)}"
+
+    # Joins of Ada and Grace, then Ada leaving; the second tab is not a roster change
+    events = [admin.queue.get_nowait() for _ in range(admin.queue.qsize())]
+    assert [e["count"] for e in events] == [1, 2, 1], f"Unexpected roster events: {events}"
+    assert events[-1] == {"type": "roster_update", "count": 1, "names": ["Grace"]}, f"Unexpected event: {events[-1]}"
+
+@pytest.mark.asyncio
+async def test_heartbeat_reaps_idle_sockets():
+    """Verify the sweep pings live sockets and closes ones idle past the timeout."""
+    manager = ConnectionManager()
+    live, ghost = FakeSocket(), FakeSocket()
+    await manager.connect(live, 1)
+    await manager.connect(ghost, 1)
+    manager.update_name(live, 1, "Ada")
+    manager.update_name(ghost, 1, "Grace")
+
+    later = time.monotonic() + settings.WS_IDLE_TIMEOUT_SECONDS + 1
+    manager._last_seen[live] = later
+    await manager.sweep(now=later)
+
+    assert ghost.closed == 1001, "Idle socket should be closed"
+    assert live.sent == [{"type": "ping"}], f"Live socket should be pinged, got {live.sent}"
+    assert manager.get_connected_names(1) == ["Ada"], f"Unexpected roster: {manager.get_connected_names(1)}"
+
+@pytest.mark.asyncio
+async def test_messages_are_routed_by_type():
+    """Verify students only get session-wide and their own messages, and dashboards get response events."""
+    manager = ConnectionManager()
+    admin = manager.subscribe_admin(1, {"responses", "questions"})
+    ada, grace = FakeSocket(), FakeSocket()
+    await manager.connect(ada, 1)
+    await manager.connect(grace, 1)
+    manager.update_name(ada, 1, "Ada")
+    manager.update_name(grace, 1, "Grace")
+
+    await manager.send(1, {"type": "new_response", "response": {"student_name": "Ada"}})
+    await manager.send(1, {"type": "grading_result", "score": 3}, student_name="Ada")
+    await manager.send(1, {"type": "stats_update", "stats": {}})
+    await manager.send(1, {"type": "active_questions", "questions": []})
+
+    assert [m["type"] for m in ada.sent] == ["grading_result", "active_questions"], f"Ada got {ada.sent}"
+    assert [m["type"] for m in grace.sent] == ["active_questions"], f"Grace got {grace.sent}"
+    received = [admin.queue.get_nowait()["type"] for _ in range(admin.queue.qsize())]
+    # stats_update is not delivered because the dashboard did not subscribe to it
+    assert received == ["new_response", "active_questions"], f"Dashboard got {received}"
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_only_missed_events():
+    """Verify a resume gets the session events and the student's own events after last_seq."""
+    manager = ConnectionManager()
+    position = manager.position(1)
+
+    await manager.send(1, {"type": "active_questions", "questions": [1]})
+    seen = manager.position(1)["seq"]
+    await manager.send(1, {"type": "grading_result", "score": 4}, student_name="Ada")
+    await manager.send(1, {"type": "grading_result", "score": 1}, student_name="Grace")
+    await manager.send(1, {"type": "active_questions", "questions": []})
+    await manager.send(1, {"type": "feedback_delta", "feedback": "..."}, student_name="Ada")
+
+    missed = manager.replay(1, position["epoch"], seen, "Ada")
+    assert [(m["type"], m["seq"]) for m in missed] == [("grading_result", 2), ("active_questions", 4)], \
+        f"Unexpected replay: {missed}"
+    assert manager.replay(1, "other-epoch", seen, "Ada") is None, "Seqs from another epoch cannot be resumed"
+    assert manager.replay(1, position["epoch"], 99, "Ada") is None, "A seq from the future cannot be resumed"
+
+@pytest.mark.asyncio
+async def test_replay_refuses_when_events_were_evicted():
+    """Verify a client that fell further behind than the log gets None (full snapshot) instead of a gap."""
+    manager = ConnectionManager()
+    epoch = manager.position(1)["epoch"]
+    for i in range(settings.WS_REPLAY_LOG_SIZE + 1):
+        await manager.send(1, {"type": "active_questions", "questions": [i]})
+    assert manager.replay(1, epoch, 0, None) is None, "The first event was evicted, so seq 0 cannot resume"
+    assert len(manager.replay(1, epoch, 1, None)) == settings.WS_REPLAY_LOG_SIZE
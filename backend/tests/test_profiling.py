@@ -0,0 +1,32 @@
+import sys
+from core import tracing
+from core.profiling import collapse
+
+def test_untraced_spans_cost_no_allocation():
+    """Verify spans outside a traced request are one shared no-op and record nothing."""
+    assert tracing.span("a") is tracing.span("b")
+    with tracing.span("a"):
+        tracing.record("db.x", 0.1)
+
+def test_traced_spans_are_recorded_in_order():
+    """Verify spans inside a trace are kept with offsets and listed in start order."""
+    trace = tracing.Trace("POST", "/x")
+    token = tracing._current.set(trace)
+    try:
+        with tracing.span("outer"):
+            tracing.record("db.inner", 0.0)
+    finally:
+        tracing._current.reset(token)
+    trace.finish()
+    assert [s["name"] for s in trace.to_dict()["spans"]] == ["outer", "db.inner"]
+    assert trace.server_timing().endswith(f"total;dur={trace.duration_ms}")
+
+def test_collapsed_stack_is_outermost_first():
+    """Verify a stack collapses to module:function:line frames, outermost first, without separators inside frames."""
+    def inner():
+        return collapse(sys._getframe(), root="main")
+    line = inner()
+    frames = line.split(";")
+    assert frames[0] == "main"
+    assert frames[-1].startswith(f"{__name__}:test_collapsed_stack_is_outermost_first.<locals>.inner:")
+    assert frames[-2].startswith(f"{__name__}:test_collapsed_stack_is_outermost_first:")
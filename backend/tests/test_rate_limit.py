@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from core.rate_limit import AdmissionGate, GateSaturated
+
+async def _hold(gate, key, release: asyncio.Event, admitted: list):
+    async with gate.admit(key):
+        admitted.append(key)
+        await release.wait()
+
+@pytest.mark.asyncio
+async def test_busy_sessions_cannot_fill_the_queue_for_others():
+    """Verify callers queued on their own session's share leave the shared queue to other sessions."""
+    gate = AdmissionGate(max_concurrency=4, max_queue=4, max_per_key=2)
+    release, admitted = asyncio.Event(), []
+    # Two busy classrooms: each holds its 2 slots and queues 4 more on its own share
+    tasks = [asyncio.ensure_future(_hold(gate, room, release, admitted)) for room in ("a", "b") for _ in range(6)]
+    await asyncio.sleep(0)
+    assert gate.active == 4 and gate.waiting == 0
+
+    # Their own queues are full...
+    with pytest.raises(GateSaturated):
+        async with gate.admit("a"):
+            pass
+    # ...but another session still gets a place in the shared queue
+    tasks.append(asyncio.ensure_future(_hold(gate, "c", release, admitted)))
+    await asyncio.sleep(0)
+    assert gate.waiting == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert sorted(admitted) == ["a"] * 6 + ["b"] * 6 + ["c"]
+    assert gate.active == 0 and gate.waiting == 0 and not gate._shares
+
+@pytest.mark.asyncio
+async def test_shared_queue_is_bounded():
+    """Verify the shared queue rejects once max_queue callers wait for a slot."""
+    gate = AdmissionGate(max_concurrency=1, max_queue=2)
+    release, admitted = asyncio.Event(), []
+    tasks = [asyncio.ensure_future(_hold(gate, None, release, admitted)) for _ in range(3)]
+    await asyncio.sleep(0)
+    with pytest.raises(GateSaturated) as saturated:
+        async with gate.admit():
+            pass
+    assert saturated.value.retry_after > 0
+    release.set()
+    await asyncio.gather(*tasks)
@@ -0,0 +1,75 @@
+import inspect
+import pytest
+from db import admin_repo, collection_repo, question_repo, session_repo, student_repo, retention_repo, memory_repo
+
+# (MySQL implementation, in-memory implementation) for every repository
+REPOSITORY_PAIRS = [
+    (admin_repo.MySQLAdminUserRepository, memory_repo.MemoryAdminUserRepository),
+    (collection_repo.MySQLCollectionRepository, memory_repo.MemoryCollectionRepository),
+    (question_repo.MySQLQuestionRepository, memory_repo.MemoryQuestionRepository),
+    (session_repo.MySQLSessionRepository, memory_repo.MemorySessionRepository),
+    (student_repo.MySQLStudentRepository, memory_repo.MemoryStudentRepository),
+    (retention_repo.MySQLRetentionRepository, memory_repo.MemoryRetentionRepository),
+]
+
+def _public_api(cls):
+    return {
+        name: inspect.signature(member)
+        for name, member in inspect.getmembers(cls, inspect.isfunction)
+        if not name.startswith("_")
+    }
+
+@pytest.mark.parametrize("mysql_cls,memory_cls", REPOSITORY_PAIRS, ids=lambda c: c.__name__)
+def test_memory_backend_matches_mysql_api(mysql_cls, memory_cls):
+    """Both backends must expose the same public methods with the same signatures."""
+    mysql_api = _public_api(mysql_cls)
+    memory_api = _public_api(memory_cls)
+
+    missing = set(mysql_api) - set(memory_api)
+    extra = set(memory_api) - set(mysql_api)
+    assert not missing and not extra, \
+        f"{memory_cls.__name__} drifted from {mysql_cls.__name__}: missing={missing}, extra={extra}"
+    for name, signature in mysql_api.items():
+        assert memory_api[name] == signature, \
+            f"{memory_cls.__name__}.{name}{memory_api[name]} does not match {mysql_cls.__name__}.{name}{signature}"
+        assert inspect.iscoroutinefunction(getattr(memory_cls, name)) == inspect.iscoroutinefunction(getattr(mysql_cls, name)), \
+            f"{memory_cls.__name__}.{name} must match the sync/async nature of the MySQL method"
+
+def test_partition_plan_covers_the_current_month():
+    """The first split starts no later than the current month, even with pmax empty."""
+    from datetime import datetime, timezone
+    now = datetime(2026, 5, 14, tzinfo=timezone.utc)
+    through = datetime(2026, 8, 14, tzinfo=timezone.utc)
+    names = lambda months: [retention_repo.partition_name(m) for m in months]
+
+    assert names(retention_repo.partition_months(None, None, now, through)) == \
+        ["p202605", "p202606", "p202607", "p202608"], "An empty pmax must still get the current month's partition"
+    assert names(retention_repo.partition_months(None, datetime(2026, 3, 2), now, through))[:2] == \
+        ["p202603", "p202604"], "Rows already in pmax must be split out from the oldest one's month"
+    assert names(retention_repo.partition_months(None, datetime(2026, 7, 1, 12), now, through))[0] == "p202605", \
+        "Rows dated ahead must not push the first partition past the current month"
+    last = datetime(2026, 7, 1, tzinfo=timezone.utc)
+    assert names(retention_repo.partition_months(last, None, now, through)) == ["p202607", "p202608"], \
+        "Later runs continue from the last partition's bound"
+
+@pytest.mark.asyncio
+async def test_collection_writes_invalidate_cached_questions(monkeypatch):
+    """Moving or purging a collection's questions must drop the per-worker question.by_id cache."""
+    from contextlib import asynccontextmanager
+    from db import query
+
+    async def execute(*args, **kwargs):
+        return None
+
+    @asynccontextmanager
+    async def transaction():
+        yield None
+    monkeypatch.setattr(query, "execute", execute)
+    monkeypatch.setattr(query, "transaction", transaction)
+
+    cache = question_repo._BY_ID.cache
+    repo = collection_repo.MySQLCollectionRepository
+    for write in (lambda: repo.delete_move(2, 1), lambda: repo.delete_purge(2)):
+        cache.set(("one", (5,)), {"id": 5, "collection_id": 2})
+        await write()
+        assert cache.get(("one", (5,))) is None, "A cached question outlived a write to its collection"
@@ -0,0 +1,82 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from main import app
+from core.sharding import HashRing, LocalShard, ShardGuardMiddleware, Dispatcher, session_of
+from core.session_directory import SessionDirectory
+
+def test_ring_spreads_sessions_and_moves_few_on_resize():
+    """Verify sessions spread evenly and adding a worker only moves sessions onto it."""
+    ring = HashRing(["w1", "w2", "w3"])
+    owners = {sid: ring.owner(sid) for sid in range(1, 3001)}
+    for node in ring.nodes:
+        share = sum(1 for o in owners.values() if o == node) / len(owners)
+        assert 0.2 < share < 0.47, f"{node} owns {share:.0%} of sessions"
+
+    grown = HashRing(["w1", "w2", "w3", "w4"])
+    moved = [sid for sid, owner in owners.items() if grown.owner(sid) != owner]
+    assert all(grown.owner(sid) == "w4" for sid in moved), "Sessions moved between workers that were already there"
+    assert len(moved) < len(owners) * 0.4, f"{len(moved)} of {len(owners)} sessions moved"
+
+def test_session_scoped_paths():
+    """Verify which requests are pinned to a session's owner."""
+    assert session_of({"type": "websocket", "path": "/api/student/ws/12"}) == 12
+    assert session_of({"type": "websocket", "path": "/api/admin/ws/12"}) == 12
+    assert session_of({"type": "http", "method": "POST", "path": "/api/student/session/12/question/3/instance/4/submit"}) == 12
+    assert session_of({"type": "http", "method": "PUT", "path": "/api/admin/sessions/12/end"}) == 12
+    assert session_of({"type": "http", "method": "DELETE", "path": "/api/admin/sessions/12"}) == 12
+    # Join codes can be all digits; looking one up is not session-scoped
+    assert session_of({"type": "http", "method": "GET", "path": "/api/admin/sessions/234567"}) is None
+    assert session_of({"type": "http", "method": "POST", "path": "/api/student/join/ABC234"}) is None
+
+@pytest.mark.asyncio
+async def test_dispatcher_routes_to_owning_worker():
+    """Verify a submit goes through the dispatcher to the owner, and the other worker refuses the session."""
+    names = ["worker-a", "worker-b"]
+    # In-process stand-ins for two workers; each only accepts the sessions it owns
+    workers = {name: ShardGuardMiddleware(app, LocalShard(names, name)) for name in names}
+    dispatcher = Dispatcher(workers)
+
+    async with AsyncClient(transport=ASGITransport(app=dispatcher), base_url="http://test") as client:
+        login = await client.post("/api/admin/login", data={"username": "admin", "password": "admin"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        q_id = (await client.post("/api/admin/questions", json={"text": "Q", "grading_criteria": "C"}, headers=headers)).json()["id"]
+        code = (await client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers)).json()["code"]
+        s_id = (await client.post(f"/api/student/join/{code}")).json()["session_id"]
+        sq_id = (await client.post(f"/api/admin/sessions/{s_id}/activate-question?question_id={q_id}",
+                                   headers=headers)).json()["session_question_id"]
+
+        response = await client.post(f"/api/student/session/{s_id}/question/{q_id}/instance/{sq_id}/submit",
+                                     json={"student_name": "Ada", "response_text": "Answer"})
+        assert response.status_code == 200, f"Expected 200 through the dispatcher, got {response.status_code}: {response.text}"
+
+    owner = dispatcher.ring.owner(s_id)
+    other = next(name for name in names if name != owner)
+    async with AsyncClient(transport=ASGITransport(app=workers[other]), base_url="http://test") as client:
+        response = await client.get(f"/api/student/session/{s_id}/active-questions")
+        assert response.status_code == 421, f"Expected 421 from a worker that does not own the session, got {response.status_code}"
+
+@pytest.mark.asyncio
+async def test_non_owner_reads_sessions_through():
+    """Verify joins routed to a worker that does not own the session see it end straight away."""
+    rows = {"ABC234": {"id": 7, "code": "ABC234", "status": "active", "admin_id": 1}}
+    loads = []
+
+    async def by_code(code):
+        loads.append(code)
+        return dict(rows[code]) if code in rows else None
+
+    async def by_id(session_id):
+        return next((dict(r) for r in rows.values() if r["id"] == session_id), None)
+
+    owner = SessionDirectory(by_code, by_id, owns=lambda sid: sid == 7)
+    other = SessionDirectory(by_code, by_id, owns=lambda sid: sid != 7)
+    for directory in (owner, other):
+        directory.warm([rows["ABC234"]])
+        assert (await directory.resolve_code("ABC234"))["status"] == "active"
+    assert loads == ["ABC234"], f"Only the non-owner should have read the database, got {loads}"
+
+    # Ended on the owner, which updates its own entry
+    rows["ABC234"]["status"] = "closed"
+    owner.set_status(7, "closed")
+    assert (await owner.resolve_code("ABC234"))["status"] == "closed"
+    assert (await other.resolve_code("ABC234"))["status"] == "closed", "A non-owner must not serve a stale entry"
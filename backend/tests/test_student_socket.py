@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from db.session import is_memory_backend
+
+# TestClient runs the app on its own event loop, which only the in-process backend tolerates
+pytestmark = pytest.mark.skipif(not is_memory_backend(), reason="requires DATABASE_URL=memory://")
+
+def test_student_socket_resumes_from_last_seq():
+    client = TestClient(app)
+    token = client.post("/api/admin/login", data={"username": "admin", "password": "admin"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    code = client.post("/api/admin/sessions", json={"ai_model": "test-model"}, headers=headers).json()["code"]
+    session_id = client.post(f"/api/student/join/{code}").json()["session_id"]
+
+    with client.websocket_connect(f"/api/student/ws/{session_id}?name=Ada") as ws:
+        snapshot = ws.receive_json()
+    assert snapshot["type"] == "active_questions" and snapshot["seq"] == 0, f"Unexpected snapshot: {snapshot}"
+
+    # Launched while Ada's phone was asleep
+    q_id = client.post("/api/admin/questions", json={"text": "Missed Q", "grading_criteria": "N/A", "collection_id": 1},
+                       headers=headers).json()["id"]
+    client.post(f"/api/admin/sessions/{session_id}/activate-question?question_id={q_id}", headers=headers)
+
+    with client.websocket_connect(
+        f"/api/student/ws/{session_id}?name=Ada&epoch={snapshot['epoch']}&last_seq={snapshot['seq']}"
+    ) as ws:
+        missed = ws.receive_json()
+        resumed = ws.receive_json()
+    assert missed["type"] == "active_questions" and missed["seq"] == 1, f"Expected the missed launch, got {missed}"
+    assert [q["text"] for q in missed["questions"]] == ["Missed Q"], f"Unexpected questions: {missed['questions']}"
+    assert resumed == {"type": "resumed", "replayed": 1, "epoch": snapshot["epoch"], "seq": 1}, f"Unexpected: {resumed}"
@@ -21,7 +21,15 @@ CREATE TABLE IF NOT EXISTS question (
   collection_id INT NOT NULL DEFAULT 1,
   text TEXT NOT NULL,
   grading_criteria TEXT NOT NULL,
+  -- Checked by the local pre-grader before the model: accepted answers, one per line,
+  -- and `score: regex` rubric lines
+  answer_key TEXT NULL,
+  rubric TEXT NULL,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  -- Keyset pagination of the question bank, overall and per collection
+  INDEX idx_question_created (created_at, id),
+  INDEX idx_question_collection_created (collection_id, created_at, id),
+  FULLTEXT INDEX ft_question_text (text),
   FOREIGN KEY (collection_id) REFERENCES collection(id) ON DELETE CASCADE
 );
 
@@ -30,7 +38,17 @@ CREATE TABLE IF NOT EXISTS session (
   id INT AUTO_INCREMENT PRIMARY KEY,
   code VARCHAR(50) UNIQUE NOT NULL,
   ai_model VARCHAR(255) DEFAULT 'openai/gpt-3.5-turbo',
-  status VARCHAR(50) DEFAULT 'active'
+  status VARCHAR(50) DEFAULT 'active',
+  -- Owning admin; each admin lists and manages only their own sessions
+  admin_id INT NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  closed_at TIMESTAMP NULL,
+  -- Set once the session's questions and responses have moved to the archive files
+  archived_at TIMESTAMP NULL,
+  INDEX idx_session_status (status, id),
+  INDEX idx_session_admin (admin_id, id),
+  INDEX idx_session_archivable (status, archived_at, closed_at),
+  FOREIGN KEY (admin_id) REFERENCES admin_user(id) ON DELETE SET NULL
 );
 
 CREATE TABLE IF NOT EXISTS session_question (
@@ -42,8 +60,12 @@ CREATE TABLE IF NOT EXISTS session_question (
   FOREIGN KEY (question_id) REFERENCES question(id) ON DELETE CASCADE
 );
 
+-- Range-partitioned by month so retention (python -m jobs.retention) drops whole months
+-- instead of deleting row by row; that job also adds the monthly partitions ahead of time.
+-- Partitioned tables cannot have foreign keys, so the repositories delete a session's or
+-- question's responses themselves, and the primary key has to include created_at.
 CREATE TABLE IF NOT EXISTS student_response (
-  id INT AUTO_INCREMENT PRIMARY KEY,
+  id INT AUTO_INCREMENT,
   session_id INT NOT NULL,
   question_id INT NOT NULL,
   session_question_id INT NOT NULL,
@@ -51,10 +73,17 @@ CREATE TABLE IF NOT EXISTS student_response (
   response_text TEXT NOT NULL,
   ai_score INT,
   ai_feedback TEXT,
-  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  FOREIGN KEY (session_id) REFERENCES session(id) ON DELETE CASCADE,
-  FOREIGN KEY (question_id) REFERENCES question(id) ON DELETE CASCADE,
-  FOREIGN KEY (session_question_id) REFERENCES session_question(id) ON DELETE CASCADE
+  -- What produced the grade: openrouter, local, pregrade or reuse
+  graded_by VARCHAR(32) NULL,
+  -- Set when the grade was copied from this earlier response to a near-identical answer
+  graded_from INT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (id, created_at),
+  INDEX idx_response_session (session_id, session_question_id),
+  INDEX idx_response_question (question_id)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+  PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 -- Basic admin seed
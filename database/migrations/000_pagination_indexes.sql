@@ -0,0 +1,15 @@
+-- Indexes behind the keyset-paginated listings (GET /questions/page, /collections/page,
+-- /sessions/page) and question text search. init.sql already has these for new
+-- databases; run it once against existing ones, before the later migrations.
+USE fb_tool;
+
+ALTER TABLE question
+  ADD INDEX idx_question_created (created_at, id),
+  ADD INDEX idx_question_collection_created (collection_id, created_at, id);
+
+-- Built separately: InnoDB rebuilds the table for the first FULLTEXT index
+ALTER TABLE question
+  ADD FULLTEXT INDEX ft_question_text (text);
+
+ALTER TABLE session
+  ADD INDEX idx_session_status (status, id);
@@ -0,0 +1,11 @@
+-- Sessions are owned by the admin who started them, so several classes can run at once.
+-- init.sql already has this for new databases; run it once against existing ones.
+USE fb_tool;
+
+ALTER TABLE session
+  ADD COLUMN admin_id INT NULL,
+  ADD INDEX idx_session_admin (admin_id, id),
+  ADD FOREIGN KEY (admin_id) REFERENCES admin_user(id) ON DELETE SET NULL;
+
+-- Existing sessions go to the seeded admin
+UPDATE session SET admin_id = (SELECT id FROM admin_user WHERE username = 'admin') WHERE admin_id IS NULL;
@@ -0,0 +1,17 @@
+-- Timestamps used by the archival job (python -m jobs.archive) to find closed sessions
+-- older than ARCHIVE_AFTER_DAYS, and the marker it sets once a session is archived.
+USE fb_tool;
+
+ALTER TABLE session
+  ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  ADD COLUMN closed_at TIMESTAMP NULL,
+  ADD COLUMN archived_at TIMESTAMP NULL,
+  ADD INDEX idx_session_archivable (status, archived_at, closed_at);
+
+-- Sessions closed before this migration count as closed at their last response
+UPDATE session s
+SET s.closed_at = COALESCE(
+  (SELECT MAX(r.created_at) FROM student_response r WHERE r.session_id = s.id),
+  CURRENT_TIMESTAMP
+)
+WHERE s.status = 'closed';
@@ -0,0 +1,29 @@
+-- Partitions student_response by month (see init.sql). Rebuilds the table, so run it in
+-- a quiet window; then run `python -m jobs.retention` once to split existing rows into
+-- monthly partitions (another one-off copy) and from then on nightly.
+USE fb_tool;
+
+-- Partitioned tables cannot have foreign keys; these are the names MySQL gave the
+-- unnamed constraints in init.sql. Check SHOW CREATE TABLE student_response if they differ.
+ALTER TABLE student_response
+  DROP FOREIGN KEY student_response_ibfk_1,
+  DROP FOREIGN KEY student_response_ibfk_2,
+  DROP FOREIGN KEY student_response_ibfk_3;
+
+-- The partitioning column has to be part of every unique key, the primary key included
+UPDATE student_response SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE student_response
+  MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (id, created_at),
+  -- Replace the indexes MySQL created for the foreign keys
+  DROP INDEX session_id,
+  DROP INDEX question_id,
+  DROP INDEX session_question_id,
+  ADD INDEX idx_response_session (session_id, session_question_id),
+  ADD INDEX idx_response_question (question_id);
+
+ALTER TABLE student_response
+  PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+  );
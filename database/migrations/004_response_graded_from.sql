@@ -0,0 +1,6 @@
+-- Responses graded by reusing the grade of a near-identical earlier answer to the same
+-- question instance record that answer's id here instead of calling the model.
+USE fb_tool;
+
+ALTER TABLE student_response
+  ADD COLUMN graded_from INT NULL AFTER ai_feedback;
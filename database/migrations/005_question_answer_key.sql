@@ -0,0 +1,7 @@
+-- Per-question answer key and regex rubric, checked by the local pre-grader before an
+-- answer is sent to the model.
+USE fb_tool;
+
+ALTER TABLE question
+  ADD COLUMN answer_key TEXT NULL AFTER grading_criteria,
+  ADD COLUMN rubric TEXT NULL AFTER answer_key;
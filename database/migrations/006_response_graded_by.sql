@@ -0,0 +1,6 @@
+-- Which grading backend produced each response's grade (openrouter, local, pregrade or
+-- reuse). The local grader trains only on answers the model graded.
+USE fb_tool;
+
+ALTER TABLE student_response
+  ADD COLUMN graded_by VARCHAR(32) NULL AFTER ai_feedback;
@@ -0,0 +1,47 @@
+const { test, expect } = require('@playwright/test');
+const { endActiveSession, submitAnswer } = require('./helpers/api');
+const { adminLoginUI, startSession, createQuestion, launchFirstQuestion, endSessionUI } = require('./helpers/ui');
+
+test.describe('Answer Groups', () => {
+    test.beforeEach(async ({ request }) => {
+        await endActiveSession(request);
+    });
+
+    test('should group similar answers with their size and a representative', async ({ browser, request }) => {
+        const adminContext = await browser.newContext();
+        const adminPage = await adminContext.newPage();
+
+        // 1. Admin logs in, starts a session and launches a question
+        await adminLoginUI(adminPage);
+        console.log('[STEP 1] Starting a session and launching a question');
+        const code = await startSession(adminPage);
+        await createQuestion(adminPage, 'What does the mitochondria do?', 'Produces energy');
+        await launchFirstQuestion(adminPage);
+
+        // 2. Three students answer through the API: two alike, one different
+        console.log('[STEP 2] Submitting three answers');
+        await submitAnswer(request, code, 'Ana', 'It produces energy for the cell');
+        await submitAnswer(request, code, 'Ben', 'It produces the energy of the cell');
+        await submitAnswer(request, code, 'Cal', 'Photosynthesis in leaves');
+        await expect(adminPage.locator('[data-testid^="student-response-summary-"]')).toHaveCount(3);
+        console.log('[STEP 2] Admin sees all three responses');
+
+        // 3. Admin groups the answers
+        console.log('[STEP 3] Admin grouping similar answers');
+        await adminPage.locator('[data-testid^="group-answers-button-"]').first().click();
+        // Largest group first: the two energy answers
+        const firstGroupSize = adminPage.locator('[data-testid^="answer-group-size-"][data-testid$="-0"]');
+        await expect(firstGroupSize).toContainText('2 answers (67%)');
+        const representative = adminPage.locator('[data-testid^="answer-group-representative-"][data-testid$="-0"]').first();
+        await expect(representative).toContainText('energy');
+        const secondGroupSize = adminPage.locator('[data-testid^="answer-group-size-"][data-testid$="-1"]');
+        await expect(secondGroupSize).toContainText('1 answer (33%)');
+        console.log('[STEP 3] Groups, sizes and representative confirmed');
+
+        // Cleanup
+        console.log('[CLEANUP] Ending session');
+        await endSessionUI(adminPage);
+
+        await adminContext.close();
+    });
+});
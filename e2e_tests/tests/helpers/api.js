@@ -59,4 +59,35 @@ async function endActiveSession(request) {
     }
 }
 
-module.exports = { adminLogin, endActiveSession };
+/**
+ * Submits an answer to the session's first active question as a student, straight to the API.
+ * For tests that need several students' answers without a browser per student.
+ * @param {import('@playwright/test').APIRequestContext} request
+ * @param {string} code - 6-character session code
+ * @param {string} name - Student display name
+ * @param {string} text - The answer
+ * @returns {Promise<object>} The submit response body
+ */
+async function submitAnswer(request, code, name, text) {
+    const joinRes = await request.post(`${BASE_URL}/api/student/join/${code}`);
+    if (!joinRes.ok()) {
+        throw new Error(`[API HELPER] Join failed: ${joinRes.status()} ${await joinRes.text()}`);
+    }
+    const sessionId = (await joinRes.json()).session_id;
+    const active = await (await request.get(`${BASE_URL}/api/student/session/${sessionId}/active-questions`)).json();
+    if (active.length === 0) {
+        throw new Error(`[API HELPER] Session ${sessionId} has no active question to answer`);
+    }
+    const q = active[0];
+    console.log(`[API HELPER] "${name}" submitting to session_question ${q.session_question_id}: "${text}"`);
+    const res = await request.post(
+        `${BASE_URL}/api/student/session/${sessionId}/question/${q.id}/instance/${q.session_question_id}/submit`,
+        { data: { student_name: name, response_text: text } }
+    );
+    if (!res.ok()) {
+        throw new Error(`[API HELPER] Submit failed: ${res.status()} ${await res.text()}`);
+    }
+    return res.json();
+}
+
+module.exports = { adminLogin, endActiveSession, submitAnswer };
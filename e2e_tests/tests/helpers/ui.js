@@ -72,6 +72,26 @@ async function createQuestion(page, text, criteria) {
     await page.getByTestId('save-question-button').click();
 }
 
+/**
+ * Like createQuestion, but also fills in the answer key and rubric, which are graded
+ * without the model. Does NOT assert on the resulting toast — callers do that.
+ * @param {import('@playwright/test').Page} page
+ * @param {string} text - Question text
+ * @param {string} criteria - Grading criteria
+ * @param {string} answerKey - Accepted answers, one per line
+ * @param {string} rubric - `score: phrase | phrase` lines
+ */
+async function createQuestionWithKey(page, text, criteria, answerKey, rubric) {
+    console.log(`[UI HELPER] Creating question with answer key and rubric: "${text}"`);
+    await page.getByTestId('new-question-button').click();
+    await page.getByTestId('question-text-input').fill(text);
+    await page.getByTestId('grading-criteria-input').fill(criteria);
+    await page.getByTestId('answer-key-toggle').click();
+    await page.getByTestId('answer-key-input').fill(answerKey);
+    await page.getByTestId('rubric-input').fill(rubric);
+    await page.getByTestId('save-question-button').click();
+}
+
 /**
  * Clicks the first available launch button in the question list and waits for
  * the "Question launched" toast to confirm dispatch. Does NOT assert on the
@@ -102,4 +122,4 @@ async function endSessionUI(adminPage) {
     console.log('[UI HELPER] Session ended');
 }
 
-module.exports = { adminLoginUI, startSession, studentJoin, createQuestion, launchFirstQuestion, endSessionUI };
+module.exports = { adminLoginUI, startSession, studentJoin, createQuestion, createQuestionWithKey, launchFirstQuestion, endSessionUI };
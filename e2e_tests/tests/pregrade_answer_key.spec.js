@@ -0,0 +1,60 @@
+const { test, expect } = require('@playwright/test');
+const { endActiveSession } = require('./helpers/api');
+const { adminLoginUI, startSession, studentJoin, createQuestionWithKey, launchFirstQuestion, endSessionUI } = require('./helpers/ui');
+
+test.describe('Answer Key and Rubric', () => {
+    test.beforeEach(async ({ request }) => {
+        await endActiveSession(request);
+    });
+
+    test('should grade answers from the answer key and rubric without the model', async ({ browser }) => {
+        const adminContext = await browser.newContext();
+        const studentContext = await browser.newContext();
+        const adminPage = await adminContext.newPage();
+        const studentPage = await studentContext.newPage();
+
+        // 1. Admin logs in and starts a session
+        await adminLoginUI(adminPage);
+        console.log('[STEP 1] Starting a new session');
+        const code = await startSession(adminPage);
+
+        // 2. Admin creates a question with an answer key and a rubric, then launches it
+        console.log('[STEP 2] Admin creating a question with answer key and rubric');
+        await createQuestionWithKey(
+            adminPage,
+            'Which organelle makes most of the cell\'s ATP?',
+            'Mitochondria',
+            'mitochondria\nthe mitochondria',
+            '1: chloroplast*'
+        );
+        const toast = adminPage.getByTestId('toast');
+        await expect(toast).toBeVisible();
+        await expect(toast).toContainText('Question created');
+        await launchFirstQuestion(adminPage);
+        console.log('[STEP 2] Question created and launched');
+
+        // 3. Student answers with a rubric phrase
+        console.log('[STEP 3] Student submitting an answer that matches the rubric');
+        await studentJoin(studentPage, code, 'Rubric');
+        const textarea = studentPage.locator('[data-testid^="question-response-textarea-"]');
+        await expect(textarea).toBeVisible();
+        await textarea.fill('Chloroplasts');
+        await studentPage.locator('[data-testid^="submit-answer-button-"]').click();
+
+        // The rubric gives 1; the test model always gives 3, so 1 means the model was skipped
+        await expect(studentPage.getByTestId('response-score')).toContainText('1');
+        console.log('[STEP 3] Rubric score shown to the student');
+
+        // 4. The admin sees the same score
+        console.log('[STEP 4] Verifying the admin sees the rubric score');
+        await expect(adminPage.getByTestId('student-response-score-Rubric')).toContainText('Score: 1');
+        console.log('[STEP 4] Admin results show the rubric score');
+
+        // Cleanup
+        console.log('[CLEANUP] Ending session');
+        await endSessionUI(adminPage);
+
+        await adminContext.close();
+        await studentContext.close();
+    });
+});
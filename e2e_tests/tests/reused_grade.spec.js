@@ -0,0 +1,41 @@
+const { test, expect } = require('@playwright/test');
+const { endActiveSession, submitAnswer } = require('./helpers/api');
+const { adminLoginUI, startSession, createQuestion, launchFirstQuestion, endSessionUI } = require('./helpers/ui');
+
+test.describe('Reused Grades', () => {
+    test.beforeEach(async ({ request }) => {
+        await endActiveSession(request);
+    });
+
+    test('should reuse the grade of an identical answer and mark it in the results', async ({ browser, request }) => {
+        const adminContext = await browser.newContext();
+        const adminPage = await adminContext.newPage();
+
+        // 1. Admin logs in, starts a session and launches a question
+        await adminLoginUI(adminPage);
+        console.log('[STEP 1] Starting a session and launching a question');
+        const code = await startSession(adminPage);
+        await createQuestion(adminPage, 'Why do leaves look green?', 'Chlorophyll reflects green light');
+        await launchFirstQuestion(adminPage);
+
+        // 2. Two students submit the same answer, one after the other
+        console.log('[STEP 2] Submitting the same answer twice');
+        const answer = 'Chlorophyll absorbs red and blue light and reflects green';
+        const first = await submitAnswer(request, code, 'Dee', answer);
+        const second = await submitAnswer(request, code, 'Eli', answer);
+        expect(second.score).toBe(first.score);
+
+        // 3. Only the second answer is marked as a reused grade
+        console.log('[STEP 3] Verifying the reused grade badge');
+        await expect(adminPage.getByTestId('reused-grade-badge-Eli')).toBeVisible();
+        await expect(adminPage.getByTestId('student-response-score-Eli')).toContainText(`Score: ${first.score}`);
+        await expect(adminPage.getByTestId('reused-grade-badge-Dee')).toHaveCount(0);
+        console.log('[STEP 3] Second answer reused the first grade');
+
+        // Cleanup
+        console.log('[CLEANUP] Ending session');
+        await endSessionUI(adminPage);
+
+        await adminContext.close();
+    });
+});
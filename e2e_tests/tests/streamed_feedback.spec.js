@@ -0,0 +1,69 @@
+const { test, expect } = require('@playwright/test');
+const { endActiveSession } = require('./helpers/api');
+const { adminLoginUI, startSession, studentJoin, createQuestion, launchFirstQuestion, endSessionUI } = require('./helpers/ui');
+
+test.describe('Streamed Feedback', () => {
+    test.beforeEach(async ({ request }) => {
+        await endActiveSession(request);
+    });
+
+    test('should show partial feedback while the answer is still being graded', async ({ browser }) => {
+        const adminContext = await browser.newContext();
+        const studentContext = await browser.newContext();
+        const adminPage = await adminContext.newPage();
+        const studentPage = await studentContext.newPage();
+
+        // Pass the student socket through, keeping a handle to push messages to the page
+        let studentSocket = null;
+        await studentPage.routeWebSocket(/\/api\/student\/ws\//, ws => {
+            ws.connectToServer();
+            studentSocket = ws;
+        });
+        // Hold the submit request so the answer stays in the grading state
+        let heldSubmit = null;
+        await studentPage.route(/\/submit$/, route => {
+            heldSubmit = route;
+        });
+
+        // 1. Admin logs in, starts a session and launches a question
+        await adminLoginUI(adminPage);
+        console.log('[STEP 1] Starting a session and launching a question');
+        const code = await startSession(adminPage);
+        await studentJoin(studentPage, code, 'Fay');
+        await createQuestion(adminPage, 'Explain osmosis.', 'Water moves across a membrane');
+        await launchFirstQuestion(adminPage);
+
+        // 2. Student submits; the request is held
+        console.log('[STEP 2] Student submitting an answer');
+        const textarea = studentPage.locator('[data-testid^="question-response-textarea-"]');
+        await expect(textarea).toBeVisible();
+        const sessionQuestionId = Number((await textarea.getAttribute('data-testid')).split('-').pop());
+        await textarea.fill('Water moves to where there is more solute');
+        await studentPage.locator('[data-testid^="submit-answer-button-"]').click();
+        await expect.poll(() => heldSubmit !== null).toBe(true);
+
+        // 3. A feedback delta arrives while grading is in progress
+        console.log('[STEP 3] Sending partial feedback over the socket');
+        studentSocket.send(JSON.stringify({
+            type: 'feedback_delta',
+            session_question_id: sessionQuestionId,
+            feedback: 'Good start: water does move toward',
+        }));
+        await expect(studentPage.getByTestId('response-feedback-partial')).toContainText('Good start');
+        console.log('[STEP 3] Partial feedback shown while grading');
+
+        // 4. The request completes and the final grade replaces the partial feedback
+        console.log('[STEP 4] Releasing the submit request');
+        await heldSubmit.continue();
+        await expect(studentPage.getByTestId('response-score')).toBeVisible();
+        await expect(studentPage.getByTestId('response-feedback-partial')).toHaveCount(0);
+        console.log('[STEP 4] Final grade shown');
+
+        // Cleanup
+        console.log('[CLEANUP] Ending session');
+        await endSessionUI(adminPage);
+
+        await adminContext.close();
+        await studentContext.close();
+    });
+});
@@ -5,6 +5,8 @@ const QuestionModal = ({ show, onClose, onSave, editingQuestion = null, collecti
     const [text, setText] = useState('');
     const [gradingCriteria, setGradingCriteria] = useState('');
     const [collectionId, setCollectionId] = useState(1);
+    const [answerKey, setAnswerKey] = useState('');
+    const [rubric, setRubric] = useState('');
 
     useEffect(() => {
         if (show) {
@@ -12,10 +14,14 @@ const QuestionModal = ({ show, onClose, onSave, editingQuestion = null, collecti
                 setText(editingQuestion.text);
                 setGradingCriteria(editingQuestion.grading_criteria);
                 setCollectionId(editingQuestion.collection_id || 1);
+                setAnswerKey(editingQuestion.answer_key || '');
+                setRubric(editingQuestion.rubric || '');
             } else {
                 setText('');
                 setGradingCriteria('');
                 setCollectionId(1);
+                setAnswerKey('');
+                setRubric('');
             }
         }
     }, [show, editingQuestion]);
@@ -24,7 +30,13 @@ const QuestionModal = ({ show, onClose, onSave, editingQuestion = null, collecti
 
     const handleSubmit = (e) => {
         e.preventDefault();
-        onSave({ text, grading_criteria: gradingCriteria, collection_id: collectionId });
+        onSave({
+            text,
+            grading_criteria: gradingCriteria,
+            collection_id: collectionId,
+            answer_key: answerKey.trim() || null,
+            rubric: rubric.trim() || null
+        });
     };
 
     return (
@@ -74,6 +86,40 @@ const QuestionModal = ({ show, onClose, onSave, editingQuestion = null, collecti
                         />
                     </div>
 
+                    <details className="group" open={Boolean(answerKey || rubric)}>
+                        <summary className="text-sm font-medium text-gray-700 cursor-pointer" data-testid="answer-key-toggle">
+                            Answer Key &amp; Rubric (optional, graded without the AI)
+                        </summary>
+                        <div className="mt-3 space-y-4">
+                            <div>
+                                <label className="block text-sm text-gray-600 mb-2">
+                                    Accepted answers, one per line. An exact match (ignoring case and punctuation) gets full marks.
+                                </label>
+                                <textarea
+                                    rows={2}
+                                    className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 resize-y font-mono text-sm"
+                                    value={answerKey}
+                                    onChange={e => setAnswerKey(e.target.value)}
+                                    placeholder="mitochondria"
+                                    data-testid="answer-key-input"
+                                />
+                            </div>
+                            <div>
+                                <label className="block text-sm text-gray-600 mb-2">
+                                    Rubric, one <code>score: phrase | phrase</code> per line (whole words, <code>*</code> ends a prefix, first match wins).
+                                </label>
+                                <textarea
+                                    rows={2}
+                                    className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 resize-y font-mono text-sm"
+                                    value={rubric}
+                                    onChange={e => setRubric(e.target.value)}
+                                    placeholder={"4: mitochondria | mitochondrion\n1: chloroplast*"}
+                                    data-testid="rubric-input"
+                                />
+                            </div>
+                        </div>
+                    </details>
+
                     {collections.length > 0 && (
                         <div>
                             <label className="block text-sm font-medium text-gray-700 mb-2">
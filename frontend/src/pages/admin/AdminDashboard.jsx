@@ -256,33 +256,21 @@ const AdminDashboard = () => {
                         <label className="text-sm font-medium text-gray-700">AI Model:</label>
                         <button
                             onClick={() => { setShowModelModal(true); fetchModels(); }}
-                            disabled={!!sessions.find(s => s.status === 'active')}
-                            className={`text-sm border border-gray-300 rounded-lg shadow-sm px-3 py-2 flex items-center gap-2 w-[220px] ${sessions.find(s => s.status === 'active') ? 'bg-gray-100 opacity-60 cursor-not-allowed' : 'bg-white hover:bg-gray-50'}`}
+                            className="text-sm border border-gray-300 rounded-lg shadow-sm px-3 py-2 flex items-center gap-2 w-[220px] bg-white hover:bg-gray-50"
                             title={selectedModel || "Select Model"}
                         >
                             <Bot className="w-4 h-4 text-gray-500 shrink-0" />
                             <span className="truncate flex-1 text-left">{selectedModel || "Select an AI Model..."}</span>
                         </button>
                     </div>
-                    {sessions.find(s => s.status === 'active') ? (
-                        <button
-                            onClick={() => navigate(`/admin/session/${sessions.find(s => s.status === 'active').code}`)}
-                            data-testid="open-active-session-button"
-                            className="flex items-center gap-2 px-4 py-2 bg-green-600 text-white rounded-lg hover:bg-green-700 transition shadow-sm font-medium"
-                        >
-                            <PlayCircle className="w-5 h-5" />
-                            Open Active Session
-                        </button>
-                    ) : (
-                        <button
-                            onClick={startSession}
-                            data-testid="start-session-button"
-                            className="flex items-center gap-2 px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 transition shadow-sm font-medium"
-                        >
-                            <PlayCircle className="w-5 h-5" />
-                            Start New Session
-                        </button>
-                    )}
+                    <button
+                        onClick={startSession}
+                        data-testid="start-session-button"
+                        className="flex items-center gap-2 px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 transition shadow-sm font-medium"
+                    >
+                        <PlayCircle className="w-5 h-5" />
+                        Start New Session
+                    </button>
                     <button onClick={() => { logout(); navigate('/admin/login') }} className="p-2 text-gray-500 hover:text-gray-900 transition ml-2">
                         <LogOut className="w-5 h-5" />
                     </button>
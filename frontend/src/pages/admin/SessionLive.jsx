@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import api, { getBaseUrl } from '../../api';
+import api, { getWsUrl } from '../../api';
 import { Play, Square, Users, Copy, ArrowLeft, X, Power, PlusCircle, AlertCircle, Download, FolderOpen, Search, StopCircle } from 'lucide-react';
 import Toast from '../../components/Toast';
 import ConnectedUsersModal from '../../components/admin/ConnectedUsersModal';
@@ -13,6 +13,7 @@ const SessionLive = () => {
     const [questions, setQuestions] = useState([]);
     const [collections, setCollections] = useState([]);
     const [results, setResults] = useState([]);
+    const [clusters, setClusters] = useState({});
     const [loading, setLoading] = useState(true);
     const [toast, setToast] = useState(null);
     const [connectedUsers, setConnectedUsers] = useState(0);
@@ -31,34 +32,70 @@ const SessionLive = () => {
     useEffect(() => {
         if (!session) return;
 
-        const sseUrl = `${getBaseUrl()}/api/admin/sessions/${session.id}/live-results`;
-        const sse = new EventSource(sseUrl);
+        // One socket carries everything this page renders: response, roster and question-state events
+        let ws = null;
+        let reconnectTimeout = null;
+        let reconnectDelay = 3000;
+        let isIntentionallyClosed = false;
 
-        const doPoll = async () => {
+        const connect = async () => {
+            if (isIntentionallyClosed) return;
+            let token;
             try {
-                const [res, usersRes] = await Promise.all([
-                    api.get(`/admin/sessions/${session.id}/results`),
-                    api.get(`/admin/sessions/${session.id}/connected-users`)
-                ]);
-                setResults(res.data.sort((a, b) => b.id - a.id));
-                setConnectedUsers(usersRes.data.count);
-                setConnectedNames(usersRes.data.names || []);
+                const res = await api.post(`/admin/sessions/${session.id}/ws-token`);
+                token = res.data.token;
             } catch (e) {
                 console.error(e);
+                reconnectTimeout = setTimeout(connect, 3000);
+                return;
             }
+            if (isIntentionallyClosed) return;
+
+            ws = new WebSocket(`${getWsUrl()}/api/admin/ws/${session.id}?token=${encodeURIComponent(token)}&topics=responses,roster,questions`);
+
+            ws.onmessage = (event) => {
+                try {
+                    const data = JSON.parse(event.data);
+                    if (data.type === 'ping') {
+                        ws.send(JSON.stringify({ type: 'pong' }));
+                    } else if (data.type === 'results') {
+                        setResults(data.results.sort((a, b) => b.id - a.id));
+                    } else if (data.type === 'new_response') {
+                        setResults(prev => prev.map(sq => sq.id === data.session_question_id
+                            ? { ...sq, responses: [...(sq.responses || []), data.response] }
+                            : sq));
+                    } else if (data.type === 'active_questions') {
+                        // Launches and closes change which questions exist, so reload the list once
+                        pollResults();
+                    } else if (data.type === 'reconnect') {
+                        reconnectDelay = data.retry_after_ms || 3000;
+                    } else if (data.type === 'roster_update') {
+                        setConnectedUsers(data.count);
+                        setConnectedNames(data.names || []);
+                    }
+                } catch (e) {
+                    console.error("Failed to parse websocket message", e);
+                }
+            };
+
+            ws.onclose = () => {
+                if (!isIntentionallyClosed) {
+                    reconnectTimeout = setTimeout(connect, reconnectDelay);
+                    reconnectDelay = 3000;
+                }
+            };
         };
 
-        sse.onmessage = (e) => {
-            doPoll();
-        };
-
-        const pollInterval = setInterval(doPoll, 3000);
+        connect();
 
         return () => {
-            sse.close();
-            clearInterval(pollInterval);
+            isIntentionallyClosed = true;
+            if (reconnectTimeout) clearTimeout(reconnectTimeout);
+            if (ws && ws.readyState === WebSocket.OPEN) {
+                ws.close();
+            }
         };
-    }, [session]);
+    }, [session?.id]);
 
     const fetchInitialData = async () => {
         try {
@@ -91,6 +128,17 @@ const SessionLive = () => {
         }
     };
 
+    const loadClusters = async () => {
+        if (!session) return;
+        try {
+            const res = await api.get(`/admin/sessions/${session.id}/clusters`);
+            setClusters(Object.fromEntries(res.data.questions.map(q => [q.session_question_id, q.clusters])));
+        } catch (e) {
+            console.error(e);
+            setToast({ message: "Could not group the answers", type: 'error' });
+        }
+    };
+
     const launchQuestion = async (questionId) => {
         if (!session) return;
         try {
@@ -408,6 +456,31 @@ const SessionLive = () => {
                                     </div>
                                 </div>
 
+                                {/* Similar answers, grouped on request */}
+                                <div className="mb-8">
+                                    <div className="flex justify-between items-center mb-4">
+                                        <h4 className="text-sm font-semibold text-gray-500 uppercase tracking-wider">Answer Groups</h4>
+                                        <button
+                                            onClick={loadClusters}
+                                            data-testid={`group-answers-button-${r.id}`}
+                                            className="px-3 py-1.5 bg-gray-50 text-gray-700 rounded-lg font-medium hover:bg-gray-100 border border-gray-200 text-sm"
+                                        >
+                                            {clusters[r.id] ? 'Refresh' : 'Group similar answers'}
+                                        </button>
+                                    </div>
+                                    {clusters[r.id]?.map((c, i) => (
+                                        <div key={i} data-testid={`answer-group-${r.id}-${i}`} className="mb-3 p-3 bg-gray-50 border border-gray-200 rounded-lg">
+                                            <div className="flex justify-between text-sm mb-2">
+                                                <span data-testid={`answer-group-terms-${r.id}-${i}`} className="font-medium text-gray-900">{c.terms.join(', ')}</span>
+                                                <span data-testid={`answer-group-size-${r.id}-${i}`} className="text-gray-500">{c.size} answer{c.size === 1 ? '' : 's'} ({Math.round(c.share * 100)}%)</span>
+                                            </div>
+                                            {c.representatives.map(rep => (
+                                                <p key={rep.response_id} data-testid={`answer-group-representative-${r.id}-${i}`} className="text-sm text-gray-700 bg-white px-3 py-2 mb-1 rounded border border-gray-100 whitespace-pre-wrap">{rep.response_text}</p>
+                                            ))}
+                                        </div>
+                                    ))}
+                                </div>
+
                                 {/* Responses List */}
                                 <div>
                                     <h4 className="text-sm font-semibold text-gray-500 uppercase tracking-wider mb-4 border-t border-gray-100 pt-6">Student Responses ({r.responses?.length || 0})</h4>
@@ -420,9 +493,19 @@ const SessionLive = () => {
                                                 >
                                                     <div className="flex items-center gap-3">
                                                         {resp.student_name}
-                                                        <span className="bg-white px-2 py-0.5 rounded text-xs font-bold border font-mono">
+                                                        <span data-testid={`student-response-score-${resp.student_name}`} className="bg-white px-2 py-0.5 rounded text-xs font-bold border font-mono">
                                                             Score: {resp.ai_score}
                                                         </span>
+                                                        {resp.graded_from && (
+                                                            <span data-testid={`reused-grade-badge-${resp.student_name}`} className="bg-gray-100 text-gray-500 px-2 py-0.5 rounded text-xs" title="Same answer as one already graded">
+                                                                Reused grade
+                                                            </span>
+                                                        )}
+                                                        {resp.graded_by === 'local' && (
+                                                            <span data-testid={`local-grade-badge-${resp.student_name}`} className="bg-gray-100 text-gray-500 px-2 py-0.5 rounded text-xs" title="Graded by the local classifier instead of the model">
+                                                                Local grade
+                                                            </span>
+                                                        )}
                                                     </div>
                                                     <span className="text-gray-400 text-sm group-open:hidden">Show details</span>
                                                 </summary>
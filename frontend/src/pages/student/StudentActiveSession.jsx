@@ -68,14 +68,26 @@ const StudentActiveSession = () => {
 
         let ws = null;
         let reconnectTimeout = null;
+        // Set from a server hint; otherwise reconnects back off exponentially with jitter so a
+        // class that lost Wi-Fi together does not come back in the same instant
+        let hintedDelay = null;
+        let attempts = 0;
         let isIntentionallyClosed = false;
+        // Position in the session's event stream, so a reconnect only receives what was missed
+        let epoch = null;
+        let lastSeq = null;
 
         const wsUrl = getWsUrl();
 
         const connect = () => {
             if (isIntentionallyClosed) return;
 
-            ws = new WebSocket(`${wsUrl}/api/student/ws/${sessionInfo.id}`);
+            const params = new URLSearchParams({ name: studentName.trim() });
+            if (epoch !== null && lastSeq !== null) {
+                params.set('epoch', epoch);
+                params.set('last_seq', lastSeq);
+            }
+            ws = new WebSocket(`${wsUrl}/api/student/ws/${sessionInfo.id}?${params}`);
 
             ws.onopen = () => {
                 ws.send(JSON.stringify({ type: 'join', name: studentName }));
@@ -84,8 +96,28 @@ const StudentActiveSession = () => {
             ws.onmessage = (event) => {
                 try {
                     const data = JSON.parse(event.data);
-                    if (data.type === 'active_questions') {
+                    if (data.type === 'active_questions' || data.type === 'resumed') attempts = 0;
+                    if (data.epoch) epoch = data.epoch;
+                    if (typeof data.seq === 'number') lastSeq = data.seq;
+                    if (data.type === 'ping') {
+                        // Heartbeat: the server closes sockets that stay silent
+                        ws.send(JSON.stringify({ type: 'pong' }));
+                    } else if (data.type === 'active_questions') {
                         setActiveQuestions(data.questions);
+                    } else if (data.type === 'feedback_delta') {
+                        // Streamed partial feedback for an answer that is still being graded
+                        setSubmittedStatus(prev => prev[data.session_question_id]?.status === 'loading'
+                            ? { ...prev, [data.session_question_id]: { ...prev[data.session_question_id], partialFeedback: data.feedback } }
+                            : prev);
+                    } else if (data.type === 'grading_result') {
+                        // Also reaches this student's other tabs, which did not make the request
+                        setSubmittedStatus(prev => ({
+                            ...prev,
+                            [data.session_question_id]: { status: 'done', score: data.score, feedback: data.feedback }
+                        }));
+                    } else if (data.type === 'reconnect') {
+                        // Server is restarting; it picks a staggered delay so the class does not reconnect at once
+                        hintedDelay = data.retry_after_ms || null;
                     } else if (data.type === 'session_ended') {
                         isIntentionallyClosed = true;
                         sessionStorage.removeItem('activeSessionId');
@@ -98,7 +130,10 @@ const StudentActiveSession = () => {
 
             ws.onclose = () => {
                 if (!isIntentionallyClosed) {
-                    reconnectTimeout = setTimeout(connect, 3000);
+                    const backoff = Math.min(30000, 1000 * 2 ** attempts) * (0.5 + Math.random());
+                    reconnectTimeout = setTimeout(connect, hintedDelay ?? backoff);
+                    hintedDelay = null;
+                    attempts += 1;
                 }
             };
 
@@ -148,7 +183,7 @@ const StudentActiveSession = () => {
                 delete next[qId];
                 return next;
             });
-            alert("Failed to submit. Please try again.");
+            alert(e.response?.data?.detail || "Failed to submit. Please try again.");
         }
     };
 
@@ -294,6 +329,15 @@ const StudentActiveSession = () => {
                                             onChange={e => handleResponseChange(uniqueId, e.target.value)}
                                         ></textarea>
 
+                                        {isLoading && subStatus.partialFeedback && (
+                                            <div className="bg-gradient-to-br from-indigo-50 to-blue-50 p-5 rounded-lg border border-blue-100 shadow-inner">
+                                                <span className="text-xs font-bold uppercase tracking-wider text-indigo-600 mb-2 block">
+                                                    AI Teaching Assistant
+                                                </span>
+                                                <p className="text-indigo-900 font-medium leading-relaxed whitespace-pre-wrap" data-testid="response-feedback-partial">{subStatus.partialFeedback}</p>
+                                            </div>
+                                        )}
+
                                         <div className="flex justify-end">
                                             <button
                                                 onClick={() => submitAnswer(q)}